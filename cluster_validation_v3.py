@@ -1,19 +1,262 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import re
 import sys
+import json
+import gzip
+import time
+import argparse
+import functools
+import sqlite3
+import tracemalloc
 from collections import defaultdict, Counter
 from difflib import unified_diff
+from urllib.parse import quote
+
+try:
+    import zstandard  # optional, only needed for snapshots written with --compress zstd
+except ImportError:
+    zstandard = None
+
+# Snapshot files may be compressed per file by get_cluster_info_v3.py --compress.
+# The snap_* helpers below hide the suffix: callers see and open "x.txt" for x.txt, x.txt.gz or x.txt.zst,
+# and compressed members are decompressed while they are read, never unpacked to disk.
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+def strip_compressed_suffix(name):
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+# The collectors save ingresses under the kubectl short name (INGRESS_TYPE in get_cluster_info_v3.py):
+# describes/ingress/ and objects/ingress.ndjson.
+INGRESS_TYPE = "ingress"
+
+# A snapshot can also be one .pack file (get_cluster_info_v3.py --storage pack), an SQLite database
+# with a row per file. Once open_snapshot() has opened it, paths below "x.pack/" are served from the
+# pack by the same snap_* helpers, so the analyzers keep joining paths onto the snapshot folder.
+PACK_SUFFIX = ".pack"
+_packs = {}
+
+class SnapshotPack:
+    """Read side of a .pack file: the member list is loaded once, member data on demand."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+        self.sizes = dict(self.db.execute("SELECT path, length(data) FROM members"))
+        self.children = defaultdict(lambda: (set(), set()))  # directory -> (subdirectories, files)
+        for name in self.sizes:
+            parent, _, base = name.rpartition("/")
+            self.children[parent][1].add(base)
+            while parent:
+                grandparent, _, base = parent.rpartition("/")
+                self.children[grandparent][0].add(base)
+                parent = grandparent
+
+    def isdir(self, name):
+        return name == "" or name in self.children
+
+    def listdir(self, name):
+        dirs, files = self.children.get(name, (set(), set()))
+        return sorted(dirs | files)
+
+    def walk(self, name=""):
+        dirs, files = self.children.get(name, (set(), set()))
+        dirs = sorted(dirs)
+        yield name, dirs, sorted(files)
+        for d in dirs:
+            yield from self.walk(f"{name}/{d}" if name else d)
+
+    def read(self, name):
+        return self.db.execute("SELECT data FROM members WHERE path = ?", (name,)).fetchone()[0]
+
+def open_snapshot(folder):
+    """Make a .pack snapshot readable through the snap_* helpers; folders need nothing."""
+    key = os.path.normpath(folder)
+    if key.endswith(PACK_SUFFIX) and os.path.isfile(key) and key not in _packs:
+        _packs[key] = SnapshotPack(key)
+
+def _pack_member(path):
+    """(pack, member name) for a path inside an opened pack, else (None, None)."""
+    path = os.path.normpath(path)
+    for root, pack in _packs.items():
+        if path == root:
+            return pack, ""
+        if path.startswith(root + os.sep):
+            return pack, path[len(root) + 1:].replace(os.sep, "/")
+    return None, None
+
+def snap_walk(root):
+    pack, name = _pack_member(root)
+    if pack is not None:
+        for dirname, dirs, files in pack.walk(name):
+            dirpath = os.path.join(root, *dirname.split("/")) if dirname else root
+            yield dirpath, dirs, sorted(set(strip_compressed_suffix(f) for f in files))
+        return
+    for dirpath, dirs, files in os.walk(root):
+        yield dirpath, dirs, sorted(set(strip_compressed_suffix(f) for f in files))
+
+def snap_listdir(path):
+    pack, name = _pack_member(path)
+    entries = pack.listdir(name) if pack is not None else os.listdir(path)
+    return sorted(set(strip_compressed_suffix(f) for f in entries))
+
+def snap_isdir(path):
+    pack, name = _pack_member(path)
+    return pack.isdir(name) if pack is not None else os.path.isdir(path)
+
+def snap_resolve(path):
+    """Physical file behind a logical snapshot path, or None."""
+    pack, name = _pack_member(path)
+    for suffix in ("",) + COMPRESSED_SUFFIXES:
+        if (name + suffix in pack.sizes) if pack is not None else os.path.isfile(path + suffix):
+            return path + suffix
+    return None
+
+def snap_isfile(path):
+    return snap_resolve(path) is not None
+
+def snap_open(path, mode="r", errors=None):
+    """Open a snapshot file for reading as text, decompressing .gz/.zst members on the fly."""
+    physical = snap_resolve(path) or path
+    pack, name = _pack_member(physical)
+    if pack is not None:
+        data = pack.read(name)
+        if TRACE is not None:
+            TRACE["files_read"] += 1
+            TRACE["bytes_read"] += len(data)
+        stream = io.BytesIO(data)
+        if physical.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=stream)
+        elif physical.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"{physical} is zstd-compressed; install the 'zstandard' package")
+            stream = zstandard.ZstdDecompressor().stream_reader(stream)
+        return stream if "b" in mode else io.TextIOWrapper(stream, errors=errors)
+    if TRACE is not None and os.path.isfile(physical):
+        TRACE["files_read"] += 1
+        TRACE["bytes_read"] += os.path.getsize(physical)
+    if physical.endswith(".gz"):
+        return gzip.open(physical, "rt", errors=errors)
+    if physical.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{physical} is zstd-compressed; install the 'zstandard' package")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(physical, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, errors=errors)
+    return open(physical, mode, errors=errors)
+
+# Snapshots written by get_cluster_info_v3.py carry index.sqlite: a row per object (kind, namespace,
+# name, uid, digest and size of its describe file, offset of its YAML section) and a row per file.
+# Lookups go through the index when there is one and fall back to walking the folder otherwise.
+SNAPSHOT_INDEX_FILE = "index.sqlite"
+
+@functools.lru_cache(maxsize=None)
+def snapshot_index(folder):
+    """Read-only connection to folder's index.sqlite, or None for snapshots without one."""
+    pack, _ = _pack_member(folder)
+    path = folder if pack is not None else os.path.join(folder, SNAPSHOT_INDEX_FILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        db = pack.db if pack is not None else sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+        db.execute("SELECT 1 FROM objects LIMIT 1")
+        return db
+    except sqlite3.Error as e:
+        print(f"Ignoring unreadable snapshot index {path}: {e}")
+        return None
+
+def index_files(folder, prefix=""):
+    """Logical paths under prefix from the index, or None without an index."""
+    db = snapshot_index(folder)
+    if db is None:
+        return None
+    pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return {row[0] for row in db.execute("SELECT path FROM files WHERE path LIKE ? ESCAPE '\\'", (pattern,))}
 
+def index_digests(folder, kind):
+    """Describe file name -> sha256 for one kind, or None without an index."""
+    db = snapshot_index(folder)
+    if db is None:
+        return None
+    return {os.path.basename(path): digest for path, digest in db.execute(
+        "SELECT path, sha256 FROM objects WHERE kind = ? AND sha256 IS NOT NULL", (kind,))}
+
+# Opt-in tracing (--trace FILE): every analyzer call becomes a span with wall and CPU time,
+# files/bytes read and (for top-level calls) the tracemalloc peak.
+TRACE = None
+
+def enable_tracing():
+    global TRACE
+    TRACE = {"started": time.perf_counter(), "spans": [], "depth": 0, "files_read": 0, "bytes_read": 0}
+    tracemalloc.start()
+
+def traced(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if TRACE is None:
+            return func(*args, **kwargs)
+        outer = TRACE["depth"] == 0
+        if outer:
+            tracemalloc.reset_peak()
+        TRACE["depth"] += 1
+        files_read, bytes_read = TRACE["files_read"], TRACE["bytes_read"]
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            TRACE["depth"] -= 1
+            TRACE["spans"].append({
+                "name": func.__name__, "args": [a for a in args if isinstance(a, str)][:3],
+                "depth": TRACE["depth"], "start": start - TRACE["started"],
+                "wall": time.perf_counter() - start, "cpu": time.process_time() - cpu_start,
+                "files_read": TRACE["files_read"] - files_read, "bytes_read": TRACE["bytes_read"] - bytes_read,
+                "mem_peak": tracemalloc.get_traced_memory()[1] if outer else None,
+            })
+    return wrapper
+
+def write_trace(path):
+    spans = TRACE["spans"]
+    total_wall = time.perf_counter() - TRACE["started"]
+    mem_peak = max([sp["mem_peak"] for sp in spans if sp["mem_peak"] is not None], default=0)
+    with open(path, "w") as f:
+        json.dump({"wall": total_wall, "cpu": time.process_time(), "mem_peak": mem_peak,
+                   "files_read": TRACE["files_read"], "bytes_read": TRACE["bytes_read"], "spans": spans}, f, indent=1)
+    print(f"Trace written to {path} (total {total_wall:.2f}s wall, {time.process_time():.2f}s CPU, "
+          f"{TRACE['bytes_read'] / 1e6:.1f} MB read, peak traced memory {mem_peak / 2**20:.1f} MiB)")
+    per_analyzer = {}
+    for sp in spans:
+        agg = per_analyzer.setdefault(sp["name"], {"calls": 0, "wall": 0.0, "cpu": 0.0, "files": 0, "bytes": 0, "peak": 0})
+        agg["calls"] += 1
+        agg["wall"] += sp["wall"]
+        agg["cpu"] += sp["cpu"]
+        agg["files"] += sp["files_read"]
+        agg["bytes"] += sp["bytes_read"]
+        agg["peak"] = max(agg["peak"], sp["mem_peak"] or 0)
+    print(f"{'analyzer':<38}{'calls':>6}{'wall s':>9}{'cpu s':>9}{'files':>8}{'MB read':>9}{'peak MiB':>10}")
+    for name, agg in sorted(per_analyzer.items(), key=lambda item: -item[1]["cpu"]):
+        print(f"{name:<38.38}{agg['calls']:>6}{agg['wall']:>9.3f}{agg['cpu']:>9.3f}{agg['files']:>8}"
+              f"{agg['bytes'] / 1e6:>9.2f}{agg['peak'] / 2**20:>10.1f}")
+
+@traced
 def list_txt_files(root):
-    txt_files = set()
-    for dirpath, _, files in os.walk(root):
-        for f in files:
-            if f.endswith(".txt"):
-                full_path = os.path.join(dirpath, f)
-                rel_path = os.path.relpath(full_path, root)
-                txt_files.add(rel_path)
+    indexed = index_files(root)
+    if indexed is not None:
+        txt_files = {path for path in indexed if path.endswith(".txt")}
+    else:
+        txt_files = set()
+        for dirpath, _, files in snap_walk(root):
+            for f in files:
+                if f.endswith(".txt"):
+                    full_path = os.path.join(dirpath, f)
+                    rel_path = os.path.relpath(full_path, root)
+                    txt_files.add(rel_path)
+    # Types saved only as objects/<type>.ndjson are listed under the describe paths they would have
+    for kind in object_json_kinds(root):
+        if not has_describes(root, kind):
+            txt_files.update(f"describes/{kind}/{f}" for f in read_object_lines(root, kind))
     return txt_files
 
 def normalize_lines(lines):
@@ -68,6 +311,7 @@ def extract_log_message(line):
             return line[m.end():].strip()
     return line  # No timestamp found, return as-is
 
+@traced
 def show_text_diff(folder1, folder2, relative_path, log, max_lines=50):
     """
     Show a unified diff of two text files (relative_path inside folder1 and folder2).
@@ -76,11 +320,11 @@ def show_text_diff(folder1, folder2, relative_path, log, max_lines=50):
     path1 = os.path.join(folder1, relative_path)
     path2 = os.path.join(folder2, relative_path)
 
-    if not os.path.isfile(path1) or not os.path.isfile(path2):
+    if not snap_isfile(path1) or not snap_isfile(path2):
         log(f"  One or both files missing: {relative_path}")
         return
 
-    with open(path1, "r") as f1, open(path2, "r") as f2:
+    with snap_open(path1, "r") as f1, snap_open(path2, "r") as f2:
         lines1 = normalize_lines(f1.readlines())
         lines2 = normalize_lines(f2.readlines())
 
@@ -95,6 +339,54 @@ def show_text_diff(folder1, folder2, relative_path, log, max_lines=50):
     if len(diff_lines) > max_lines:
         log(f"    ... (diff truncated, total {len(diff_lines)} lines)")
 
+def describe_lines(folder, rtype, log=None):
+    """
+    (file name, lines) for each describe file of rtype. Snapshots taken with --object-format json
+    have no describes, so the lines are then built from objects/<rtype>.ndjson.
+    """
+    rdir = os.path.join(folder, "describes", rtype)
+    if not has_describes(folder, rtype):
+        objects = read_object_lines(folder, rtype)
+        if objects:
+            events = events_by_object(folder)
+            for filename, line in sorted(objects.items()):
+                yield filename, object_status_lines(json.loads(line), events)
+        return
+    for filename in snap_listdir(rdir):
+        if not filename.endswith(".txt"):
+            continue
+        filepath = os.path.join(rdir, filename)
+        try:
+            with snap_open(filepath, "r") as f:
+                lines = f.readlines()
+        except Exception as e:
+            if log:
+                log(f"Failed to read {filepath}: {e}")
+            continue
+        yield filename, lines
+
+def object_status_lines(obj, events):
+    """Describe-style phase, condition and Events lines for one object."""
+    status = obj.get("status") or {}
+    lines = [f"Phase: {status['phase']}\n"] if status.get("phase") else []
+    lines += [f"{c.get('type')}: {c.get('status')}\n" for c in status.get("conditions") or []]
+    meta = obj.get("metadata", {})
+    matching = [r for r in events.get((obj.get("kind"), meta.get("name")), [])
+                if not meta.get("namespace") or r.get("namespace") == meta["namespace"]]
+    if matching:
+        lines.append("Events:\n")
+        lines += [f"  {r.get('type') or ''}  {r.get('reason') or ''}  {r.get('message') or ''}\n" for r in matching]
+    return lines
+
+@functools.lru_cache(maxsize=None)
+def events_by_object(folder):
+    """events/events.ndjson records grouped by involved object (kind, name)."""
+    grouped = defaultdict(list)
+    for record in read_events(folder):
+        grouped[(record.get("kind"), record.get("name"))].append(record)
+    return grouped
+
+@traced
 def validate_events_in_describes(folder, log=None, resource_types=None):
     """
     Validate events and status from Kubernetes describe outputs in the 'describes/' directory.
@@ -117,7 +409,7 @@ def validate_events_in_describes(folder, log=None, resource_types=None):
     if resource_types is None:
         resource_types = [
             "pods", "deployments", "statefulsets", "replicasets", "services",
-            "configmaps", "secrets", "ingresses", "nodes"
+            "configmaps", "secrets", INGRESS_TYPE, "nodes"
         ]
 
     issues_by_resource = {}
@@ -152,23 +444,7 @@ def validate_events_in_describes(folder, log=None, resource_types=None):
     }
 
     for rtype in resource_types:
-        rdir = os.path.join(folder, "describes", rtype)
-        if not os.path.isdir(rdir):
-            continue
-
-        for filename in os.listdir(rdir):
-            if not filename.endswith(".txt"):
-                continue
-            filepath = os.path.join(rdir, filename)
-            try:
-                with open(filepath, "r") as f:
-                    content = f.read()
-                    lines = f.readlines()  # For line-by-line processing
-            except Exception as e:
-                if log:
-                    log(f"Failed to read {filepath}: {e}")
-                continue
-
+        for filename, lines in describe_lines(folder, rtype, log):
             resource_issues = []
             in_events_section = False
             normalized_lines = normalize_lines(lines)
@@ -246,6 +522,7 @@ def validate_events_in_describes(folder, log=None, resource_types=None):
         'top_issues': top_issues
     }
 
+@traced
 def get_top_fatal_error_warning_messages(folder, top_n=3):
     """
     Scan all .txt files under folder, find lines with 'fatal', 'error', or 'warning' (case-insensitive),
@@ -264,13 +541,13 @@ def get_top_fatal_error_warning_messages(folder, top_n=3):
     error_messages = defaultdict(lambda: {"count": 0, "files": set()})
     warning_messages = defaultdict(lambda: {"count": 0, "files": set()})
 
-    for dirpath, _, files in os.walk(folder):
+    for dirpath, _, files in snap_walk(folder):
         for filename in files:
             if not filename.endswith(".txt"):
                 continue
             filepath = os.path.join(dirpath, filename)
             try:
-                with open(filepath, "r", errors="ignore") as f:
+                with snap_open(filepath, "r", errors="ignore") as f:
                     for line in f:
                         line_strip = line.strip()
                         msg = extract_log_message(line)
@@ -297,6 +574,7 @@ def get_top_fatal_error_warning_messages(folder, top_n=3):
 
     return top_fatals, top_errors, top_warnings
 
+@traced
 def get_top_errors_warnings(folder, top_n=3):
     """
     Scan all .txt files under folder, find lines with 'error' or 'warning' (case-insensitive),
@@ -312,13 +590,13 @@ def get_top_errors_warnings(folder, top_n=3):
     error_messages = defaultdict(lambda: {"count": 0, "files": set()})
     warning_messages = defaultdict(lambda: {"count": 0, "files": set()})
 
-    for dirpath, _, files in os.walk(folder):
+    for dirpath, _, files in snap_walk(folder):
         for filename in files:
             if not filename.endswith(".txt"):
                 continue
             filepath = os.path.join(dirpath, filename)
             try:
-                with open(filepath, "r", errors="ignore") as f:
+                with snap_open(filepath, "r", errors="ignore") as f:
                     for line in f:
                         line_strip = line.strip()
                         msg = extract_log_message(line)
@@ -342,6 +620,7 @@ def get_top_errors_warnings(folder, top_n=3):
 
     return top_errors_formatted, top_warnings_formatted
 
+@traced
 def get_unique_error_messages(folder):
     """
     Get a set of unique ERROR messages (normalized by removing timestamps) from all .txt files.
@@ -349,13 +628,13 @@ def get_unique_error_messages(folder):
     """
     error_pattern = re.compile(r"error", re.IGNORECASE)
     msgs = set()
-    for dirpath, _, files in os.walk(folder):
+    for dirpath, _, files in snap_walk(folder):
         for filename in files:
             if not filename.endswith(".txt"):
                 continue
             filepath = os.path.join(dirpath, filename)
             try:
-                with open(filepath, "r", errors="ignore") as f:
+                with snap_open(filepath, "r", errors="ignore") as f:
                     for line in f:
                         line_strip = line.strip()
                         if error_pattern.search(line_strip):
@@ -366,19 +645,20 @@ def get_unique_error_messages(folder):
                 pass
     return msgs
 
+@traced
 def get_unique_warning_messages(folder):
     """
     Similar to get_unique_error_messages but for WARNING messages.
     """
     warning_pattern = re.compile(r"warning", re.IGNORECASE)
     msgs = set()
-    for dirpath, _, files in os.walk(folder):
+    for dirpath, _, files in snap_walk(folder):
         for filename in files:
             if not filename.endswith(".txt"):
                 continue
             filepath = os.path.join(dirpath, filename)
             try:
-                with open(filepath, "r", errors="ignore") as f:
+                with snap_open(filepath, "r", errors="ignore") as f:
                     for line in f:
                         line_strip = line.strip()
                         if warning_pattern.search(line_strip):
@@ -389,28 +669,90 @@ def get_unique_warning_messages(folder):
                 pass
     return msgs
 
+@traced
 def count_resources(folder, resource_types):
     counts = {}
     for rtype in resource_types:
         rdir = os.path.join(folder, "describes", rtype)
-        if os.path.isdir(rdir):
-            files = [f for f in os.listdir(rdir) if f.endswith(".txt")]
+        prefix = f"describes/{rtype}/"
+        indexed = index_files(folder, prefix)
+        if indexed is not None:
+            counts[rtype] = sum(1 for path in indexed if path.endswith(".txt") and "/" not in path[len(prefix):])
+        elif snap_isdir(rdir):
+            files = [f for f in snap_listdir(rdir) if f.endswith(".txt")]
             counts[rtype] = len(files)
         else:
             counts[rtype] = 0
+        if not counts[rtype]:
+            counts[rtype] = len(read_object_lines(folder, rtype) or ())
     return counts
 
+# get_cluster_info_v3.py --object-format json|both also writes objects/<type>.ndjson, one object
+# per line. When both snapshots have it, main() turns on JSON_FAST_PATH and the analyzers below
+# read fields from the objects instead of regex-parsing the describe text. The choice is made per
+# type: a type without objects/<type>.ndjson on either side is parsed from the text on both.
+OBJECTS_DIR = "objects"
+JSON_FAST_PATH = False
+COMPARED_FOLDERS = ()  # the two snapshots main() compares
+
+def has_object_json(folder):
+    return snap_isdir(os.path.join(folder, OBJECTS_DIR))
+
+def has_describes(folder, kind):
+    """describes/<kind>/ holds describe files (a --object-format json run leaves it empty)."""
+    rdir = os.path.join(folder, "describes", kind)
+    return snap_isdir(rdir) and any(f.endswith(".txt") for f in snap_listdir(rdir))
+
+def object_json_kinds(folder):
+    objects_dir = os.path.join(folder, OBJECTS_DIR)
+    if not snap_isdir(objects_dir):
+        return []
+    return [f[:-len(".ndjson")] for f in snap_listdir(objects_dir) if f.endswith(".ndjson")]
+
+@functools.lru_cache(maxsize=None)
+def read_object_lines(folder, kind):
+    """Describe file name -> canonical JSON line from objects/<kind>.ndjson, or None without it."""
+    path = os.path.join(folder, OBJECTS_DIR, f"{kind}.ndjson")
+    if not snap_isfile(path):
+        return None
+    lines = {}
+    with snap_open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            meta = json.loads(line).get("metadata", {})
+            namespace, name = meta.get("namespace"), meta.get("name")
+            lines[f"{namespace}_{name}.txt" if namespace else f"{name}.txt"] = line.rstrip("\n")
+    return lines
+
+@functools.lru_cache(maxsize=None)
+def load_objects(folder, kind):
+    """Describe file name -> object from objects/<kind>.ndjson; None unless both snapshots have it."""
+    if not JSON_FAST_PATH or any(read_object_lines(f, kind) is None for f in COMPARED_FOLDERS + (folder,)):
+        return None
+    return {f: json.loads(line) for f, line in read_object_lines(folder, kind).items()}
+
+def pod_template_containers(obj):
+    spec = obj.get("spec", {}).get("template", {}).get("spec", {})
+    return (spec.get("initContainers") or []) + (spec.get("containers") or [])
+
+@traced
 def count_pods_by_phase(folder):
     pod_dir = os.path.join(folder, "describes", "pods")
     phases = defaultdict(int)
-    if not os.path.isdir(pod_dir):
+    objects = load_objects(folder, "pods")
+    if objects is not None:
+        for obj in objects.values():
+            phases[obj.get("status", {}).get("phase") or "Unknown"] += 1
         return phases
-    for f in os.listdir(pod_dir):
+    if not snap_isdir(pod_dir):
+        return phases
+    for f in snap_listdir(pod_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(pod_dir, f)
         try:
-            with open(filepath, "r") as file:
+            with snap_open(filepath, "r") as file:
                 content = file.read()
                 # Look for "Status: Running" or "Phase: Running" etc.
                 m = re.search(r"Status:\s*(\w+)", content)
@@ -427,7 +769,7 @@ def parse_env_vars_from_deployment_file(filepath):
     current_container = "default"
 
     try:
-        with open(filepath, "r") as f:
+        with snap_open(filepath, "r") as f:
             lines = f.readlines()
     except Exception as e:
         print(f"Failed to read {filepath}: {e}")  # Use print
@@ -464,13 +806,20 @@ def parse_env_vars_from_deployment_file(filepath):
 
     return env_vars
 
+@traced
 def get_deployment_env_vars(folder):
     deploy_dir = os.path.join(folder, "describes", "deployments")
     env_vars_all = defaultdict(set)
-    if not os.path.isdir(deploy_dir):
+    objects = load_objects(folder, "deployments")
+    if objects is not None:
+        for obj in objects.values():
+            for c in pod_template_containers(obj):
+                env_vars_all[c.get("name", "default")].update(e["name"] for e in c.get("env") or [])
+        return env_vars_all
+    if not snap_isdir(deploy_dir):
         return env_vars_all
 
-    for f in os.listdir(deploy_dir):
+    for f in snap_listdir(deploy_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(deploy_dir, f)
@@ -487,7 +836,7 @@ def extract_container_images_from_deployment(filepath):
     images = defaultdict(set)  # container_name -> set of images
     current_container = "default"
     try:
-        with open(filepath, "r") as f:
+        with snap_open(filepath, "r") as f:
             lines = f.readlines()
     except Exception as e:
         print(f"Failed to read {filepath}: {e}")
@@ -504,13 +853,21 @@ def extract_container_images_from_deployment(filepath):
             images[current_container].add(m.group(1))
     return images
 
+@traced
 def get_deployment_images(folder):
     deploy_dir = os.path.join(folder, "describes", "deployments")
     images_all = defaultdict(set)
-    if not os.path.isdir(deploy_dir):
+    objects = load_objects(folder, "deployments")
+    if objects is not None:
+        for obj in objects.values():
+            for c in pod_template_containers(obj):
+                if c.get("image"):
+                    images_all[c.get("name", "default")].add(c["image"])
+        return images_all
+    if not snap_isdir(deploy_dir):
         return images_all
 
-    for f in os.listdir(deploy_dir):
+    for f in snap_listdir(deploy_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(deploy_dir, f)
@@ -527,7 +884,7 @@ def extract_labels_from_deployment(filepath):
     labels = {}
     in_labels_section = False
     try:
-        with open(filepath, "r") as f:
+        with snap_open(filepath, "r") as f:
             lines = f.readlines()
     except Exception as e:
         print(f"Failed to read {filepath}: {e}")
@@ -549,13 +906,17 @@ def extract_labels_from_deployment(filepath):
                 labels[key] = val
     return labels
 
+@traced
 def get_deployment_labels(folder):
     deploy_dir = os.path.join(folder, "describes", "deployments")
     labels_all = {}
-    if not os.path.isdir(deploy_dir):
+    objects = load_objects(folder, "deployments")
+    if objects is not None:
+        return {f: dict(obj.get("metadata", {}).get("labels") or {}) for f, obj in objects.items()}
+    if not snap_isdir(deploy_dir):
         return labels_all
 
-    for f in os.listdir(deploy_dir):
+    for f in snap_listdir(deploy_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(deploy_dir, f)
@@ -563,19 +924,23 @@ def get_deployment_labels(folder):
         labels_all[f] = labels
     return labels_all
 
+@traced
 def get_configmap_keys(folder):
     cm_dir = os.path.join(folder, "describes", "configmaps")
     keys_all = {}
-    if not os.path.isdir(cm_dir):
+    objects = load_objects(folder, "configmaps")
+    if objects is not None:
+        return {f: set(obj.get("data") or {}) | set(obj.get("binaryData") or {}) for f, obj in objects.items()}
+    if not snap_isdir(cm_dir):
         return keys_all
 
-    for f in os.listdir(cm_dir):
+    for f in snap_listdir(cm_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(cm_dir, f)
         keys = set()
         try:
-            with open(filepath, "r") as file:
+            with snap_open(filepath, "r") as file:
                 content = file.read()
                 # Heuristic: look for keys in YAML or describe output
                 # e.g. lines under "Data" or "Data:" section
@@ -597,17 +962,72 @@ def get_configmap_keys(folder):
     return keys_all
 
 
+def event_record(event):
+    """Compact record for a full Event object (the --watch mirror writes whole events)."""
+    meta = event.get("metadata", {})
+    involved = event.get("involvedObject") or event.get("regarding") or {}
+    series = event.get("series") or {}
+    return {
+        "uid": meta.get("uid"),
+        "namespace": meta.get("namespace"),
+        "type": event.get("type"),
+        "reason": event.get("reason"),
+        "kind": involved.get("kind"),
+        "name": involved.get("name"),
+        "count": event.get("count") or series.get("count") or 1,
+        "last": series.get("lastObservedTime") or event.get("lastTimestamp") or event.get("eventTime")
+                or meta.get("creationTimestamp"),
+        "message": event.get("message") or event.get("note"),
+    }
+
+@traced
+@functools.lru_cache(maxsize=None)  # read by several report sections
+def read_events(folder):
+    """
+    Events from events/events.ndjson, one record per event uid (the highest count seen), or []
+    for snapshots without it.
+    """
+    path = os.path.join(folder, "events", "events.ndjson")
+    if not snap_isfile(path):
+        return []
+    latest = {}
+    try:
+        with snap_open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "metadata" in record:
+                    record = event_record(record)
+                key = record.get("uid") or id(record)
+                if key not in latest or (record.get("count") or 1) >= (latest[key].get("count") or 1):
+                    latest[key] = record
+    except (OSError, ValueError) as e:
+        log(f"Failed to read events file {path}: {e}")
+    return list(latest.values())
+
+@traced
+def summarize_events(folder):
+    """Occurrences (summed event counts) per (type, reason)."""
+    summary = Counter()
+    for record in read_events(folder):
+        summary[(record.get("type") or "", record.get("reason") or "")] += record.get("count") or 1
+    return summary
+
+@traced
 def count_events(folder):
     events_dir = os.path.join(folder, "events")
     count = 0
-    if not os.path.isdir(events_dir):
+    if not snap_isdir(events_dir):
         return count
-    for f in os.listdir(events_dir):
+    count += len(read_events(folder))
+    for f in snap_listdir(events_dir):
+        # cluster_events.txt tables of older snapshots
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(events_dir, f)
         try:
-            with open(filepath, "r") as file:
+            with snap_open(filepath, "r") as file:
                 content = file.read()
                 # Count lines or entries - heuristic: count lines with timestamps or event names
                 count += len(content.splitlines())
@@ -615,17 +1035,44 @@ def count_events(folder):
             log(f"Failed to read event file {filepath}: {e}")
     return count
 
+@traced
 def read_version_file(folder, filename):
     path = os.path.join(folder, filename)
-    if not os.path.isfile(path):
+    if not snap_isfile(path):
         return None
     try:
-        with open(path, "r") as f:
+        with snap_open(path, "r") as f:
             return f.read().strip()
     except Exception as e:
         log(f"Failed to read version file {path}: {e}")
         return None
 
+@traced
+def compare_object_indexes(folder1, folder2):
+    """
+    Join both indexes on (kind, namespace, name): objects present in both are counted as changed
+    or unchanged by digest, and as recreated when their UID differs. None unless both have an index.
+    """
+    db1, db2 = snapshot_index(folder1), snapshot_index(folder2)
+    if db1 is None or db2 is None:
+        return None
+    query = "SELECT kind, namespace, name, uid, sha256 FROM objects"
+    objects2 = {row[:3]: row[3:] for row in db2.execute(query)}
+    result = {"unchanged": 0, "changed": 0, "recreated": []}
+    for key, (uid, digest) in ((row[:3], row[3:]) for row in db1.execute(query)):
+        other = objects2.get(key)
+        if other is None:
+            continue
+        if uid and other[0] and uid != other[0]:
+            result["recreated"].append(key)
+        if digest and digest == other[1]:
+            result["unchanged"] += 1
+        else:
+            result["changed"] += 1
+    result["recreated"].sort()
+    return result
+
+@traced
 def diff_resource_yamls(folder1, folder2, resource_type):
     """
     For resources present in both folders, do a line diff of their describe files.
@@ -634,18 +1081,23 @@ def diff_resource_yamls(folder1, folder2, resource_type):
     diffs = {}
     dir1 = os.path.join(folder1, "describes", resource_type)
     dir2 = os.path.join(folder2, "describes", resource_type)
-    if not os.path.isdir(dir1) or not os.path.isdir(dir2):
-        return diffs
+    if not has_describes(folder1, resource_type) or not has_describes(folder2, resource_type):
+        return diff_object_json(folder1, folder2, resource_type)
 
-    files1 = set(f for f in os.listdir(dir1) if f.endswith(".txt"))
-    files2 = set(f for f in os.listdir(dir2) if f.endswith(".txt"))
+    files1 = set(f for f in snap_listdir(dir1) if f.endswith(".txt"))
+    files2 = set(f for f in snap_listdir(dir2) if f.endswith(".txt"))
     common_files = files1 & files2
+    # Files with the same digest in both indexes are identical; only the rest is read and diffed
+    digests1 = index_digests(folder1, resource_type) or {}
+    digests2 = index_digests(folder2, resource_type) or {}
 
     for f in common_files:
+        if f in digests1 and digests1[f] == digests2.get(f):
+            continue
         path1 = os.path.join(dir1, f)
         path2 = os.path.join(dir2, f)
         try:
-            with open(path1, "r") as file1, open(path2, "r") as file2:
+            with snap_open(path1, "r") as file1, snap_open(path2, "r") as file2:
                 lines1 = file1.readlines()
                 lines2 = file2.readlines()
                 diff_lines = list(unified_diff(lines1, lines2, fromfile=f"{folder1}/{resource_type}/{f}", tofile=f"{folder2}/{resource_type}/{f}"))
@@ -655,19 +1107,36 @@ def diff_resource_yamls(folder1, folder2, resource_type):
             log(f"Failed to diff files {path1} and {path2}: {e}")
     return diffs
 
+def diff_object_json(folder1, folder2, resource_type):
+    """diff_resource_yamls for types without describes: diffs the indented objects/<type>.ndjson objects."""
+    diffs = {}
+    lines1 = read_object_lines(folder1, resource_type)
+    lines2 = read_object_lines(folder2, resource_type)
+    if lines1 is None or lines2 is None:
+        return diffs
+    for f in sorted(lines1.keys() & lines2.keys()):
+        if lines1[f] == lines2[f]:
+            continue
+        text1 = (json.dumps(json.loads(lines1[f]), indent=2, sort_keys=True) + "\n").splitlines(True)
+        text2 = (json.dumps(json.loads(lines2[f]), indent=2, sort_keys=True) + "\n").splitlines(True)
+        diffs[f] = list(unified_diff(text1, text2, fromfile=f"{folder1}/{resource_type}/{f}",
+                                     tofile=f"{folder2}/{resource_type}/{f}"))
+    return diffs
+
+@traced
 def count_errors_fatal(folder):
     error_count = 0
     fatal_count = 0
-    for dirpath, _, files in os.walk(folder):
+    for dirpath, _, files in snap_walk(folder):
         for f in files:
             if not f.endswith(".txt"):
                 continue
             filepath = os.path.join(dirpath, f)
             try:
-                with open(filepath, "r", errors="ignore") as file:
-                    content = file.read()
-                    error_count += len(re.findall(r"\bERROR\b", content, re.IGNORECASE))
-                    fatal_count += len(re.findall(r"\bFATAL\b", content, re.IGNORECASE))
+                with snap_open(filepath, "r", errors="ignore") as file:
+                    for line in file:  # line by line, so big (compressed) logs are streamed
+                        error_count += len(re.findall(r"\bERROR\b", line, re.IGNORECASE))
+                        fatal_count += len(re.findall(r"\bFATAL\b", line, re.IGNORECASE))
             except Exception as e:
                 log(f"Failed to read {filepath}: {e}")
     return error_count, fatal_count
@@ -721,13 +1190,17 @@ def compare_configmap_keys(cm1, cm2):
             diffs[f] = {"added": added, "removed": removed}
     return diffs
 
+@traced
 def get_ingress_labels(folder):
-    ingress_dir = os.path.join(folder, "describes", "ingresses")
+    ingress_dir = os.path.join(folder, "describes", INGRESS_TYPE)
     labels_all = {}
-    if not os.path.isdir(ingress_dir):
+    objects = load_objects(folder, INGRESS_TYPE)
+    if objects is not None:
+        return {f: dict(obj.get("metadata", {}).get("labels") or {}) for f, obj in objects.items()}
+    if not snap_isdir(ingress_dir):
         return labels_all
 
-    for f in os.listdir(ingress_dir):
+    for f in snap_listdir(ingress_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(ingress_dir, f)
@@ -742,7 +1215,7 @@ def extract_ingress_hosts(filepath):
     """
     hosts = set()
     try:
-        with open(filepath, "r") as f:
+        with snap_open(filepath, "r") as f:
             for line in f:
                 line_strip = line.strip()
                 m = re.match(r"^Host:\s*(\S+)", line_strip)
@@ -760,13 +1233,22 @@ def extract_ingress_hosts(filepath):
         log(f"Failed to read ingress file {filepath}: {e}")
     return hosts
 
+@traced
 def get_ingress_hosts(folder):
-    ingress_dir = os.path.join(folder, "describes", "ingresses")
+    ingress_dir = os.path.join(folder, "describes", INGRESS_TYPE)
     hosts_all = {}
-    if not os.path.isdir(ingress_dir):
+    objects = load_objects(folder, INGRESS_TYPE)
+    if objects is not None:
+        for f, obj in objects.items():
+            spec = obj.get("spec", {})
+            hosts = {rule["host"] for rule in spec.get("rules") or [] if rule.get("host")}
+            hosts.update(host for tls in spec.get("tls") or [] for host in tls.get("hosts") or [])
+            hosts_all[f] = hosts
+        return hosts_all
+    if not snap_isdir(ingress_dir):
         return hosts_all
 
-    for f in os.listdir(ingress_dir):
+    for f in snap_listdir(ingress_dir):
         if not f.endswith(".txt"):
             continue
         filepath = os.path.join(ingress_dir, f)
@@ -788,19 +1270,20 @@ def compare_ingress_hosts(hosts1, hosts2):
 
 def count_files_in_dir(folder, subdir):
     path = os.path.join(folder, subdir)
-    if not os.path.isdir(path):
+    if not snap_isdir(path):
         return 0
-    return len([f for f in os.listdir(path) if f.endswith(".txt")])
+    return len([f for f in snap_listdir(path) if f.endswith(".txt")])
 def read_text_file(folder, relative_path):
     path = os.path.join(folder, relative_path)
-    if not os.path.isfile(path):
+    if not snap_isfile(path):
         return None
     try:
-        with open(path, "r") as f:
+        with snap_open(path, "r") as f:
             return f.read()
     except Exception as e:
         log(f"Failed to read {path}: {e}")
         return None
+@traced
 def compare_text_files(folder1, folder2, relative_path):
     content1 = read_text_file(folder1, relative_path)
     content2 = read_text_file(folder2, relative_path)
@@ -810,6 +1293,7 @@ def compare_text_files(folder1, folder2, relative_path):
         return True  # differ
     return False  # same
 
+@traced
 def read_helm_releases(folder):
     """
     Reads Helm releases from helm_releases/helm_list_all_namespaces.txt file.
@@ -817,10 +1301,10 @@ def read_helm_releases(folder):
     """
     helm_file = os.path.join(folder, "helm_releases", "helm_list_all_namespaces.txt")
     releases = set()
-    if not os.path.isfile(helm_file):
+    if not snap_isfile(helm_file):
         return releases
     try:
-        with open(helm_file, "r") as f:
+        with snap_open(helm_file, "r") as f:
             lines = f.readlines()
     except Exception as e:
         log(f"Failed to read helm releases file: {e}")
@@ -833,6 +1317,7 @@ def read_helm_releases(folder):
             releases.add(parts[0])
     return releases
 
+@traced
 def log_top_fatal_error_warning(folder):
     log(f"Top 3 FATAL messages in {folder}:")
     top_fatals, top_errors, top_warnings = get_top_fatal_error_warning_messages(folder, top_n=3)
@@ -865,6 +1350,7 @@ def log_top_fatal_error_warning(folder):
 
     log("\n")
     
+@traced
 def log_top_errors_warnings(folder):
     log("Top 3 ERROR messages:")
     top_errors, top_warnings = get_top_errors_warnings(folder, top_n=3)
@@ -889,7 +1375,11 @@ def log_top_errors_warnings(folder):
     log("\n")
 
 def main(folder1, folder2, logfile_path):
-    global log_file
+    global log_file, JSON_FAST_PATH, COMPARED_FOLDERS
+    open_snapshot(folder1)
+    open_snapshot(folder2)
+    JSON_FAST_PATH = has_object_json(folder1) and has_object_json(folder2)
+    COMPARED_FOLDERS = (folder1, folder2)
     log_file = open(logfile_path, "w")
 
     def log(msg=""):
@@ -898,6 +1388,8 @@ def main(folder1, folder2, logfile_path):
     globals()['log'] = log
 
     log(f"Comparing folders:\n  Folder1: {folder1}\n  Folder2: {folder2}\n")
+    if JSON_FAST_PATH:
+        log(f"Object fields are read from {OBJECTS_DIR}/<type>.ndjson for the types both snapshots saved as JSON.\n")
 
     # 1. File names
     files1 = list_txt_files(folder1)
@@ -925,7 +1417,7 @@ def main(folder1, folder2, logfile_path):
     # 2. Resource counts
     resource_types = [
         "pods", "deployments", "statefulsets", "replicasets", "services",
-        "configmaps", "secrets", "ingresses", "nodes", "networkpolicies",
+        "configmaps", "secrets", INGRESS_TYPE, "nodes", "networkpolicies",
         "persistentvolumes", "persistentvolumeclaims", "roles", "rolebindings",
         "clusterroles", "clusterrolebindings", "ingressclasses"
     ]
@@ -940,6 +1432,14 @@ def main(folder1, folder2, logfile_path):
 
     log("\n")
 
+    object_changes = compare_object_indexes(folder1, folder2)
+    if object_changes is not None:
+        log("Objects in both snapshots (from the snapshot indexes):")
+        log(f"  Unchanged: {object_changes['unchanged']}, changed: {object_changes['changed']}")
+        for kind, namespace, name in object_changes["recreated"]:
+            log(f"  Recreated (new UID): {kind} {namespace + '/' if namespace else ''}{name}")
+        log("\n")
+
     # 3. Pod phases
     phases1 = count_pods_by_phase(folder1)
     phases2 = count_pods_by_phase(folder2)
@@ -1134,7 +1634,7 @@ def main(folder1, folder2, logfile_path):
     log("\n")
 
     # Ingress YAML diffs
-    ingress_diffs = diff_resource_yamls(folder1, folder2, "ingresses")
+    ingress_diffs = diff_resource_yamls(folder1, folder2, INGRESS_TYPE)
     log("Resource YAML differences for ingresses:")
     if ingress_diffs:
         for fname, diff_lines in ingress_diffs.items():
@@ -1175,7 +1675,12 @@ def main(folder1, folder2, logfile_path):
         #show_text_diff(folder1, folder2, "events/cluster_events.txt", log)
     else:
         log("  Event counts are the same.")
-    # Optionally diff event files if you want (not shown here for brevity)
+    summary1, summary2 = summarize_events(folder1), summarize_events(folder2)
+    if summary1 or summary2:
+        log("Event occurrences by type and reason (Folder1 / Folder2):")
+        for key in sorted(set(summary1) | set(summary2), key=lambda k: (k[0] != "Warning", k)):
+            marker = "  -> differs" if summary1[key] != summary2[key] else ""
+            log(f"  {key[0] or '-'}/{key[1] or '-'}: {summary1[key]} / {summary2[key]}{marker}")
     log("\n")
 
     log("Event Health Validation")
@@ -1223,11 +1728,17 @@ def main(folder1, folder2, logfile_path):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) not in [3,4]:
-        print("Usage: python3 compare_folders.py <folder1> <folder2> [logfile]")
-        sys.exit(1)
-    folder1 = sys.argv[1]
-    folder2 = sys.argv[2]
-    logfile = sys.argv[3] if len(sys.argv) == 4 else "comparison_log.txt"
-    main(folder1, folder2, logfile)
+    parser = argparse.ArgumentParser(description="Compare two cluster backup folders written by get_cluster_info*.py.")
+    parser.add_argument("folder1")
+    parser.add_argument("folder2")
+    parser.add_argument("logfile", nargs="?", default="comparison_log.txt")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record per-analyzer wall/CPU time, files read and peak memory to a JSON trace file "
+                             "and print a summary table.")
+    args = parser.parse_args()
+    if args.trace:
+        enable_tracing()
+    main(args.folder1, args.folder2, args.logfile)
+    if args.trace:
+        write_trace(args.trace)
 
@@ -2,8 +2,27 @@
 
 import subprocess
 import os
+import json
+import shutil
 import time
+import hashlib
 from datetime import datetime
+from urllib.parse import urlencode
+
+try:
+    import yaml  # PyYAML, optional: objects are written as JSON documents (valid YAML) without it
+except ImportError:
+    yaml = None
+
+
+# Objects per list request when streaming big resource types to disk (API 'limit' parameter)
+LIST_PAGE_SIZE = 500
+# A continue token expires (HTTP 410 Expired) once etcd compacts the revision the listing started
+# from; the listing is then started over this many times at most.
+LIST_RESTARTS = 3
+# API discovery is cached here between runs, per server version (same layout as get_cluster_info_v3.py)
+STATE_DIR = ".k8s_collector_state"
+DISCOVERY_CACHE_TTL = 6 * 3600
 
 
 def create_incremental_path(base_path):
@@ -23,19 +42,155 @@ def create_incremental_path(base_path):
         counter += 1
 
 
-def run_cmd(cmd):
-    """Run shell command and return output. Local execution only."""
+def run_cmd(cmd, errors=None):
+    """
+    Run shell command and return output. Local execution only.
+    With an errors list, a failure's stderr is appended to it instead of printed.
+    """
     result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     if result.returncode != 0:
-        print(f"Error running command: {cmd}\n{result.stderr}")
+        if errors is not None:
+            errors.append(result.stderr)
+        else:
+            print(f"Error running command: {cmd}\n{result.stderr}")
         return None
     return result.stdout.strip()
 
 
+def is_expired_continue(stderr):
+    """True when kubectl failed because the continue token of a paged list expired (HTTP 410)."""
+    return "(Expired)" in stderr or "continuation parameter is too old" in stderr
+
+
+_list_paths = {}
+
+
+def discover_list_paths():
+    """
+    Fill _list_paths (resource alias, incl. <plural>.<group> -> cluster-wide list path) through
+    'kubectl get --raw'. The result is cached in STATE_DIR for DISCOVERY_CACHE_TTL, keyed by the
+    server version and the served group versions.
+    """
+    group_versions = ["v1"]
+    groups = run_cmd("kubectl get --raw /apis")
+    if groups:
+        for group in json.loads(groups).get("groups", []):
+            preferred = group.get("preferredVersion") or (group.get("versions") or [{}])[0]
+            if preferred.get("groupVersion"):
+                group_versions.append(preferred["groupVersion"])
+    version = json.loads(run_cmd("kubectl get --raw /version") or "{}").get("gitVersion", "unknown")
+    key = hashlib.sha1(json.dumps([version] + group_versions).encode()).hexdigest()[:16]
+    cache_path = os.path.join(STATE_DIR, "discovery", f"list_paths_{version.replace('/', '_')}_{key}.json")
+    if os.path.isfile(cache_path) and time.time() - os.path.getmtime(cache_path) < DISCOVERY_CACHE_TTL:
+        with open(cache_path, "r") as f:
+            _list_paths.update(json.load(f))
+        return
+    complete = True
+    for gv in group_versions:
+        prefix = "/api/v1" if gv == "v1" else f"/apis/{gv}"
+        output = run_cmd(f"kubectl get --raw {prefix}")
+        if not output:
+            complete = False
+            continue
+        group = gv.rsplit("/", 1)[0] if "/" in gv else ""
+        for res in json.loads(output).get("resources", []):
+            if "/" in res["name"] or "list" not in res.get("verbs", []):
+                continue
+            path = f"{prefix}/{res['name']}"
+            for alias in [res["name"], res.get("singularName") or res.get("kind", "").lower()] + (res.get("shortNames") or []):
+                _list_paths.setdefault(alias, path)
+                if group:
+                    _list_paths.setdefault(f"{alias}.{group}", path)
+    if complete:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(_list_paths, f)
+
+
+def get_list_path(resource_type):
+    """Resolve a resource type (plural, singular or short name) to its cluster-wide REST list path."""
+    if not _list_paths:
+        discover_list_paths()
+    return _list_paths.get(resource_type.lower())
+
+
+def get_listable_resource_types():
+    """
+    One name per listable resource type the server serves, custom resources included: the plural,
+    or <plural>.<group> when an earlier group already uses that plural.
+    """
+    if not _list_paths:
+        discover_list_paths()
+    names, seen_paths = [], set()
+    for path in _list_paths.values():
+        if path in seen_paths:
+            continue
+        seen_paths.add(path)
+        parts = path.split("/")  # /api/v1/<plural> or /apis/<group>/<version>/<plural>
+        plural = parts[-1]
+        names.append(plural if plural not in names else f"{plural}.{parts[2]}")
+    return names
+
+
+def iter_resource_pages(resource_type, page_size=None):
+    """
+    Yield lists of objects of resource_type, one API page (limit/continue) at a time,
+    so only a single page is ever held in memory. Items get kind/apiVersion filled in
+    from the list, as 'kubectl get -o yaml' shows them.
+    When the continue token expires mid-listing, the listing starts over and skips the
+    objects (by uid) that were already yielded.
+    """
+    path = get_list_path(resource_type)
+    if not path:
+        print(f"Unknown resource type: {resource_type}")
+        return
+    token = None
+    seen = set()
+    restarts = 0
+    while True:
+        params = {"limit": page_size or LIST_PAGE_SIZE}
+        if token:
+            params["continue"] = token
+        cmd = f"kubectl get --raw '{path}?{urlencode(params)}'"
+        errors = []
+        output = run_cmd(cmd, errors)
+        if output is None and token and is_expired_continue(errors[0]) and restarts < LIST_RESTARTS:
+            # kubectl --raw does not pass on the Status body, so its inconsistent continue token is
+            # not available: list again from the start.
+            restarts += 1
+            print(f"Listing {resource_type}: continue token expired (HTTP 410), restarting the listing "
+                  f"({len(seen)} objects already saved are skipped)")
+            token = None
+            continue
+        if output is None:
+            print(f"Error running command: {cmd}\n{errors[0]}")
+            print(f"Listing {resource_type} stopped early (request failed)")
+            return
+        page = json.loads(output)
+        del output
+        kind = page.get("kind", "")
+        kind = kind[:-4] if kind.endswith("List") else kind
+        items = []
+        for item in page.get("items", []):
+            uid = (item.get("metadata") or {}).get("uid")
+            if uid and uid in seen:
+                continue
+            seen.add(uid)
+            item.setdefault("apiVersion", page.get("apiVersion"))
+            item.setdefault("kind", kind)
+            items.append(item)
+        yield items
+        token = (page.get("metadata") or {}).get("continue")
+        if not token:
+            return
+
+
 def save_resource_yaml_all_namespaces(resource_type, base_dir):
     """
     Saves all resources of a specific type across all namespaces 
     into a single YAML file within an incremental folder structure.
+    Objects are listed in pages of LIST_PAGE_SIZE and streamed to the file
+    as one YAML document each, so memory stays flat for huge types.
     """
     # Create category directory (e.g., base/yamls/pods/)
     yaml_dir = os.path.join(base_dir, "resources_yaml", resource_type)
@@ -46,17 +201,26 @@ def save_resource_yaml_all_namespaces(resource_type, base_dir):
     
     print(f"Exporting all {resource_type} to YAML...")
     
-    # The command requested: kubectl get <resource> -A -o yaml
-    cmd = f"kubectl get {resource_type} -A -o yaml"
-    output = run_cmd(cmd)
-    
-    if output:
-        with open(filepath, "w") as f:
-            f.write(f"# Generated at: {datetime.now()}\n")
-            f.write(f"# Command: {cmd}\n---\n")
-            f.write(output)
-    else:
+    count = 0
+    with open(filepath, "w") as f:
+        f.write(f"# Generated at: {datetime.now()}\n")
+        f.write(f"# Command: kubectl get {resource_type} -A -o yaml (paged, {LIST_PAGE_SIZE} per request)\n")
+        for items in iter_resource_pages(resource_type):
+            for item in items:
+                f.write("---\n")
+                if yaml is not None:
+                    yaml.safe_dump(item, f, default_flow_style=False, sort_keys=False)
+                else:
+                    f.write(json.dumps(item, indent=2))
+                    f.write("\n")
+                count += 1
+            f.flush()
+
+    if count == 0:
         print(f"No resources found or error for: {resource_type}")
+        shutil.rmtree(yaml_dir)  # keep empty types out of the backup
+    else:
+        print(f"Exported {count} {resource_type} to {filepath}")
 
 def get_node_name():
     # Try to get node name from environment or hostname
@@ -731,6 +895,8 @@ def main():
     base_dir = create_incremental_path(base_dir_name)
     os.makedirs(base_dir, exist_ok=True)
 
+    namespaces = get_all_namespaces()
+
     invalid_prefixes = ("c-m", "p-", "user-", "u-")
     # Get logs for all pods in all namespaces (cluster-wide, local kubectl)
     for ns in namespaces:
@@ -739,34 +905,10 @@ def main():
             for pod in pods:
                 save_logs(ns, pod, date_str, base_dir)
                 
-    # Define resource types to capture
-    # These will be saved as one big YAML per type (efficient)
-    resource_types = [
-        "nodes",
-        "users",
-        "projects",
-        "namespaces",
-        "pods",
-        "deployments",
-        "statefulsets",
-        "services",
-        "configmaps",
-        "secrets",
-        "ingress",
-        "machines",
-        "machinedeployments",
-        "machinesets",
-        "persistentvolumes",
-        "persistentvolumeclaims",
-        "customresourcedefinitions",
-        "mutatingwebhookconfigurations",
-        "validatingwebhookconfigurations",
-        "roles",
-        "rolebindings",
-        "clusterroles",
-        "clusterrolebindings",
-        "projectroletemplatebindings",
-    ]
+    # Capture every listable resource type the API server serves (custom resources included),
+    # one paged cluster-wide list per type saved as one YAML file; empty types leave nothing behind.
+    # Events are saved separately by save_cluster_events.
+    resource_types = [res for res in get_listable_resource_types() if res.split(".")[0] != "events"]
 
     for res in resource_types:
         save_resource_yaml_all_namespaces(res, base_dir)
@@ -2,36 +2,1386 @@
 
 import subprocess
 import os
+import sys
+import re
+import ssl
+import json
 import time
-from datetime import datetime
+import io
+import queue
+import signal
+import socket
+import asyncio
+import shutil
+import atexit
+import base64
+import zlib
+import gzip
+import hashlib
+import argparse
+import functools
+import tracemalloc
+import shlex
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import http.client
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, urlencode, quote
 
+try:
+    import yaml  # PyYAML, optional: YAML sections fall back to JSON (valid YAML) without it
+except ImportError:
+    yaml = None
 
-def create_incremental_path(base_path):
+try:
+    import zstandard  # optional, only needed for --compress zstd
+except ImportError:
+    zstandard = None
+
+
+# Collection engine settings, overridden from the command line in main().
+# Each run talks to a single API server, so API_QPS is the per-API-server cap.
+MAX_WORKERS = 8
+API_QPS = 20.0
+# Bulk mode: one cluster-wide (paged) list per type, split locally into describe files.
+BULK_MODE = False
+# Objects per list request (API limit/continue paging), so huge types never sit in memory whole.
+LIST_PAGE_SIZE = 500
+# Transport for API reads: "kubectl" forks kubectl per call, "api" uses the in-process KubeApiClient.
+TRANSPORT = "kubectl"
+_api_client = None
+# Collector state kept between runs (discovery cache), relative to the working directory by default.
+STATE_DIR = ".k8s_collector_state"
+DISCOVERY_CACHE_TTL = 6 * 3600  # seconds, like kubectl's discovery cache
+
+# Pod log capture options, set from the command line in main(). None disables a window/cap.
+LOG_OPTIONS = {
+    "since": None,        # kubectl-style duration, e.g. "2h" or "90m"
+    "limit_bytes": None,  # per container stream
+    "tail_lines": None,   # last N lines
+    "head_lines": None,   # first N lines
+    "previous": False,    # also capture the previous instance of restarted containers
+    "timeout": 300,       # seconds per container stream
+}
+LOG_CHUNK_SIZE = 64 * 1024
+
+# Node-level command execution (save_detailed_system_info), set from the command line in main().
+HOST_COMMAND_OPTIONS = {
+    "concurrency": 8,
+    "timeout": 60,                   # seconds per command
+    "budget": 300,                   # seconds for the whole batch; commands not started by then are skipped
+    "max_output": 16 * 1024 * 1024,  # bytes of stdout kept per command
+}
+
+# Per-file compression of snapshot output ("gzip" or "zstd"); files get a .gz/.zst suffix.
+COMPRESSION = None
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+_api_rate_lock = threading.Lock()
+_api_next_slot = 0.0
+
+
+def create_incremental_path(base_path, suffixes=("",)):
     """
     Creates a unique path by appending an incremental number.
     e.g., 'file.txt', 'file_1.txt', 'file_2.txt'
+    A path counts as taken when it exists with any of suffixes appended.
     """
-    if not os.path.exists(base_path):
+    if not any(os.path.exists(base_path + suffix) for suffix in suffixes):
         return base_path
 
     name, ext = os.path.splitext(base_path)
     counter = 1
     while True:
         new_path = f"{name}_{counter}{ext}"
-        if not os.path.exists(new_path):
+        if not any(os.path.exists(new_path + suffix) for suffix in suffixes):
             return new_path
         counter += 1
 
 
+# Opt-in tracing (--trace FILE): one span per collection step (wall/CPU time, bytes written,
+# tracemalloc peak, commands issued) plus the latency of every kubectl/helm/API/host command.
+class Tracer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.spans = []
+        self.commands = []
+        self.outputs = []  # files written, sized when the enclosing span ends
+        self.local = threading.local()  # span nesting depth of each thread
+        self.open_spans = 0  # in all threads; the tracemalloc peak is reset when the first one opens
+        self.mem_peak = 0
+        tracemalloc.start()
+
+    def record_command(self, kind, command, duration, ok=True, nbytes=None):
+        with self.lock:
+            self.commands.append({"kind": kind, "command": command[:300], "start": time.monotonic() - self.started,
+                                  "duration": duration, "ok": ok, "bytes": nbytes})
+
+    def record_output(self, path):
+        with self.lock:
+            self.outputs.append(path)
+
+    @contextmanager
+    def span(self, name):
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        with self.lock:
+            outer = self.open_spans == 0
+            self.open_spans += 1
+            if outer:
+                tracemalloc.reset_peak()
+            first_output, first_command = len(self.outputs), len(self.commands)
+        start, cpu_start = time.monotonic(), time.process_time()
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            mem_peak = tracemalloc.get_traced_memory()[1]
+            with self.lock:
+                self.open_spans -= 1
+                self.mem_peak = max(self.mem_peak, mem_peak)
+                outputs, commands = self.outputs[first_output:], len(self.commands) - first_command
+            written = sum(stored_size(path) for path in outputs)
+            with self.lock:
+                self.spans.append({
+                    "name": name, "depth": depth, "start": start - self.started,
+                    "wall": time.monotonic() - start, "cpu": time.process_time() - cpu_start,
+                    "files_written": len(outputs), "bytes_written": written, "commands": commands,
+                    "mem_peak": mem_peak if outer else None,
+                })
+
+    def write(self, path):
+        wall = time.monotonic() - self.started
+        trace = {"wall": wall, "cpu": time.process_time(),
+                 "mem_peak": max(self.mem_peak, tracemalloc.get_traced_memory()[1]),
+                 "spans": self.spans, "commands": self.commands}
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=1)
+        print(f"\nTrace written to {path} (total {wall:.1f}s wall, {trace['cpu']:.1f}s CPU, "
+              f"peak traced memory {trace['mem_peak'] / 2**20:.1f} MiB)")
+        print(f"{'step':<34}{'wall s':>9}{'cpu s':>9}{'MB out':>9}{'files':>7}{'cmds':>7}{'peak MiB':>10}")
+        for span in sorted(self.spans, key=lambda sp: -sp["wall"]):
+            peak = f"{span['mem_peak'] / 2**20:.1f}" if span["mem_peak"] is not None else "-"
+            print(f"{'  ' * span['depth'] + span['name']:<34.34}{span['wall']:>9.2f}{span['cpu']:>9.2f}"
+                  f"{span['bytes_written'] / 1e6:>9.2f}{span['files_written']:>7}{span['commands']:>7}{peak:>10}")
+        by_kind = {}
+        for command in self.commands:
+            by_kind.setdefault(command["kind"], []).append(command["duration"])
+        print(f"\n{'command kind':<14}{'count':>7}{'total s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for kind, durations in sorted(by_kind.items(), key=lambda item: -sum(item[1])):
+            durations.sort()
+            pick = lambda q: durations[min(len(durations) - 1, int(q * len(durations)))] * 1000
+            print(f"{kind:<14}{len(durations):>7}{sum(durations):>10.2f}{pick(0.5):>9.0f}{pick(0.95):>9.0f}"
+                  f"{durations[-1] * 1000:>9.0f}")
+        print("\nSlowest commands:")
+        for command in sorted(self.commands, key=lambda c: -c["duration"])[:10]:
+            print(f"  {command['duration']:8.2f}s  {command['kind']:<8} {command['command'][:100]}")
+
+
+TRACER = None
+
+
+def enable_tracing():
+    global TRACER
+    TRACER = Tracer()
+
+
+@contextmanager
+def trace_span(name):
+    if TRACER is None:
+        yield
+    else:
+        with TRACER.span(name):
+            yield
+
+
+def traced(func):
+    """Run a collection step inside a trace span named after it (no-op unless --trace)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with trace_span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# Checkpoint journal: checkpoint.ndjson in the snapshot root gets a line per finished work unit
+# (a collection step, a described object or listed type, a pod's logs, a node) with the sizes of
+# the files the unit wrote, the manifest entries it recorded and its objects/*.ndjson lines, which
+# sit in shared files that a crash can leave short. --resume continues an unfinished
+# snapshot: units whose files are still intact are skipped, everything else is collected again.
+CHECKPOINT_FILE = "checkpoint.ndjson"
+CHECKPOINT = None
+_unit_state = threading.local()  # stack of (outputs, manifest entries, JSON lines) of this thread's units
+_shared_outputs = set()          # files written by many units (objects/*.ndjson), verified by none
+
+
+class Checkpoint:
+    """Journal of the finished units of one snapshot; load=True reads and verifies an existing one."""
+
+    def __init__(self, base_dir, load=False):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, CHECKPOINT_FILE)
+        self.lock = threading.Lock()
+        self.done = {}
+        if load and os.path.isfile(self.path):
+            self._load()
+        self.file = open(self.path, "a")
+        if self.file.tell():
+            self.file.write("\n")  # the last line may have been cut off mid-write
+
+    def _load(self):
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "unit" in entry:
+                    self.done[entry["unit"]] = entry
+        intact = {unit: entry for unit, entry in self.done.items()
+                  if all(stored_size(os.path.join(self.base_dir, rel)) == size for rel, size in entry["files"].items())}
+        print(f"Checkpoint: {len(intact)} finished units to skip, {len(self.done) - len(intact)} to redo "
+              f"(files missing or partial)")
+        self.done = intact
+        for entry in intact.values():
+            for rel_path, manifest_entry in entry.get("objects", {}).items():
+                record_object(rel_path, **manifest_entry)
+            for describe_type, lines in entry.get("json", {}).items():
+                _resumed_object_json.setdefault(describe_type, []).extend(lines)
+
+    def completed(self, unit):
+        return unit in self.done
+
+    def record(self, unit, outputs, objects, json_lines):
+        files = {}
+        for path in outputs:
+            if path not in _shared_outputs:
+                files[os.path.relpath(path, self.base_dir)] = stored_size(path)
+        entry = {"unit": unit, "files": files}
+        if objects:
+            entry["objects"] = objects
+        if json_lines:
+            entry["json"] = json_lines
+        if PACK:
+            PACK.commit()  # the unit's members must outlive a crash before the journal says it is done
+        with self.lock:
+            self.done[unit] = entry
+            self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.file.flush()
+
+    def finish(self, complete=True):
+        with self.lock:
+            if complete:
+                self.file.write(json.dumps({"complete": datetime.now().isoformat(timespec="seconds")}) + "\n")
+            self.file.close()
+
+
+def start_checkpoint(base_dir, resume=False):
+    """Open base_dir's checkpoint journal; when resuming, drop half-written files and load it."""
+    global CHECKPOINT
+    if resume and not PACK:
+        for dirpath, _, filenames in os.walk(base_dir):
+            for filename in filenames:
+                if filename.endswith((".tmp", ".part")):
+                    os.remove(os.path.join(dirpath, filename))
+    CHECKPOINT = Checkpoint(base_dir, load=resume)
+
+
+def finish_checkpoint(complete=True):
+    """Close the journal; without `complete` the snapshot stays unfinished, so --resume picks it up."""
+    global CHECKPOINT
+    checkpoint, CHECKPOINT = CHECKPOINT, None
+    checkpoint.finish(complete)
+    return checkpoint.path
+
+
+def find_unfinished_snapshot(node_name):
+    """Most recent k8s_backup_<node>_* folder whose checkpoint journal has no completion line."""
+    candidates = []
+    for entry in os.listdir("."):
+        path = os.path.join(entry, CHECKPOINT_FILE)
+        if not entry.startswith(f"k8s_backup_{node_name}_") or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 4096))
+            tail = f.read().decode("utf-8", errors="replace")
+        if '"complete"' not in tail:
+            candidates.append((os.path.getmtime(path), entry))
+    return max(candidates)[1] if candidates else None
+
+
+# Triage budget (--budget): collection_plan() steps run by priority instead of in their usual
+# order, and no unit starts once the deadline has passed. collection.json lists what was and
+# wasn't collected; a snapshot cut short keeps its journal unfinished, so --resume (with or
+# without a new budget) collects the rest.
+COLLECTION_REPORT_FILE = "collection.json"
+BUDGET = None
+_budget_started = None
+_deadline = None
+_budget_report = {"skipped": [], "interrupted": []}
+
+
+def configure_budget(seconds=None):
+    """
+    Start the --budget clock. The per-stream log timeout and the host command batch budget
+    are clamped to it, so a single step cannot be configured to outlast the whole run.
+    """
+    global BUDGET, _budget_started, _deadline
+    BUDGET = seconds or None
+    _budget_started = time.monotonic()
+    _deadline = _budget_started + seconds if seconds else None
+    if seconds:
+        for options, key in ((LOG_OPTIONS, "timeout"), (HOST_COMMAND_OPTIONS, "budget")):
+            options[key] = min(options[key] or seconds, seconds)
+
+
+def past_deadline():
+    return _deadline is not None and time.monotonic() >= _deadline
+
+
+def budget_remaining():
+    """Seconds left before the --budget deadline (0 once passed), or None without a budget."""
+    return None if _deadline is None else max(0.0, _deadline - time.monotonic())
+
+
+def cut_at_deadline(what):
+    """
+    Note that the running unit stopped `what` at the --budget deadline: the unit is left out
+    of the journal and reported as interrupted, so --resume collects it again in full.
+    """
+    unit = current_unit()
+    if unit is not None:
+        unit[3].append(what)
+
+
+def skip_unit(unit):
+    """Leave `unit` uncollected; a skipped describe is dropped from the manifest as well."""
+    _budget_report["skipped"].append(unit)
+    kind, _, key = unit.partition(":")
+    if kind == "describe":
+        describe_type, namespace, name = key.split("/")
+        forget_object(describe_rel_path(describe_type, name, namespace or None))
+
+
+def write_collection_report(base_dir):
+    """Write collection.json; returns True if nothing was left out."""
+    skipped = sorted(_budget_report["skipped"])
+    interrupted = sorted(_budget_report["interrupted"])
+    report = {
+        "budget_seconds": BUDGET,
+        "elapsed_seconds": round(time.monotonic() - _budget_started, 1),
+        "complete": not skipped and not interrupted,
+        "collected": sorted(CHECKPOINT.done),
+        # running at the deadline while work they started was skipped; --resume redoes them
+        "interrupted": interrupted,
+        "skipped": skipped,
+    }
+    with open_plain_output(os.path.join(base_dir, COLLECTION_REPORT_FILE)) as f:
+        json.dump(report, f, indent=1)
+    if report["complete"]:
+        print(f"Collected all {len(report['collected'])} units" + (" within the budget" if BUDGET else ""))
+    else:
+        print(f"Deadline reached after {report['elapsed_seconds']}s: {len(report['collected'])} units collected, "
+              f"{len(interrupted)} interrupted, {len(skipped)} skipped (see {COLLECTION_REPORT_FILE}); "
+              f"--resume collects the rest")
+    return report["complete"]
+
+
+def run_unit(unit, func, args):
+    """
+    func(*args) as checkpoint unit `unit`; returns None without running it if already done,
+    or once the --budget deadline has passed.
+    """
+    if past_deadline():
+        skip_unit(unit)
+        return None
+    if CHECKPOINT is None:
+        return func(*args)
+    if CHECKPOINT.completed(unit):
+        return None
+    skipped = len(_budget_report["skipped"])
+    stack = _unit_state.__dict__.setdefault("stack", [])
+    stack.append((set(), {}, {}, []))
+    try:
+        result = func(*args)
+    finally:
+        outputs, objects, json_lines, cut = stack.pop()
+    if cut or unit.startswith("step:") and len(_budget_report["skipped"]) > skipped:
+        # A step fans out into units of their own, and some may have been skipped (skips in
+        # other threads count too, so this errs towards redoing it), or the unit itself was
+        # cut off at the deadline: leave it out of the journal.
+        _budget_report["interrupted"].append(unit)
+        return result
+    CHECKPOINT.record(unit, outputs, objects, json_lines)
+    return result
+
+
+def checkpointed(func):
+    """Make a collection step one checkpoint unit, named after it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return run_unit(f"step:{func.__name__}", functools.partial(func, **kwargs), args)
+    return wrapper
+
+
+def current_unit():
+    """(outputs, manifest entries, JSON lines, deadline cuts) of the unit running in this thread, or None."""
+    stack = getattr(_unit_state, "stack", None)
+    return stack[-1] if stack else None
+
+
+def note_output(path):
+    if TRACER:
+        TRACER.record_output(re.sub(r"\.(tmp|part)$", "", path))  # sized after the rename into place
+    unit = current_unit()
+    if unit is not None:
+        unit[0].add(re.sub(r"\.(tmp|part)$", "", path))
+
+
+def output_path(path):
+    """Name a snapshot file is written under with the current COMPRESSION."""
+    return path + COMPRESSION_SUFFIXES.get(COMPRESSION, "")
+
+
+def open_compressed(path, mode="w"):
+    """Open path for writing through the COMPRESSION codec (plain file when off)."""
+    note_output(path)
+    binary = "b" in mode
+    member = PACK.member(path) if PACK else None
+    if COMPRESSION == "gzip":
+        if member is None:
+            writer = gzip.open(path, "wb", compresslevel=6)
+        else:
+            writer = gzip.GzipFile(fileobj=member, mode="wb", compresslevel=6)
+            writer.myfileobj = member  # closed, and so stored, together with the gzip stream
+        return writer if binary else io.TextIOWrapper(writer, encoding="utf-8")
+    if COMPRESSION == "zstd":
+        writer = zstandard.ZstdCompressor(level=3).stream_writer(member or open(path, "wb"))
+        return writer if binary else io.TextIOWrapper(writer, encoding="utf-8")
+    if member is not None:
+        return member if binary else io.TextIOWrapper(member, encoding="utf-8")
+    return open(path, mode)
+
+
+def open_output(path, mode="w"):
+    """open() for snapshot files: writes output_path(path), compressed when --compress is set."""
+    return open_compressed(output_path(path), mode)
+
+
+def open_plain_output(path, mode="w"):
+    """open() for uncompressed snapshot files such as manifest.json and the node bookmarks."""
+    note_output(path)
+    member = PACK.member(path) if PACK else None
+    if member is None:
+        return open(path, mode)
+    return member if "b" in mode else io.TextIOWrapper(member, encoding="utf-8")
+
+
+def finish_output(tmp_path, final_path):
+    """Move a completely written .tmp/.part output into place."""
+    if PACK and PACK.member_name(final_path):
+        PACK.rename(tmp_path, final_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+
+def discard_output(tmp_path):
+    """Drop a .tmp/.part output that failed or came out empty."""
+    if PACK and PACK.member_name(tmp_path):
+        PACK.remove(tmp_path)
+    else:
+        os.remove(tmp_path)
+
+
+def stored_size(path):
+    """Size of a written snapshot file on disk or in the pack, 0 if it isn't there."""
+    if PACK and PACK.member_name(path):
+        return PACK.size(path)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+# Single-file storage (--storage pack): the snapshot goes into <folder>.pack instead of a folder
+# tree, so 200k small files cost one inode and copying or scanning a snapshot is sequential I/O.
+# The pack is an SQLite database with a row per file under the snapshot folder; the writer helpers
+# above (open_compressed, open_plain_output, finish_output, discard_output) redirect those paths
+# into it, and write_snapshot_index() adds the index tables to the same database.
+# cluster_validation_v3.py opens a .pack wherever it takes a snapshot folder.
+PACK_SUFFIX = ".pack"
+PACK_SPOOL_BYTES = 8 * 2**20  # members are buffered in memory up to this size, then in a temp file
+PACK_COMMIT_EVERY = 500       # members per transaction
+STORAGE = "dir"
+PACK = None
+
+
+class PackMember(io.BufferedIOBase):
+    """A pack file being written. It is spooled until close() stores it in the pack."""
+
+    def __init__(self, pack, name):
+        super().__init__()
+        self.pack = pack
+        self.name = name
+        self.spool = tempfile.SpooledTemporaryFile(PACK_SPOOL_BYTES)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.spool.write(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.pack.put(self.name, self.spool)
+        finally:
+            self.spool.close()
+            super().close()
+
+
+class SnapshotPack:
+    """Writer side of a .pack file: members keyed by their path relative to the snapshot folder."""
+
+    def __init__(self, path, root):
+        self.path = path
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA synchronous = OFF;
+            PRAGMA journal_mode = WAL;  -- cheap commits; folded back into the one file on close()
+            CREATE TABLE IF NOT EXISTS members (
+                path TEXT PRIMARY KEY,  -- relative to the snapshot folder, compression suffix included
+                data BLOB NOT NULL,
+                mtime REAL NOT NULL
+            );
+        """)
+
+    def member_name(self, path):
+        """Name of path inside the pack, or None for files outside the snapshot folder."""
+        path = os.path.abspath(path)
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path[len(self.root) + 1:].replace(os.sep, "/")
+
+    def member(self, path):
+        name = self.member_name(path)
+        return PackMember(self, name) if name else None
+
+    def put(self, name, spool):
+        size = spool.tell()
+        spool.seek(0)
+        with self.lock:
+            if size <= PACK_SPOOL_BYTES or not hasattr(self.db, "blobopen"):
+                self.db.execute("INSERT OR REPLACE INTO members VALUES (?, ?, ?)", (name, spool.read(), time.time()))
+            else:
+                # Big members (logs) are streamed into the row instead of being read into memory
+                rowid = self.db.execute("INSERT OR REPLACE INTO members VALUES (?, zeroblob(?), ?)",
+                                        (name, size, time.time())).lastrowid
+                with self.db.blobopen("members", "data", rowid) as blob:
+                    shutil.copyfileobj(spool, blob, LOG_CHUNK_SIZE)
+            self._maybe_commit()
+
+    def rename(self, src_path, dest_path):
+        src, dest = self.member_name(src_path), self.member_name(dest_path)
+        with self.lock:
+            self.db.execute("DELETE FROM members WHERE path = ?", (dest,))
+            self.db.execute("UPDATE members SET path = ? WHERE path = ?", (dest, src))
+            self._maybe_commit()
+
+    def remove(self, path):
+        with self.lock:
+            self.db.execute("DELETE FROM members WHERE path = ?", (self.member_name(path),))
+
+    def size(self, path):
+        with self.lock:
+            row = self.db.execute("SELECT length(data) FROM members WHERE path = ?",
+                                  (self.member_name(path),)).fetchone()
+        return row[0] if row else 0
+
+    def exists(self, path):
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM members WHERE path = ?",
+                                   (self.member_name(path),)).fetchone() is not None
+
+    def read(self, path):
+        with self.lock:
+            row = self.db.execute("SELECT data FROM members WHERE path = ?", (self.member_name(path),)).fetchone()
+        return row[0] if row else None
+
+    def sizes(self):
+        """(name, stored size) of every member."""
+        with self.lock:
+            return self.db.execute("SELECT path, length(data) FROM members").fetchall()
+
+    def _maybe_commit(self):
+        self.pending += 1
+        if self.pending >= PACK_COMMIT_EVERY:
+            self.db.commit()
+            self.pending = 0
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self):
+        """Drop members left half-written (.tmp/.part) and commit; safe to call twice."""
+        if self.db is None:
+            return
+        with self.lock:
+            self.db.execute("DELETE FROM members WHERE path LIKE '%.tmp' OR path LIKE '%.part'")
+            self.db.commit()
+            self.db.execute("PRAGMA journal_mode = DELETE")
+            self.db.close()
+            self.db = None
+
+
+def configure_storage(storage):
+    """Select where snapshots are written: "dir" (a folder tree) or "pack" (one SQLite file)."""
+    global STORAGE
+    STORAGE = storage
+
+
+def open_pack(base_dir):
+    """Start writing the files under base_dir into base_dir + PACK_SUFFIX."""
+    global PACK
+    PACK = SnapshotPack(base_dir + PACK_SUFFIX, base_dir)
+    atexit.register(PACK.close)  # also on early returns; a pack is readable once committed
+    return PACK.path
+
+
+def close_pack(base_dir):
+    """Finish the pack and remove the (now empty) directories the save_* steps created."""
+    global PACK
+    pack, PACK = PACK, None
+    pack.close()
+    for dirpath, _, _ in sorted(os.walk(base_dir), key=lambda entry: -len(entry[0])):
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass  # something wrote a real file here
+    return pack.path
+
+
 def run_cmd(cmd):
-    """Run shell command and return output. Local execution only."""
-    result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    """
+    Run shell command and return output. Local execution only. kubectl/helm commands take an
+    API_THROTTLE slot, and are retried when they fail because the API server throttled them.
+    """
+    api = is_api_cmd(cmd)
+    for attempt in range(THROTTLE_RETRIES + 1):
+        if api:
+            wait_for_api_slot()
+            started = API_THROTTLE.acquire()
+        start = time.monotonic()
+        result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if TRACER:
+            kind = cmd.split()[0] if api else "shell"
+            TRACER.record_command(kind, cmd, time.monotonic() - start, result.returncode == 0, len(result.stdout))
+        if not api:
+            break
+        reason = throttle_signal(result.stderr)
+        API_THROTTLE.release(started, reason, kind=request_kind(cmd))
+        if not reason or result.returncode == 0 or attempt == THROTTLE_RETRIES:
+            break
+        throttle_backoff(attempt)
     if result.returncode != 0:
         print(f"Error running command: {cmd}\n{result.stderr}")
         return None
     return result.stdout.strip()
 
 
+def configure_engine(max_workers=None, api_qps=None, bulk=None, page_size=None):
+    """Set the worker pool size, the API server request rate cap (requests/sec, 0 disables it), bulk mode and list page size."""
+    global MAX_WORKERS, API_QPS, BULK_MODE, LIST_PAGE_SIZE, API_THROTTLE
+    if max_workers is not None:
+        MAX_WORKERS = max(1, max_workers)
+        API_THROTTLE = ApiThrottle(MAX_WORKERS)
+    if api_qps is not None:
+        API_QPS = max(0.0, api_qps)
+    if bulk is not None:
+        BULK_MODE = bulk
+    if page_size is not None:
+        LIST_PAGE_SIZE = max(1, page_size)
+
+
+def configure_output(compression=None):
+    """Select per-file compression of snapshot output: None, "gzip" or "zstd"."""
+    global COMPRESSION
+    if compression == "zstd" and zstandard is None:
+        raise SystemExit("--compress zstd needs the 'zstandard' package (pip install zstandard)")
+    COMPRESSION = compression
+
+
+def configure_state(state_dir):
+    """Set the directory for state kept between runs ('' or None disables the on-disk caches)."""
+    global STATE_DIR
+    STATE_DIR = state_dir
+
+
+def is_api_cmd(cmd):
+    """True for commands that hit the API server (kubectl/helm)."""
+    return cmd.lstrip().startswith(("kubectl", "helm"))
+
+
+def wait_for_api_slot():
+    """Block until the API_QPS rate cap allows another API server request."""
+    global _api_next_slot
+    if API_QPS <= 0:
+        return
+    with _api_rate_lock:
+        now = time.monotonic()
+        slot = max(now, _api_next_slot)
+        _api_next_slot = slot + 1.0 / API_QPS
+    if slot > now:
+        time.sleep(slot - now)
+
+
+# Adaptive concurrency against the API server (AIMD): each kubectl/helm command and API request
+# holds one of `limit` slots, on top of the API_QPS rate cap. A throttling signal halves the limit,
+# once per round of requests in flight; a throttled request is retried after an exponential
+# backoff, and a Retry-After from the server holds back every request. Each clean response adds
+# 1/limit, so the limit grows back by one per round of requests, up to --workers.
+# Signals: HTTP 429/503, the matching kubectl errors, client-side rate limiter messages, and a
+# response SLOW_RESPONSE_FACTOR times slower than the usual latency of its kind of request.
+THROTTLE_PATTERN = re.compile(
+    r"TooManyRequests|too many requests|ServiceUnavailable|the server is currently unable to handle the request|"
+    r"client rate limiter|client-side throttling|would exceed context deadline|"
+    r"the server was unable to return a response in the time allotted", re.IGNORECASE)
+THROTTLE_RETRIES = 5
+THROTTLE_BACKOFF = 0.5       # seconds before the first retry of a throttled request, doubling after that
+THROTTLE_BACKOFF_MAX = 30.0
+SLOW_RESPONSE_FACTOR = 4.0
+SLOW_RESPONSE_FLOOR = 1.0    # seconds; faster responses never count as slow
+
+
+def throttle_signal(stderr):
+    """The line of kubectl/helm stderr that says the request was throttled, or None."""
+    for line in (stderr or "").splitlines():
+        if THROTTLE_PATTERN.search(line):
+            return line.strip()[:200]
+    return None
+
+
+# kubectl/helm flags that take the next word as their value
+_VALUE_FLAGS = {"-n", "--namespace", "-o", "--output", "-l", "--selector", "--field-selector", "-c", "--container",
+                "--context", "--kubeconfig", "--since", "--tail", "--limit-bytes", "--chunk-size", "--sort-by"}
+
+
+def api_request_kind(path, params=None):
+    """
+    Latency class of an API request for ApiThrottle: what it does (list, get or watch) and
+    to which resource, so a cluster-wide list is not held against the time a single get takes.
+    """
+    parts = path.split("?")[0].strip("/").split("/")
+    if parts[0] == "api":
+        rest = parts[2:]
+    elif parts[0] == "apis":
+        rest = parts[3:]
+    else:
+        return parts[0] or "discovery"  # /version, /openapi/...
+    if not rest:
+        return "discovery"
+    if rest[0] == "namespaces" and len(rest) > 2:
+        rest = rest[2:]
+    if len(rest) > 1:
+        return f"get {'/'.join([rest[0]] + rest[2:])}"
+    if dict(params or {}).get("watch") or "watch=" in path:
+        return f"watch {rest[0]}"
+    return f"list {rest[0]}"
+
+
+def request_kind(cmd):
+    """Latency class of a kubectl/helm command, see api_request_kind: verb, resource, one object or a list."""
+    words = cmd.split()
+    if "--raw" in words[:-1]:
+        return api_request_kind(words[words.index("--raw") + 1].strip("'\""))
+    positional, skip = [], False
+    for word in words[1:]:
+        if word in ("|", "||", "&&", ";"):
+            break
+        if skip:
+            skip = False
+        elif word.startswith("-"):
+            skip = word in _VALUE_FLAGS
+        else:
+            positional.append(word)
+    kind = " ".join([words[0]] + positional[:2])
+    if positional[:1] in (["get"], ["describe"]) and len(positional) > 1:
+        kind += " (one)" if len(positional) > 2 else " (list)"
+    return kind
+
+
+def throttle_backoff(attempt):
+    """Wait before retry `attempt` (0-based) of a throttled request."""
+    time.sleep(min(THROTTLE_BACKOFF_MAX, THROTTLE_BACKOFF * 2 ** attempt))
+
+
+class ApiThrottle:
+    """AIMD limit on the API server requests in flight; see above."""
+
+    def __init__(self, ceiling):
+        self.cond = threading.Condition()
+        self.ceiling = ceiling
+        self.limit = float(ceiling)
+        self.lowest = ceiling
+        self.in_flight = 0
+        self.latency = {}        # request kind -> moving average of its response time
+        self.resume_at = 0.0     # the server's Retry-After: no request starts before this
+        self.decreased_at = 0.0
+        self.signals = 0
+
+    def acquire(self):
+        """Wait for a free slot (and any Retry-After); returns the start time for release()."""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    self.cond.wait(self.resume_at - now)
+                elif self.in_flight >= int(self.limit):
+                    self.cond.wait()
+                else:
+                    self.in_flight += 1
+                    return now
+
+    def release(self, started, reason=None, kind=None, retry_after=None):
+        """
+        Give back the slot taken at `started`. reason describes why the response counts as
+        throttled (None if it doesn't); kind groups requests of similar cost for the latency
+        check, None leaves the request out of it.
+        """
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            elapsed = now - started
+            usual = self.latency.get(kind)
+            if kind is not None and not reason:
+                if usual is not None and elapsed > max(SLOW_RESPONSE_FLOOR, SLOW_RESPONSE_FACTOR * usual):
+                    self._decrease(started, f"{kind} took {elapsed:.1f}s, usually {usual:.2f}s")
+                else:
+                    self.limit = min(self.ceiling, self.limit + 1.0 / self.limit)
+                self.latency[kind] = elapsed if usual is None else 0.9 * usual + 0.1 * elapsed
+            elif reason:
+                self._throttled(started, reason, retry_after)
+            self.cond.notify_all()
+
+    def report(self, started, reason, retry_after=None):
+        """Count a throttling signal that showed up after the slot was given back (e.g. at the end of a stream)."""
+        with self.cond:
+            self._throttled(started, reason, retry_after)
+            self.cond.notify_all()
+
+    def _throttled(self, started, reason, retry_after):
+        self._decrease(started, reason)
+        if retry_after:
+            self.resume_at = max(self.resume_at, time.monotonic() + min(THROTTLE_BACKOFF_MAX, retry_after))
+
+    def _decrease(self, started, reason):
+        self.signals += 1
+        if started < self.decreased_at:
+            return  # sent before the last decrease, which already answered its round
+        before = int(self.limit)
+        self.limit = max(1.0, self.limit / 2)
+        self.lowest = min(self.lowest, int(self.limit))
+        self.decreased_at = time.monotonic()
+        print(f"API server throttling ({reason}): concurrency {before} -> {int(self.limit)}")
+
+    def summary(self):
+        return (f"API concurrency: {self.signals} throttling signals, limit {int(self.limit)} of {self.ceiling} "
+                f"(lowest {self.lowest})")
+
+
+API_THROTTLE = ApiThrottle(MAX_WORKERS)
+
+
+def _run_task(func, args):
+    try:
+        return func(*args)
+    except Exception as e:
+        print(f"Task {func.__name__}{args} failed: {e}")
+        return None
+
+
+def run_tasks(tasks, max_workers=None):
+    """
+    Run a list of (func, args) tasks on a bounded thread pool.
+    Returns the results in task order; a task that raises is reported and returns None.
+    """
+    workers = max_workers or MAX_WORKERS
+    if workers <= 1 or len(tasks) <= 1:
+        return [_run_task(func, args) for func, args in tasks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_task, func, args) for func, args in tasks]
+        return [future.result() for future in futures]
+
+
+def run_plan(plan):
+    """
+    Run collection steps, [(triage priority, name, func, args)], in order; with --budget by
+    priority (ties keep their order), only noting the names of steps not started by the deadline.
+    """
+    if BUDGET:
+        plan = sorted(plan, key=lambda step: step[0])
+    for priority, name, func, args in plan:
+        if past_deadline():
+            _budget_report["skipped"].append(name)
+            continue
+        func(*args)
+
+
+def describe_tasks(resource_type, namespaces, base_dir, describe_type=None):
+    """
+    Build the work list that describes every object of resource_type.
+    namespaces=None means the type is cluster-scoped. Files go to describes/<describe_type>/
+    (defaults to resource_type). In bulk mode this is a single list-and-split task.
+    """
+    describe_type = describe_type or resource_type
+    if BULK_MODE:
+        return [(run_unit, (f"list:{describe_type}", save_describes_bulk,
+                            (resource_type, namespaces, base_dir, describe_type)))]
+    if namespaces is None:
+        entries = get_resource_metadata(resource_type)
+    else:
+        # One cluster-wide listing instead of one per namespace; empty types cost a single call.
+        wanted = set(namespaces)
+        entries = [e for e in get_resource_metadata(resource_type, all_namespaces=True) if e[0] in wanted]
+    tasks = []
+    for ns, name, uid, resource_version in entries:
+        if not SELECTION.wants(resource_type, ns, name):
+            continue
+        rel_path = describe_rel_path(describe_type, name, ns)
+        record_object(rel_path, describe_type, ns, name, uid, object_version(uid, resource_version))
+        if reuse_from_previous(rel_path, base_dir):
+            continue
+        tasks.append((run_unit, (f"describe:{describe_type}/{ns or ''}/{name}", save_describe,
+                                 (describe_type, name, ns, base_dir))))
+    return tasks
+
+
+class KubeApiClient:
+    """
+    Minimal in-process Kubernetes API client used by --transport api.
+    Reads the kubeconfig once (or the in-cluster service account), keeps a pool of
+    keep-alive HTTP(S) connections and caches credentials, including exec plugin tokens
+    until they expire. Only GETs are needed by the collector.
+    """
+
+    def __init__(self, kubeconfig=None, context=None, pool_size=8, timeout=60):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._cred_lock = threading.Lock()
+        self._exec_cred = None
+        self._exec_expiry = None
+        self._temp_files = []
+        self.headers = {"Accept": "application/json", "User-Agent": "get_cluster_info_v3"}
+        if kubeconfig is None and not os.environ.get("KUBECONFIG") and os.environ.get("KUBERNETES_SERVICE_HOST") \
+                and not os.path.isfile(os.path.expanduser("~/.kube/config")):
+            self._load_in_cluster()
+        else:
+            self._load_kubeconfig(kubeconfig, context)
+        atexit.register(self.close)
+
+    # -- configuration -------------------------------------------------------
+
+    def _load_in_cluster(self):
+        sa_dir = "/var/run/secrets/kubernetes.io/serviceaccount"
+        host = os.environ["KUBERNETES_SERVICE_HOST"]
+        port = os.environ.get("KUBERNETES_SERVICE_PORT", "443")
+        self._set_server(f"https://{host}:{port}")
+        self.ssl_context = ssl.create_default_context(cafile=os.path.join(sa_dir, "ca.crt"))
+        self.user = {"tokenFile": os.path.join(sa_dir, "token")}
+
+    def _load_kubeconfig(self, kubeconfig, context):
+        if yaml is None:
+            raise RuntimeError("PyYAML is required to read the kubeconfig (pip install pyyaml)")
+        paths = [kubeconfig] if kubeconfig else \
+            (os.environ.get("KUBECONFIG") or os.path.expanduser("~/.kube/config")).split(os.pathsep)
+        merged = {"clusters": {}, "users": {}, "contexts": {}, "current-context": None}
+        for path in paths:
+            if not path or not os.path.isfile(path):
+                continue
+            with open(path, "r") as f:
+                config = yaml.safe_load(f) or {}
+            base = os.path.dirname(os.path.abspath(path))
+            for section, key in (("clusters", "cluster"), ("users", "user"), ("contexts", "context")):
+                for entry in config.get(section) or []:
+                    merged[section].setdefault(entry["name"], (entry.get(key) or {}, base))
+            merged["current-context"] = merged["current-context"] or config.get("current-context")
+        context_name = context or merged["current-context"]
+        if context_name not in merged["contexts"]:
+            raise RuntimeError(f"Context {context_name!r} not found in kubeconfig {paths}")
+        ctx, _ = merged["contexts"][context_name]
+        cluster, cluster_base = merged["clusters"][ctx["cluster"]]
+        user, user_base = merged["users"].get(ctx.get("user"), ({}, None))
+        self.user = dict(user)
+        self._user_base = user_base
+        self._set_server(cluster["server"])
+
+        if cluster.get("insecure-skip-tls-verify"):
+            self.ssl_context = ssl._create_unverified_context()
+        elif cluster.get("certificate-authority-data"):
+            ca = base64.b64decode(cluster["certificate-authority-data"]).decode()
+            self.ssl_context = ssl.create_default_context(cadata=ca)
+        elif cluster.get("certificate-authority"):
+            self.ssl_context = ssl.create_default_context(
+                cafile=os.path.join(cluster_base, cluster["certificate-authority"]))
+        else:
+            self.ssl_context = ssl.create_default_context()
+
+        cert = self._file_or_data(user, "client-certificate", user_base)
+        key = self._file_or_data(user, "client-key", user_base)
+        if cert and key:
+            self.ssl_context.load_cert_chain(cert, key)
+        if user.get("username") and user.get("password"):
+            basic = base64.b64encode(f"{user['username']}:{user['password']}".encode()).decode()
+            self.headers["Authorization"] = f"Basic {basic}"
+
+    def _set_server(self, server):
+        url = urlsplit(server)
+        self.scheme = url.scheme or "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.scheme == "https" else 80)
+        self.base_path = url.path.rstrip("/")  # e.g. Rancher's /k8s/clusters/<id> proxy prefix
+
+    def _file_or_data(self, entry, field, base):
+        # ssl needs files, so inline *-data fields are written to private temp files
+        if entry.get(f"{field}-data"):
+            fd, path = tempfile.mkstemp(prefix="kubeapi-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(base64.b64decode(entry[f"{field}-data"]))
+            self._temp_files.append(path)
+            return path
+        if entry.get(field):
+            return os.path.join(base, entry[field])
+        return None
+
+    # -- credentials ---------------------------------------------------------
+
+    def _auth_header(self):
+        if self.user.get("token"):
+            return f"Bearer {self.user['token']}"
+        if self.user.get("tokenFile"):
+            with open(self.user["tokenFile"], "r") as f:  # re-read: projected tokens rotate
+                return f"Bearer {f.read().strip()}"
+        if self.user.get("exec"):
+            return f"Bearer {self._exec_token()}"
+        return self.headers.get("Authorization")
+
+    def _exec_token(self, refresh=False):
+        """Run the exec credential plugin once and reuse its token until it expires."""
+        with self._cred_lock:
+            now = datetime.now(timezone.utc)
+            if not refresh and self._exec_cred and (self._exec_expiry is None or now < self._exec_expiry):
+                return self._exec_cred
+            spec = self.user["exec"]
+            env = dict(os.environ)
+            for item in spec.get("env") or []:
+                env[item["name"]] = item["value"]
+            env["KUBERNETES_EXEC_INFO"] = json.dumps({
+                "apiVersion": spec.get("apiVersion", "client.authentication.k8s.io/v1"),
+                "kind": "ExecCredential", "spec": {"interactive": False},
+            })
+            result = subprocess.run([spec["command"]] + list(spec.get("args") or []), env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                    cwd=self._user_base)
+            if result.returncode != 0:
+                raise RuntimeError(f"exec credential plugin {spec['command']} failed: {result.stderr.strip()}")
+            status = json.loads(result.stdout).get("status", {})
+            if not status.get("token"):
+                raise RuntimeError("exec credential plugin returned no token (client certificates are not supported)")
+            self._exec_cred = status["token"]
+            expiry = status.get("expirationTimestamp")
+            self._exec_expiry = None
+            if expiry:
+                # Refresh a minute early so in-flight requests don't race the expiry
+                self._exec_expiry = datetime.fromisoformat(expiry.replace("Z", "+00:00")) - timedelta(seconds=60)
+            return self._exec_cred
+
+    # -- connection pool -----------------------------------------------------
+
+    def _new_conn(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_conn()
+
+    def _release(self, conn):
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        for path in self._temp_files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._temp_files = []
+
+    # -- requests ------------------------------------------------------------
+
+    def url_path(self, path, params=None):
+        query = f"?{urlencode(params)}" if params else ""
+        return f"{self.base_path}{path}{query}"
+
+    def open(self, path, params=None, accept=None):
+        """
+        Send a GET and return (status, response, conn). The caller reads the response
+        and hands conn back with release() (or closes it if the body was not drained).
+        Stale keep-alive connections, one 401 (expired exec token) and throttled responses
+        (429/503, after API_THROTTLE's backoff) are retried; the slot is held until the headers.
+        """
+        attempt = throttled = 0
+        while attempt < 3:
+            wait_for_api_slot()
+            started = API_THROTTLE.acquire()
+            conn = self._acquire()
+            headers = dict(self.headers)
+            if accept:
+                headers["Accept"] = accept
+            auth = self._auth_header()
+            if auth:
+                headers["Authorization"] = auth
+            try:
+                conn.request("GET", self.url_path(path, params), headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest):
+                API_THROTTLE.release(started)
+                conn.close()
+                attempt += 1
+                continue
+            except BaseException:
+                API_THROTTLE.release(started)
+                raise
+            if resp.status in (429, 503):
+                try:
+                    retry_after = float(resp.getheader("Retry-After") or 0)
+                except ValueError:
+                    retry_after = 0
+                API_THROTTLE.release(started, f"HTTP {resp.status} for {path}", retry_after=retry_after)
+                if throttled < THROTTLE_RETRIES:
+                    self.release(resp, conn)
+                    if not retry_after:
+                        throttle_backoff(throttled)  # with Retry-After, acquire() waits for it
+                    throttled += 1
+                    continue
+                return resp.status, resp, conn
+            API_THROTTLE.release(started, kind=api_request_kind(path, params))
+            if resp.status == 401 and self.user.get("exec") and attempt == 0:
+                resp.read()
+                self._release(conn)
+                self._exec_token(refresh=True)
+                attempt += 1
+                continue
+            return resp.status, resp, conn
+        raise ConnectionError(f"API request failed after retries: GET {path}")
+
+    def release(self, resp, conn):
+        if resp.isclosed() or not resp.will_close:
+            # A Content-Length body drained with read1() is not marked closed, and the connection
+            # would refuse its next request; read() at the end of the body just closes it.
+            resp.read()
+            self._release(conn)
+        else:
+            conn.close()
+
+    def get(self, path, params=None, accept=None):
+        """GET a path and return the body text, or None (after printing the error) on failure."""
+        start = time.monotonic()
+        status = None
+        try:
+            status, resp, conn = self.open(path, params, accept)
+            body = resp.read().decode("utf-8", errors="replace")
+            self.release(resp, conn)
+        except (OSError, http.client.HTTPException) as e:
+            print(f"Error requesting {path}: {e}")
+            return None
+        finally:
+            if TRACER:
+                TRACER.record_command("api", self.url_path(path, params), time.monotonic() - start,
+                                      status is not None and status < 400)
+        if status >= 400:
+            print(f"Error requesting {path}: HTTP {status}\n{body.strip()[:500]}")
+            return None
+        return body
+
+
+def configure_transport(transport, kubeconfig=None, context=None):
+    """Select the API transport. The api transport implies bulk mode, since describe text is rendered locally."""
+    global TRANSPORT, _api_client, BULK_MODE
+    TRANSPORT = transport
+    if transport == "api":
+        _api_client = KubeApiClient(kubeconfig, context, pool_size=MAX_WORKERS)
+        BULK_MODE = True
+
+
+def api_get_json(path, params=None, accept=None):
+    """
+    GET an API path through the selected transport and return the decoded JSON, or None.
+    accept (e.g. a PartialObjectMetadataList media type) only applies to the api transport.
+    """
+    if TRANSPORT == "api":
+        body = _api_client.get(path, params, accept)
+    else:
+        query = f"?{urlencode(params)}" if params else ""
+        body = run_cmd(f"kubectl get --raw '{path}{query}'")
+    if body is None:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        print(f"Failed to parse response from {path}: {e}")
+        return None
+
+
+_discovery_lock = threading.Lock()
+_discovered_resources = None
+
+
+def _discovery_cache_path(group_versions):
+    """
+    Cache file for a discovery result, keyed by the server version and the served group
+    versions (so installing or removing a CRD group refetches), or None without a state dir.
+    """
+    if not STATE_DIR:
+        return None
+    version = (api_get_json("/version") or {}).get("gitVersion", "unknown")
+    key = hashlib.sha1(json.dumps([version] + group_versions).encode()).hexdigest()[:16]
+    return os.path.join(STATE_DIR, "discovery", f"{re.sub(r'[^A-Za-z0-9.+-]', '_', version)}_{key}.json")
+
+
+def discover_resources():
+    """
+    Map every resource name (plural, singular and short names) to its API location:
+    name -> {"group_version", "plural", "kind", "namespaced", "verbs"}. Runs once per process,
+    and the per-group resource lists are reused from STATE_DIR for DISCOVERY_CACHE_TTL.
+    """
+    global _discovered_resources
+    with _discovery_lock:
+        if _discovered_resources is not None:
+            return _discovered_resources
+        group_versions = ["v1"]
+        groups = api_get_json("/apis") or {}
+        for group in groups.get("groups", []):
+            preferred = group.get("preferredVersion") or (group.get("versions") or [{}])[0]
+            if preferred.get("groupVersion"):
+                group_versions.append(preferred["groupVersion"])
+        cache_path = _discovery_cache_path(group_versions)
+        if cache_path and os.path.isfile(cache_path) and time.time() - os.path.getmtime(cache_path) < DISCOVERY_CACHE_TTL:
+            try:
+                with open(cache_path, "r") as f:
+                    _discovered_resources = json.load(f)
+                return _discovered_resources
+            except ValueError:
+                pass  # damaged cache; rediscover
+        prefixes = ["/api/v1" if gv == "v1" else f"/apis/{gv}" for gv in group_versions]
+        resource_lists = run_tasks([(api_get_json, (prefix,)) for prefix in prefixes])
+        resources = {}
+        for gv, resource_list in zip(group_versions, resource_lists):
+            for res in (resource_list or {}).get("resources", []):
+                if "/" in res["name"]:
+                    continue  # subresources such as pods/log
+                info = {
+                    "group_version": gv,
+                    "plural": res["name"],
+                    "kind": res.get("kind", ""),
+                    "namespaced": res.get("namespaced", False),
+                    "verbs": res.get("verbs", []),
+                }
+                group = gv.rsplit("/", 1)[0] if "/" in gv else ""
+                aliases = [res["name"], res.get("singularName") or res.get("kind", "").lower()]
+                aliases += res.get("shortNames") or []
+                for alias in aliases:
+                    resources.setdefault(alias, info)  # core and earlier groups win, like kubectl
+                    if group:
+                        resources.setdefault(f"{alias}.{group}", info)
+        if cache_path and all(resource_lists):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path + ".tmp", "w") as f:
+                json.dump(resources, f)
+            os.replace(cache_path + ".tmp", cache_path)
+        _discovered_resources = resources
+        return resources
+
+
+# Types --all-resources leaves to other steps or out: events are saved by save_cluster_events
+# (and expire anyway), secrets hold credentials.
+ALL_RESOURCES_SKIP = {"events", "secrets"}
+
+
+def listable_resource_types():
+    """
+    [(type name for kubectl/resource_path, describes/ directory, namespaced)] for every listable
+    resource type in discovery, one entry per type (preferred version, core group first).
+    Non-core types use the group-qualified name; the directory is the plural unless taken.
+    """
+    types, seen, dirs = [], set(), set()
+    for info in discover_resources().values():
+        gv, plural = info["group_version"], info["plural"]
+        if (gv, plural) in seen or "list" not in info["verbs"] or plural in ALL_RESOURCES_SKIP:
+            continue
+        seen.add((gv, plural))
+        group = gv.rsplit("/", 1)[0] if "/" in gv else ""
+        name = f"{plural}.{group}" if group else plural
+        directory = plural if plural not in dirs else name
+        dirs.add(directory)
+        types.append((name, directory, info["namespaced"]))
+    return types
+
+
+def resource_path(resource_type, namespace=None, name=None):
+    """Build the REST path for a resource type (any kubectl-style name), or None if unknown."""
+    info = discover_resources().get(resource_type.lower())
+    if info is None:
+        print(f"Unknown resource type: {resource_type}")
+        return None
+    gv = info["group_version"]
+    path = "/api/v1" if gv == "v1" else f"/apis/{gv}"
+    if namespace and info["namespaced"]:
+        path += f"/namespaces/{quote(namespace)}"
+    path += f"/{info['plural']}"
+    if name:
+        path += f"/{quote(name)}"
+    return path
+
+
+# Ingresses are saved under the kubectl short name: describes/ingress/ and objects/ingress.ndjson.
+# cluster_validation_v3.py reads them through its own INGRESS_TYPE, which must stay the same.
+INGRESS_TYPE = "ingress"
+
+# Resources described by default: cluster-scoped ones (CRDs included) and per-namespace ones.
+CLUSTER_DESCRIBE_RESOURCES = ["apiservices", "customresourcedefinitions"]
+NAMESPACED_DESCRIBE_RESOURCES = [
+    "pods",
+    "deployments",
+    "statefulsets",
+    "replicasets",
+    "services",
+    "endpoints",
+    INGRESS_TYPE,
+    "daemonsets",
+]
+
+
 def get_node_name():
     # Try to get node name from environment or hostname
     # If running inside a pod, NODE_NAME env var might be set
@@ -71,7 +1421,139 @@ def get_nodes_with_ips():
     return node_ips
 
 
+# Selection (--select FILE, YAML or JSON): which namespaces are collected at all, and per
+# namespace and resource type ("logs" for pod logs) which objects. Example:
+#
+#   namespaces:
+#     exclude: ["^kube-node-lease$"]
+#     selector: "field.cattle.io/projectId"     # namespace label selector
+#   rules:                                      # first matching rule wins; no match = include
+#     - namespaces: ["^cattle-"]
+#       resources: [logs]
+#       pods: not-ready                         # logs only for pods that are not Ready
+#     - namespaces: ["^(c-m|p-|user-|u-)"]
+#       resources: [logs]
+#       action: exclude
+#     - resources: [replicasets]
+#       selector: "app.kubernetes.io/managed-by!=Helm"   # object label selector
+#       limit: 50                               # objects per namespace
+#
+# Patterns are regular expressions matched from the start of the name. A decision is made once
+# per (resource type, namespace) and a label selector is resolved by one listing per run; each
+# object then costs a set lookup.
+SELECTION_RULE_KEYS = {"namespaces", "namespace_selector", "resources", "action", "selector", "pods", "limit"}
+
+# Without --select: no logs from Rancher's per-cluster/project/user namespaces.
+DEFAULT_SELECTION = {
+    "rules": [{"namespaces": ["^c-m", "^p-", "^user-", "^u-"], "resources": ["logs"], "action": "exclude"}],
+}
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class Selection:
+    """A compiled --select config (see DEFAULT_SELECTION for the shape)."""
+
+    def __init__(self, config):
+        namespaces = config.get("namespaces") or {}
+        self.ns_include = [re.compile(p) for p in _as_list(namespaces.get("include"))]
+        self.ns_exclude = [re.compile(p) for p in _as_list(namespaces.get("exclude"))]
+        self.ns_selector = namespaces.get("selector")
+        self.rules = []
+        for i, rule in enumerate(config.get("rules") or []):
+            unknown = set(rule) - SELECTION_RULE_KEYS
+            if unknown or rule.get("action", "include") not in ("include", "exclude") \
+                    or rule.get("pods", "not-ready") != "not-ready":
+                raise ValueError(f"selection rule {i + 1}: unsupported setting in {rule}")
+            self.rules.append(dict(rule, namespaces=[re.compile(p) for p in _as_list(rule.get("namespaces"))],
+                                   resources=set(_as_list(rule.get("resources")))))
+        self.lock = threading.Lock()
+        self._decisions = {}
+        self._selected = {}
+        self._counts = {}
+
+    def _labelled(self, resource_type, selector):
+        """(namespace, name) of the objects matching a label selector, listed once per run."""
+        key = (resource_type, selector)
+        with self.lock:
+            if key not in self._selected:
+                entries = get_resource_metadata(resource_type, all_namespaces=True, label_selector=selector)
+                self._selected[key] = {(namespace, name) for namespace, name, _, _ in entries}
+            return self._selected[key]
+
+    def filter_namespaces(self, namespaces):
+        """Apply the top-level namespaces include/exclude patterns and label selector."""
+        selected = self._labelled("namespaces", self.ns_selector) if self.ns_selector else None
+        return [ns for ns in namespaces
+                if (not self.ns_include or any(p.match(ns) for p in self.ns_include))
+                and not any(p.match(ns) for p in self.ns_exclude)
+                and (selected is None or (None, ns) in selected)]
+
+    def rule_for(self, resource_type, namespace):
+        """The first rule matching resource_type in namespace (None = include everything)."""
+        key = (resource_type, namespace)
+        if key not in self._decisions:
+            decision = None
+            for rule in self.rules:
+                if rule["resources"] and resource_type not in rule["resources"]:
+                    continue
+                if rule["namespaces"] and not (namespace and any(p.match(namespace) for p in rule["namespaces"])):
+                    continue
+                if rule.get("namespace_selector") and \
+                        (None, namespace) not in self._labelled("namespaces", rule["namespace_selector"]):
+                    continue
+                decision = rule
+                break
+            self._decisions[key] = decision
+        return self._decisions[key]
+
+    def wants_namespace(self, resource_type, namespace):
+        """False when a rule excludes resource_type in namespace as a whole."""
+        rule = self.rule_for(resource_type, namespace)
+        return not rule or rule.get("action", "include") == "include"
+
+    def wants(self, resource_type, namespace, name):
+        """Whether one object is collected: rule action, label selector and per-namespace limit."""
+        rule = self.rule_for(resource_type, namespace)
+        if not rule:
+            return True
+        if rule.get("action", "include") == "exclude":
+            return False
+        if rule.get("selector") and (namespace, name) not in self._labelled(resource_type, rule["selector"]):
+            return False
+        if rule.get("limit") is not None:
+            with self.lock:
+                count = self._counts.get((resource_type, namespace), 0)
+                if count >= rule["limit"]:
+                    return False
+                self._counts[(resource_type, namespace)] = count + 1
+        return True
+
+
+SELECTION = Selection(DEFAULT_SELECTION)
+
+
+def configure_selection(path=None):
+    """Load a --select config file (YAML, or JSON without PyYAML) in place of DEFAULT_SELECTION."""
+    global SELECTION
+    if not path:
+        return
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        config = yaml.safe_load(text) if yaml is not None else json.loads(text)
+        SELECTION = Selection(config or {})
+    except Exception as e:  # syntax errors, bad patterns or rules
+        raise SystemExit(f"Invalid --select file {path}: {e}")
+
+
 def get_all_namespaces():
+    if TRANSPORT == "api":
+        return get_resource_names("namespaces")
     output = run_cmd("kubectl get namespaces -o jsonpath='{.items[*].metadata.name}'")
     if output:
         return output.strip("'").split()
@@ -79,12 +1561,42 @@ def get_all_namespaces():
 
 
 def get_pods(namespace):
+    if TRANSPORT == "api":
+        return get_resource_names("pods", namespace)
     output = run_cmd(f"kubectl get pods -n {namespace} -o jsonpath='{{.items[*].metadata.name}}'")
     if output:
         return output.split()
     return []
 
 
+def get_pod_containers(namespace, label_selector=None, not_ready_only=False):
+    """
+    List pods in a namespace with their container names and restart counts in one call,
+    optionally only those matching label_selector (server-side) or not Ready.
+    Returns [(pod, [containers], {container: restartCount}, ready)].
+    """
+    if TRANSPORT == "api":
+        path = resource_path("pods", namespace)
+        listing = api_get_json(path, {"labelSelector": label_selector} if label_selector else None) if path else None
+    else:
+        selector = f" -l {shlex.quote(label_selector)}" if label_selector else ""
+        output = run_cmd(f"kubectl get pods -n {namespace}{selector} -o json")
+        listing = json.loads(output) if output else None
+    pods = []
+    for item in (listing or {}).get("items", []):
+        ready = any(c.get("type") == "Ready" and c.get("status") == "True"
+                    for c in (item.get("status") or {}).get("conditions") or [])
+        if not_ready_only and ready:
+            continue
+        containers = [c["name"] for c in (item.get("spec") or {}).get("containers", [])]
+        restarts = {cs["name"]: cs.get("restartCount", 0)
+                    for cs in (item.get("status") or {}).get("containerStatuses") or []}
+        pods.append((item["metadata"]["name"], containers, restarts, ready))
+    return pods
+
+
+@checkpointed
+@traced
 def save_pods_wide(base_dir, namespaces):
     """
     Save 'kubectl get pods -o wide' output for each namespace.
@@ -99,10 +1611,12 @@ def save_pods_wide(base_dir, namespaces):
         if output:
             filename = f"{ns}_pods_wide.txt"
             filepath = os.path.join(pods_wide_dir, filename)
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(output)
 
 
+@checkpointed
+@traced
 def save_kubectl_top(base_dir):
     top_dir = os.path.join(base_dir, "kubectl_top")
     os.makedirs(top_dir, exist_ok=True)
@@ -110,16 +1624,18 @@ def save_kubectl_top(base_dir):
     print("Gathering 'kubectl top nodes'...")
     top_nodes = run_cmd("kubectl top nodes")
     if top_nodes:
-        with open(os.path.join(top_dir, "top_nodes.txt"), "w") as f:
+        with open_output(os.path.join(top_dir, "top_nodes.txt")) as f:
             f.write(top_nodes)
 
     print("Gathering 'kubectl top pods --all-namespaces'...")
     top_pods = run_cmd("kubectl top pods --all-namespaces")
     if top_pods:
-        with open(os.path.join(top_dir, "top_pods_all_namespaces.txt"), "w") as f:
+        with open_output(os.path.join(top_dir, "top_pods_all_namespaces.txt")) as f:
             f.write(top_pods)
 
 
+@checkpointed
+@traced
 def save_k8s_versions(base_dir):
     version_dir = os.path.join(base_dir, "versions")
     os.makedirs(version_dir, exist_ok=True)
@@ -127,51 +1643,74 @@ def save_k8s_versions(base_dir):
     print("Gathering Kubernetes version info...")
     version_info = run_cmd("kubectl version --short")
     if version_info:
-        with open(os.path.join(version_dir, "kubectl_version.txt"), "w") as f:
+        with open_output(os.path.join(version_dir, "kubectl_version.txt")) as f:
             f.write(version_info)
 
 
+@checkpointed
+@traced
 def save_cluster_events(base_dir):
+    """
+    Save every cluster event (paged listing, no 1000-event window) to events/events.ndjson as
+    event_record lines, oldest first, once per uid and count, narrowed by EVENT_FILTERS.
+    """
     events_dir = os.path.join(base_dir, "events")
     os.makedirs(events_dir, exist_ok=True)
 
-    print("Gathering cluster events from all namespaces (last 1000 most recent)...")
-    # Use --sort-by='.lastTimestamp' to sort by last update time (ascending: oldest first)
-    # Then tail -1000 to get the most recent 1000 events (approximate, includes header if present)
-    # This covers all namespaces with --all-namespaces and should capture recent cluster-wide activity
-    # Note: Kubernetes events are namespaced but --all-namespaces aggregates them; node-level events may appear under relevant namespaces like kube-system
-    events_cmd = "kubectl get events --all-namespaces --sort-by='.lastTimestamp' -o wide | tail -1000"
-    events = run_cmd(events_cmd)
-    if events:
-        with open(os.path.join(events_dir, "cluster_events.txt"), "w") as f:
-            f.write(events)
+    since, types = EVENT_FILTERS["since"], EVENT_FILTERS["types"]
+    print("Gathering cluster events from all namespaces...")
+    if types and len(types) == 1 and _all_events is None:
+        # Nothing else needs the full list yet, so let the API server filter by type
+        events = [event for page in iter_resource_pages("events", selectors={"fieldSelector": f"type={types[0]}"})
+                  for event in page]
     else:
-        print("No events found or command failed.")
+        events = get_all_events()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=parse_duration(since)) if since else None
+    records, seen = [], set()
+    for event in events:
+        record = event_record(event)
+        key = (record["uid"], record["count"])
+        if key in seen:
+            continue
+        seen.add(key)
+        if types and record["type"] not in types:
+            continue
+        if cutoff and (not record["last"] or parse_k8s_time(record["last"]) < cutoff):
+            continue
+        records.append(record)
+    if not records:
+        print("No events matched --events-since/--event-types." if events else "No events found or command failed.")
+        return
+    records.sort(key=lambda r: parse_k8s_time(r["last"]) if r["last"] else datetime.min.replace(tzinfo=timezone.utc))
+    events_file = os.path.join(events_dir, "events.ndjson")
+    with open_output(events_file) as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    print(f"Saved {len(records)} events to {events_file}")
 
 
+@checkpointed
+@traced
 def save_network_policies(base_dir, namespaces):
     np_dir = os.path.join(base_dir, "network_policies")
     os.makedirs(np_dir, exist_ok=True)
 
-    for ns in namespaces:
-        names = get_resource_names("networkpolicies", ns)
-        for name in names:
-            save_describe("networkpolicy", name, ns, base_dir)
+    run_tasks(describe_tasks("networkpolicies", namespaces, base_dir, "networkpolicy"))
 
 
+@checkpointed
+@traced
 def save_storage_info(base_dir, namespaces):
     # PVs are cluster-wide
-    pvs = get_resource_names("persistentvolumes")
-    for pv in pvs:
-        save_describe("persistentvolume", pv, None, base_dir)
+    tasks = describe_tasks("persistentvolumes", None, base_dir, "persistentvolume")
 
     # PVCs per namespace
-    for ns in namespaces:
-        pvcs = get_resource_names("persistentvolumeclaims", ns)
-        for pvc in pvcs:
-            save_describe("persistentvolumeclaim", pvc, ns, base_dir)
+    tasks += describe_tasks("persistentvolumeclaims", namespaces, base_dir, "persistentvolumeclaim")
+    run_tasks(tasks)
 
 
+@checkpointed
+@traced
 def save_rbac_info(base_dir, namespaces):
     rbac_resources = [
         ("roles", True),
@@ -180,97 +1719,1477 @@ def save_rbac_info(base_dir, namespaces):
         ("clusterrolebindings", False),
     ]
 
+    tasks = []
     for res, namespaced in rbac_resources:
-        if namespaced:
-            for ns in namespaces:
-                names = get_resource_names(res, ns)
-                for name in names:
-                    save_describe(res, name, ns, base_dir)
+        tasks += describe_tasks(res, namespaces if namespaced else None, base_dir)
+    run_tasks(tasks)
+
+
+@checkpointed
+@traced
+def save_ingress_classes(base_dir):
+    run_tasks(describe_tasks("ingressclasses", None, base_dir, "ingressclass"))
+
+
+def parse_duration(value):
+    """Convert a kubectl-style duration ("90s", "15m", "2h", "1h30m") to seconds."""
+    parts = re.findall(r"(\d+)([smhd])", value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        raise ValueError(f"Invalid duration: {value}")
+    return sum(int(n) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[u] for n, u in parts)
+
+
+# Log stream openers: (namespace, pod, container, previous) -> (chunks, finish, abort). chunks yields
+# the log; finish(aborted) ends the stream and returns an error or None; abort() may be called from
+# another thread (the timeout watchdog) to end a stream blocked waiting for data.
+def _log_stream_kubectl(namespace, pod, container, previous):
+    cmd = ["kubectl", "logs", "-n", namespace, pod]
+    if container:
+        cmd += ["-c", container]
+    if previous:
+        cmd.append("--previous")
+    if LOG_OPTIONS["since"]:
+        cmd.append(f"--since={LOG_OPTIONS['since']}")
+    if LOG_OPTIONS["limit_bytes"]:
+        cmd.append(f"--limit-bytes={LOG_OPTIONS['limit_bytes']}")
+    if LOG_OPTIONS["tail_lines"]:
+        cmd.append(f"--tail={LOG_OPTIONS['tail_lines']}")
+    wait_for_api_slot()
+    started = API_THROTTLE.acquire()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finally:
+        API_THROTTLE.release(started)  # streams run long; only their start takes a slot
+
+    def chunks():
+        while True:
+            chunk = proc.stdout.read1(LOG_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def finish(aborted):
+        if aborted:
+            proc.kill()
+        proc.stdout.close()
+        stderr = proc.stderr.read().decode(errors="replace").strip()
+        proc.wait()
+        reason = throttle_signal(stderr)
+        if reason:
+            API_THROTTLE.report(started, reason)
+        if aborted or proc.returncode == 0:
+            return None
+        return stderr or f"kubectl logs exited with {proc.returncode}"
+
+    return chunks(), finish, proc.kill
+
+
+def _log_stream_api(namespace, pod, container, previous):
+    params = {}
+    if container:
+        params["container"] = container
+    if previous:
+        params["previous"] = "true"
+    if LOG_OPTIONS["since"]:
+        params["sinceSeconds"] = parse_duration(LOG_OPTIONS["since"])
+    if LOG_OPTIONS["limit_bytes"]:
+        params["limitBytes"] = LOG_OPTIONS["limit_bytes"]
+    if LOG_OPTIONS["tail_lines"]:
+        params["tailLines"] = LOG_OPTIONS["tail_lines"]
+    status, resp, conn = _api_client.open(f"/api/v1/namespaces/{quote(namespace)}/pods/{quote(pod)}/log", params)
+    if status >= 400:
+        error = resp.read().decode(errors="replace").strip()[:500]
+        _api_client.release(resp, conn)
+        return iter(()), lambda aborted: f"HTTP {status}: {error}", lambda: None
+    aborted_by = []
+
+    def chunks():
+        while True:
+            try:
+                chunk = resp.read1(LOG_CHUNK_SIZE)
+            except (OSError, ValueError, http.client.HTTPException):
+                if aborted_by:
+                    return
+                raise
+            if not chunk:
+                return
+            yield chunk
+
+    def finish(aborted):
+        if aborted or aborted_by:
+            conn.close()  # the rest of the body is not wanted; don't reuse the connection
+        else:
+            _api_client.release(resp, conn)
+        return None
+
+    def abort():
+        aborted_by.append(True)
+        try:
+            conn.sock.shutdown(socket.SHUT_RDWR)  # wakes up a read1() blocked on the socket
+        except (AttributeError, OSError):
+            pass
+
+    return chunks(), finish, abort
+
+
+def stream_log_to_file(namespace, pod, container, previous, filepath, deadline=None):
+    """
+    Stream one container's log straight to filepath in LOG_CHUNK_SIZE pieces, applying the
+    head-lines window, byte cap and per-stream timeout from LOG_OPTIONS client-side
+    (since/tail/limit-bytes are also passed to the API server). A stream still running at
+    `deadline` (time.monotonic(), e.g. the --budget deadline) is stopped there as well.
+    Returns True when a file was written.
+    """
+    opener = _log_stream_api if TRANSPORT == "api" else _log_stream_kubectl
+    head_lines = LOG_OPTIONS["head_lines"]
+    limit_bytes = LOG_OPTIONS["limit_bytes"]
+    timeout_at = time.monotonic() + LOG_OPTIONS["timeout"] if LOG_OPTIONS["timeout"] else None
+    cutoffs = [t for t in (timeout_at, deadline) if t is not None]
+    stop_at = min(cutoffs) if cutoffs else None
+    start = time.monotonic()
+    final_path = output_path(filepath)
+    tmp_path = final_path + ".part"
+
+    def stop_reason():
+        if deadline is not None and stop_at == deadline:
+            cut_at_deadline(filepath)
+            return "--budget deadline"
+        return f"{LOG_OPTIONS['timeout']}s timeout"
+
+    for attempt in range(THROTTLE_RETRIES + 1):
+        chunks, finish, abort = opener(namespace, pod, container, previous)
+        written = lines = 0
+        stopped = None
+        # A stream that stops sending (a quiet container, a stalled connection) never gets to the
+        # checks below, so a watchdog ends it at the timeout or the deadline, whichever is first.
+        watchdog = None
+        if stop_at:
+            watchdog = threading.Timer(max(0.0, stop_at - time.monotonic()), abort)
+            watchdog.start()
+        with open_compressed(tmp_path, "wb") as f:
+            for chunk in chunks:
+                if head_lines:
+                    newlines = chunk.count(b"\n")
+                    if lines + newlines >= head_lines:
+                        cut = -1
+                        for _ in range(head_lines - lines):
+                            cut = chunk.index(b"\n", cut + 1)
+                        chunk = chunk[:cut + 1]
+                        stopped = f"first {head_lines} lines"
+                    lines += newlines
+                if limit_bytes and written + len(chunk) >= limit_bytes:
+                    chunk = chunk[:limit_bytes - written]
+                    stopped = stopped or f"{limit_bytes} bytes"
+                f.write(chunk)
+                written += len(chunk)
+                if not stopped and stop_at and time.monotonic() > stop_at:
+                    stopped = stop_reason()
+                if stopped:
+                    break
+            if watchdog:
+                watchdog.cancel()
+            if not stopped and stop_at and time.monotonic() >= stop_at:
+                stopped = stop_reason()  # ended by the watchdog
+            error = finish(aborted=stopped is not None)
+            if stopped and ("timeout" in stopped or "deadline" in stopped):
+                f.write(f"\n--- log capture stopped after {stopped} ---\n".encode())
+        # kubectl gives up on a throttled request before any output; the api transport retries in open()
+        if not error or written or opener is not _log_stream_kubectl or not throttle_signal(error) \
+                or attempt == THROTTLE_RETRIES:
+            break
+        throttle_backoff(attempt)
+    if TRACER:
+        TRACER.record_command("logs", f"{namespace}/{pod} {container or ''}{' --previous' if previous else ''}",
+                              time.monotonic() - start, not error, written)
+    if error:
+        discard_output(tmp_path)
+        print(f"Error getting logs for {namespace}/{pod} {container or ''}: {error}")
+        return False
+    finish_output(tmp_path, final_path)
+    return True
+
+
+def save_logs(namespace, pod, date_str, base_dir, containers=None, restarts=None, previous=None):
+    """
+    Stream pod logs into logs/. Multi-container pods get one file per container
+    (<ns>_<pod>_<date>_<container>.log, like get_all_pods_logs.sh); with previous
+    (default: LOG_OPTIONS["previous"]), restarted containers also get a *_previous.log file.
+    """
+    previous = LOG_OPTIONS["previous"] if previous is None else previous
+    logs_dir = os.path.join(base_dir, "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    print(f"Getting logs for pod {pod} in namespace {namespace}...")
+    containers = containers or [None]
+    restarts = restarts or {}
+    for container in containers:
+        suffix = f"_{container}" if len(containers) > 1 else ""
+        filename = f"{namespace}_{pod}_{date_str}{suffix}.log"
+        stream_log_to_file(namespace, pod, container, False, os.path.join(logs_dir, filename), _deadline)
+        if previous and restarts.get(container, 0) > 0:
+            filename = f"{namespace}_{pod}_{date_str}{suffix}_previous.log"
+            stream_log_to_file(namespace, pod, container, True, os.path.join(logs_dir, filename), _deadline)
+
+
+def save_pod_logs(base_dir, namespaces, date_str, troubled_only=False):
+    """
+    Save the logs of the pods the selection wants: its "logs" rule label selector goes to the pod
+    listing, the not-ready filter and limit are applied to it. troubled_only keeps the pods that
+    are not Ready or have restarted (before the limit, so it picks among all of them), and always
+    takes the previous logs of restarted containers.
+    """
+    log_namespaces = [ns for ns in namespaces if SELECTION.wants_namespace("logs", ns)]
+    log_rules = [SELECTION.rule_for("logs", ns) or {} for ns in log_namespaces]
+    with trace_span("pod logs"):
+        pods_by_ns = run_tasks([(get_pod_containers, (ns, rule.get("selector"), rule.get("pods") == "not-ready"))
+                                for ns, rule in zip(log_namespaces, log_rules)])
+        log_tasks = []
+        for ns, rule, pods in zip(log_namespaces, log_rules, pods_by_ns):
+            pods = pods or []
+            if troubled_only:
+                pods = [entry for entry in pods if not entry[3] or any(entry[2].values())]  # not ready, or restarted
+            for pod, containers, restarts, ready in pods[:rule.get("limit")]:
+                log_tasks.append((run_unit, (f"logs:{ns}/{pod}", save_logs,
+                                             (ns, pod, date_str, base_dir, containers, restarts,
+                                              True if troubled_only else None))))
+        run_tasks(log_tasks)
+
+
+def save_describes(base_dir, types):
+    """Describe every object of types, [(resource type, describes/ directory, namespaces or None)]."""
+    with trace_span("describes"):
+        tasks = []
+        for res, directory, namespaces in types:
+            tasks += describe_tasks(res, namespaces, base_dir, directory)
+        run_tasks(tasks)
+
+
+def save_describe(resource_type, name, namespace, base_dir):
+    desc_dir = os.path.join(base_dir, "describes", resource_type)
+    os.makedirs(desc_dir, exist_ok=True)
+    if namespace:
+        filename = f"{namespace}_{name}.txt"
+        describe_cmd = f"kubectl describe {resource_type} {name} -n {namespace}"
+        get_cmd = f"kubectl get {resource_type} {name} -n {namespace}"
+    else:
+        filename = f"{name}.txt"
+        describe_cmd = f"kubectl describe {resource_type} {name}"
+        get_cmd = f"kubectl get {resource_type} {name}"
+    filepath = os.path.join(desc_dir, filename)
+    print(f"Describing {resource_type} {name} in namespace {namespace or 'cluster-wide'}...")
+    if OBJECT_FORMAT != "describe":
+        # One JSON get feeds both objects/<type>.ndjson and the YAML section
+        json_output = run_cmd(f"{get_cmd} -o json")
+        try:
+            obj = json.loads(json_output) if json_output else None
+        except ValueError:
+            obj = None
+        if obj is None:
+            print(f"Failed to get {resource_type} {name} as JSON")
+            return
+        write_object_json(base_dir, resource_type, obj)
+        if OBJECT_FORMAT == "json":
+            return
+        describe_output, yaml_output = run_cmd(describe_cmd), dump_yaml(obj)
+    else:
+        describe_output = run_cmd(describe_cmd)
+        yaml_output = run_cmd(f"{get_cmd} -o yaml")
+    if describe_output is None and yaml_output is None:
+        print(f"Failed to get describe and yaml for {resource_type} {name}")
+        return
+    write_describe_file(filepath, describe_output, yaml_output)
+
+
+def write_describe_file(filepath, describe_output, yaml_output):
+    """
+    Write the DESCRIBE/YAML sections in the layout cluster_validation_v3.py reads.
+    The file is replaced atomically, so hardlinked copies of an older version stay intact.
+    """
+    final_path = output_path(filepath)
+    data = ("--- DESCRIBE OUTPUT ---\n" + (describe_output + "\n\n" if describe_output else "<No output>\n\n")
+            + YAML_SECTION_MARKER + (yaml_output + "\n" if yaml_output else "<No output>\n")).encode("utf-8")
+    with open_compressed(final_path + ".tmp", "wb") as f:
+        f.write(data)
+    finish_output(final_path + ".tmp", final_path)
+    with _manifest_lock:
+        _file_digests[os.path.normpath(filepath)] = describe_file_digest(data)
+
+
+# Structured output (--object-format json|both): described objects are also, or with "json" only,
+# saved as canonical JSON lines (sorted keys, no managedFields) in objects/<describe type>.ndjson.
+# cluster_validation_v3.py reads fields straight from these instead of regex-parsing describe text.
+OBJECT_FORMAT = "describe"
+OBJECTS_DIR = "objects"
+_object_json_lock = threading.Lock()
+_object_json_files = {}     # describe type -> open NDJSON file
+_previous_object_json = {}  # describe type -> {(namespace, name): line} from the previous snapshot
+_resumed_object_json = {}   # describe type -> lines of the units a --resume run skips
+
+
+def configure_object_format(object_format):
+    """Select how described objects are saved: "describe" text, "json" lines, or "both"."""
+    global OBJECT_FORMAT
+    OBJECT_FORMAT = object_format
+
+
+def canonical_object_json(obj):
+    metadata = {k: v for k, v in obj.get("metadata", {}).items() if k != "managedFields"}
+    return json.dumps(dict(obj, metadata=metadata), sort_keys=True, separators=(",", ":"))
+
+
+def write_object_json(base_dir, describe_type, obj=None, line=None):
+    """Append one object (or an already canonical line) to objects/<describe_type>.ndjson."""
+    line = line or canonical_object_json(obj)
+    with _object_json_lock:
+        f = _object_json_files.get(describe_type)
+        if f is None:
+            objects_dir = os.path.join(base_dir, OBJECTS_DIR)
+            os.makedirs(objects_dir, exist_ok=True)
+            path = os.path.join(objects_dir, f"{describe_type}.ndjson")
+            _shared_outputs.add(output_path(path))
+            f = _object_json_files[describe_type] = open_output(path)
+        f.write(line + "\n")
+    unit = current_unit()
+    if unit is not None:
+        unit[2].setdefault(describe_type, []).append(line)
+
+
+def close_object_json(base_dir):
+    resumed = dict(_resumed_object_json)
+    _resumed_object_json.clear()
+    for describe_type, lines in resumed.items():
+        for line in lines:
+            write_object_json(base_dir, describe_type, line=line)
+    with _object_json_lock:
+        for f in _object_json_files.values():
+            f.close()
+        _object_json_files.clear()
+
+
+def previous_object_json(describe_type, namespace, name):
+    """The previous snapshot's JSON line for an object, or None."""
+    with _object_json_lock:
+        lines = _previous_object_json.get(describe_type)
+        if lines is None:
+            lines = _previous_object_json[describe_type] = {}
+            path = os.path.join(_previous_snapshot["root"], OBJECTS_DIR, f"{describe_type}.ndjson")
+            for suffix in ("",) + tuple(COMPRESSION_SUFFIXES.values()):
+                if os.path.isfile(path + suffix):
+                    data = _read_snapshot_file(path + suffix) or b""
+                    for line in data.decode("utf-8").splitlines():
+                        meta = json.loads(line).get("metadata", {})
+                        lines[(meta.get("namespace") or "", meta.get("name"))] = line
+                    break
+    return lines.get((namespace or "", name))
+
+
+def save_describe_2(resource_type, name, namespace, base_dir):
+    desc_dir = os.path.join(base_dir, "describes", resource_type)
+    os.makedirs(desc_dir, exist_ok=True)
+    if namespace:
+        filename = f"{namespace}_{name}.txt"
+        cmd = f"kubectl describe {resource_type} {name} -n {namespace}"
+    else:
+        filename = f"{name}.txt"
+        cmd = f"kubectl describe {resource_type} {name}"
+    filepath = os.path.join(desc_dir, filename)
+    print(f"Describing {resource_type} {name} in namespace {namespace or 'cluster-wide'}...")
+    desc = run_cmd(cmd)
+    if desc is not None:
+        with open_output(filepath) as f:
+            f.write(desc)
+
+
+def get_resource_names(resource_type, namespace=None):
+    if TRANSPORT == "api":
+        path = resource_path(resource_type, namespace)
+        listing = api_get_json(path) if path else None
+        return [item["metadata"]["name"] for item in (listing or {}).get("items", [])]
+    if namespace:
+        cmd = f"kubectl get {resource_type} -n {namespace} -o jsonpath='{{.items[*].metadata.name}}'"
+    else:
+        cmd = f"kubectl get {resource_type} -o jsonpath='{{.items[*].metadata.name}}'"
+    output = run_cmd(cmd)
+    if output:
+        return output.split()
+    return []
+
+
+METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+
+
+def get_resource_metadata(resource_type, namespace=None, all_namespaces=False, label_selector=None):
+    """
+    List (namespace, name, uid, resourceVersion) for a type without pulling whole objects
+    into Python: a jsonpath listing with kubectl, a PartialObjectMetadataList with the api transport.
+    """
+    entries = []
+    if TRANSPORT == "api":
+        path = resource_path(resource_type, None if all_namespaces else namespace)
+        token = None
+        while path:
+            params = {"limit": LIST_PAGE_SIZE}
+            if label_selector:
+                params["labelSelector"] = label_selector
+            if token:
+                params["continue"] = token
+            listing = api_get_json(path, params, accept=METADATA_LIST_ACCEPT)
+            if listing is None:
+                break
+            for item in listing.get("items") or []:
+                meta = item.get("metadata", {})
+                entries.append((meta.get("namespace"), meta.get("name"), meta.get("uid"), meta.get("resourceVersion")))
+            token = (listing.get("metadata") or {}).get("continue")
+            if not token:
+                break
+        return entries
+    jsonpath = '{range .items[*]}{.metadata.namespace}{"\\t"}{.metadata.name}{"\\t"}{.metadata.uid}{"\\t"}{.metadata.resourceVersion}{"\\n"}{end}'
+    if all_namespaces:
+        scope = "-A"
+    elif namespace:
+        scope = f"-n {namespace}"
+    else:
+        scope = ""
+    if label_selector:
+        scope += f" -l {shlex.quote(label_selector)}"
+    output = run_cmd(f"kubectl get {resource_type} {scope} -o jsonpath='{jsonpath}'")
+    for line in (output or "").splitlines():
+        parts = line.split("\t")
+        if len(parts) == 4 and parts[1]:
+            entries.append((parts[0] or None, parts[1], parts[2], parts[3]))
+    return entries
+
+
+def iter_resource_pages(resource_type, page_size=None, list_meta=None, selectors=None, accept=None):
+    """
+    Yield the objects of a type cluster-wide one API page (limit/continue) at a time.
+    Items get kind/apiVersion from the list, which the API server leaves out of list items.
+    Yields nothing more after a failed page (the error is printed). A list_meta dict is
+    updated with each page's list metadata (resourceVersion, to start a watch from).
+    selectors (labelSelector/fieldSelector) and accept are passed on to the list request.
+    """
+    path = resource_path(resource_type)
+    if not path:
+        return
+    token = None
+    while True:
+        params = {"limit": page_size or LIST_PAGE_SIZE, **(selectors or {})}
+        if token:
+            params["continue"] = token
+        listing = api_get_json(path, params, accept)
+        if listing is None:
+            print(f"Listing {resource_type} stopped early (request failed)")
+            return
+        if list_meta is not None:
+            list_meta.update(listing.get("metadata") or {})
+        kind = listing.get("kind", "")
+        kind = kind[:-4] if kind.endswith("List") else kind
+        items = listing.get("items") or []
+        for item in items:
+            item.setdefault("apiVersion", listing.get("apiVersion"))
+            item.setdefault("kind", kind)
+        yield items
+        token = (listing.get("metadata") or {}).get("continue")
+        if not token:
+            return
+
+
+def get_resource_list(resource_type):
+    """Fetch every object of a type cluster-wide (paged). Returns a list of dicts, or None on failure."""
+    items = None
+    for page in iter_resource_pages(resource_type):
+        if items is None:
+            items = []
+        items.extend(page)
+    return items
+
+
+_events_lock = threading.RLock()
+_all_events = None
+_events_by_uid = None
+
+# Filters for events/events.ndjson (--events-since, --event-types)
+EVENT_FILTERS = {"since": None, "types": None}
+
+
+def get_all_events():
+    """Every cluster event, listed once per run and shared by bulk describes and save_cluster_events."""
+    global _all_events
+    with _events_lock:
+        if _all_events is None:
+            _all_events = get_resource_list("events") or []
+        return _all_events
+
+
+def parse_k8s_time(value):
+    """Parse an API server timestamp (RFC 3339, with or without microseconds)."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def event_record(event):
+    """Compact events.ndjson form of a core/v1 or events.k8s.io/v1 Event."""
+    meta = event.get("metadata", {})
+    involved = event.get("involvedObject") or event.get("regarding") or {}
+    series = event.get("series") or {}
+    created = meta.get("creationTimestamp")
+    return {
+        "uid": meta.get("uid"),
+        "namespace": meta.get("namespace"),
+        "type": event.get("type"),
+        "reason": event.get("reason"),
+        "kind": involved.get("kind"),
+        "name": involved.get("name"),
+        "count": event.get("count") or series.get("count") or 1,
+        "first": event.get("firstTimestamp") or event.get("eventTime") or created,
+        "last": series.get("lastObservedTime") or event.get("lastTimestamp") or event.get("eventTime") or created,
+        "source": (event.get("source") or {}).get("component") or event.get("reportingComponent"),
+        "message": event.get("message") or event.get("note"),
+    }
+
+
+def get_events_by_object():
+    """Index cluster events by involvedObject UID (fetched once per run) for bulk describes."""
+    global _events_by_uid
+    with _events_lock:
+        if _events_by_uid is None:
+            _events_by_uid = {}
+            for event in get_all_events():
+                uid = event.get("involvedObject", {}).get("uid")
+                if uid:
+                    _events_by_uid.setdefault(uid, []).append(event)
+        return _events_by_uid
+
+
+def dump_yaml(obj):
+    if yaml is not None:
+        return yaml.safe_dump(obj, default_flow_style=False, sort_keys=False).rstrip("\n")
+    return json.dumps(obj, indent=2)
+
+
+def _describe_map(lines, title, mapping, sep="="):
+    # Multi-line map sections ("Labels:" then indented key=value), as the validator parses them
+    if not mapping:
+        lines.append(f"{title}:  <none>")
+        return
+    lines.append(f"{title}:")
+    for key, value in mapping.items():
+        lines.append(f"  {key}{sep}{value}")
+
+
+def _describe_containers(lines, containers, statuses, indent="  "):
+    status_by_name = {s.get("name"): s for s in statuses or []}
+    for c in containers or []:
+        lines.append(f"{indent}Container: {c.get('name')}")
+        lines.append(f"{indent}  Image:  {c.get('image', '<none>')}")
+        ports = [f"{p.get('containerPort')}/{p.get('protocol', 'TCP')}" for p in c.get("ports", [])]
+        if ports:
+            lines.append(f"{indent}  Ports:  {', '.join(ports)}")
+        status = status_by_name.get(c.get("name"))
+        if status:
+            state = next(iter(status.get("state", {})), "unknown")
+            lines.append(f"{indent}  State:  {state.capitalize()}")
+            reason = status.get("state", {}).get(state, {}).get("reason")
+            if reason:
+                lines.append(f"{indent}    Reason:  {reason}")
+            lines.append(f"{indent}  Ready:  {status.get('ready', False)}")
+            lines.append(f"{indent}  Restart Count:  {status.get('restartCount', 0)}")
+        env = c.get("env", [])
+        if env:
+            lines.append(f"{indent}  Environment:")
+            for var in env:
+                if "value" in var:
+                    value = var["value"]
+                elif "valueFrom" in var:
+                    value = f"<set from {next(iter(var['valueFrom']), 'source')}>"
+                else:
+                    value = ""
+                lines.append(f"{indent}    {var.get('name')}:  {value}")
+        else:
+            lines.append(f"{indent}  Environment:  <none>")
+
+
+def render_describe(obj, events=None):
+    """
+    Render a 'kubectl describe'-style summary from an object's JSON.
+    Covers the fields cluster_validation_v3.py looks for (Status, Container/Image,
+    Environment, Labels, Data, Host, Conditions, Events) plus generic metadata.
+    """
+    meta = obj.get("metadata", {})
+    spec = obj.get("spec", {}) or {}
+    status = obj.get("status", {}) or {}
+    kind = obj.get("kind", "")
+    lines = [f"Name:  {meta.get('name')}"]
+    if meta.get("namespace"):
+        lines.append(f"Namespace:  {meta['namespace']}")
+    lines.append(f"Kind:  {kind}")
+    lines.append(f"API Version:  {obj.get('apiVersion', '')}")
+    _describe_map(lines, "Labels", meta.get("labels"))
+    annotations = {k: v for k, v in (meta.get("annotations") or {}).items()
+                   if k != "kubectl.kubernetes.io/last-applied-configuration"}
+    _describe_map(lines, "Annotations", annotations, sep=": ")
+    lines.append(f"Creation Timestamp:  {meta.get('creationTimestamp', '<unknown>')}")
+
+    if kind == "Pod":
+        lines.append(f"Node:  {spec.get('nodeName', '<none>')}")
+        lines.append(f"Status:  {status.get('phase', 'Unknown')}")
+        if status.get("reason"):
+            lines.append(f"Reason:  {status['reason']}")
+        lines.append(f"IP:  {status.get('podIP', '<none>')}")
+        if spec.get("initContainers"):
+            lines.append("Init Containers:")
+            _describe_containers(lines, spec["initContainers"], status.get("initContainerStatuses"))
+        lines.append("Containers:")
+        _describe_containers(lines, spec.get("containers"), status.get("containerStatuses"))
+    elif kind in ("Deployment", "StatefulSet", "DaemonSet", "ReplicaSet"):
+        selector = (spec.get("selector") or {}).get("matchLabels") or {}
+        lines.append(f"Selector:  {','.join(f'{k}={v}' for k, v in selector.items()) or '<none>'}")
+        if kind == "DaemonSet":
+            lines.append(f"Desired Number of Nodes Scheduled: {status.get('desiredNumberScheduled', 0)}")
+            lines.append(f"Number of Nodes Scheduled with Available Pods: {status.get('numberAvailable', 0)}")
+        else:
+            lines.append(
+                f"Replicas:  {spec.get('replicas', 0)} desired | {status.get('updatedReplicas', 0)} updated | "
+                f"{status.get('replicas', 0)} total | {status.get('availableReplicas', 0)} available | "
+                f"{status.get('unavailableReplicas', 0)} unavailable"
+            )
+        template = spec.get("template", {}) or {}
+        lines.append("Pod Template:")
+        _describe_map(lines, "  Labels", (template.get("metadata") or {}).get("labels"))
+        lines.append("  Containers:")
+        _describe_containers(lines, (template.get("spec") or {}).get("containers"), None, indent="   ")
+    elif kind == "Service":
+        lines.append(f"Type:  {spec.get('type', 'ClusterIP')}")
+        lines.append(f"IP:  {spec.get('clusterIP', '<none>')}")
+        selector = spec.get("selector")
+        lines.append(f"Selector:  {','.join(f'{k}={v}' for k, v in selector.items()) if selector else '<unset>'}")
+        for port in spec.get("ports", []):
+            lines.append(f"Port:  {port.get('name', '<unset>')}  {port.get('port')}/{port.get('protocol', 'TCP')}")
+            lines.append(f"TargetPort:  {port.get('targetPort', port.get('port'))}")
+    elif kind in ("ConfigMap", "Secret"):
+        if kind == "Secret":
+            lines.append(f"Type:  {obj.get('type', 'Opaque')}")
+        data = dict(obj.get("data") or {})
+        data.update(obj.get("binaryData") or {})
+        if data:
+            lines.append("Data:")
+            for key, value in data.items():
+                lines.append(f"  {key}:  {len(value or '')} bytes")
+        else:
+            lines.append("Data:  <none>")
+    elif kind == "Ingress":
+        lines.append(f"Ingress Class:  {spec.get('ingressClassName', '<none>')}")
+        lines.append("Rules:")
+        for rule in spec.get("rules", []):
+            lines.append(f"  Host:  {rule.get('host', '*')}")
+            for path in (rule.get("http") or {}).get("paths", []):
+                backend = (path.get("backend") or {}).get("service") or {}
+                port = backend.get("port", {})
+                lines.append(f"    {path.get('path', '/')}  {backend.get('name')}:{port.get('number', port.get('name'))}")
+    elif kind == "Node":
+        for addr in status.get("addresses", []):
+            lines.append(f"{addr.get('type')}:  {addr.get('address')}")
+        info = status.get("nodeInfo", {})
+        if info:
+            lines.append(f"Kubelet Version:  {info.get('kubeletVersion')}")
+            lines.append(f"OS Image:  {info.get('osImage')}")
+        lines.append(f"Unschedulable:  {spec.get('unschedulable', False)}")
+
+    conditions = status.get("conditions")
+    if isinstance(conditions, list) and conditions:
+        lines.append("Conditions:")
+        for cond in conditions:
+            reason = f"  ({cond['reason']})" if cond.get("reason") else ""
+            lines.append(f"  {cond.get('type')}:  {cond.get('status')}{reason}")
+
+    if events:
+        lines.append("Events:")
+        lines.append("  Type    Reason    Age    From    Message")
+        for event in sorted(events, key=lambda e: e.get("lastTimestamp") or e.get("eventTime") or ""):
+            source = (event.get("source") or {}).get("component") or event.get("reportingComponent", "")
+            when = event.get("lastTimestamp") or event.get("eventTime") or ""
+            lines.append(f"  {event.get('type')}  {event.get('reason')}  {when}  {source}  {event.get('message', '').strip()}")
+    else:
+        lines.append("Events:  <none>")
+    return "\n".join(lines)
+
+
+def save_describes_bulk(resource_type, namespaces, base_dir, describe_type=None):
+    """
+    Bulk mode for save_describe(): list the type once cluster-wide (paged), then write one
+    describes/<describe_type>/<ns>_<name>.txt per object with the describe section
+    rendered locally from the JSON. Namespaced objects outside `namespaces` are skipped.
+    """
+    describe_type = describe_type or resource_type
+    print(f"Bulk listing {resource_type} (all namespaces)...")
+    wanted = set(namespaces) if namespaces is not None else None
+    events = get_events_by_object()
+    # iter_changed_objects selects and records the objects itself: wants() counts towards
+    # limit rules, so evaluating it again here would turn away objects it already recorded.
+    preselected = bool(_previous_snapshot["objects"])
+    if preselected:
+        objects = iter_changed_objects(resource_type, wanted, base_dir, describe_type)
+    else:
+        objects = (item for page in iter_resource_pages(resource_type) for item in page)
+    desc_dir = os.path.join(base_dir, "describes", describe_type)
+    written = 0
+    for obj in objects:
+        meta = obj.get("metadata", {})
+        name, namespace = meta.get("name"), meta.get("namespace")
+        rel_path = describe_rel_path(describe_type, name, namespace)
+        if not preselected:
+            if namespace and wanted is not None and namespace not in wanted:
+                continue
+            if not SELECTION.wants(resource_type, namespace, name):
+                continue
+            record_object(rel_path, describe_type, namespace, name, meta.get("uid"),
+                          object_version(meta.get("uid"), meta.get("resourceVersion")))
+        if OBJECT_FORMAT != "json":
+            os.makedirs(desc_dir, exist_ok=True)
+            write_describe_file(
+                os.path.join(base_dir, rel_path),
+                render_describe(obj, events.get(meta.get("uid"))),
+                dump_yaml(obj),
+            )
+        if OBJECT_FORMAT != "describe":
+            write_object_json(base_dir, describe_type, obj)
+        written += 1
+    print(f"Wrote {written} {resource_type} objects from a paged list")
+
+
+# Objects changing above this share of a type are re-listed in bulk rather than fetched one by one.
+INCREMENTAL_REFETCH_RATIO = 0.2
+
+
+def iter_changed_objects(resource_type, wanted, base_dir, describe_type):
+    """
+    Incremental bulk mode: list only metadata, hardlink unchanged objects from the previous
+    snapshot, and yield full objects for the ones that changed (fetched individually, or
+    through the normal paged list when many changed).
+    """
+    entries = get_resource_metadata(resource_type, all_namespaces=True)
+    changed = set()
+    for namespace, name, uid, resource_version in entries:
+        if namespace and wanted is not None and namespace not in wanted:
+            continue
+        if not SELECTION.wants(resource_type, namespace, name):
+            continue
+        rel_path = describe_rel_path(describe_type, name, namespace)
+        record_object(rel_path, describe_type, namespace, name, uid, object_version(uid, resource_version))
+        if not reuse_from_previous(rel_path, base_dir):
+            changed.add((namespace, name))
+    print(f"{resource_type}: {len(entries) - len(changed)} unchanged, {len(changed)} to fetch")
+    if not changed:
+        return
+    if len(changed) > INCREMENTAL_REFETCH_RATIO * len(entries):
+        for page in iter_resource_pages(resource_type):
+            for obj in page:
+                meta = obj.get("metadata", {})
+                if (meta.get("namespace"), meta.get("name")) in changed:
+                    yield obj
+        return
+    paths = [resource_path(resource_type, namespace, name) for namespace, name in sorted(changed, key=str)]
+    for obj in run_tasks([(api_get_json, (path,)) for path in paths if path]):
+        if obj is not None:
+            yield obj
+
+
+# Incremental snapshots: every run writes manifest.json (object file -> uid/version). When a
+# previous snapshot is given, unchanged objects are hardlinked from it instead of re-fetched,
+# and delta.json lists what was added, modified and deleted since.
+_manifest_lock = threading.Lock()
+_manifest = {}
+_previous_snapshot = {"root": None, "objects": {}}
+_file_digests = {}  # describe file path -> (sha256, size, yaml_offset, yaml_length), see index.sqlite
+
+
+def describe_rel_path(describe_type, name, namespace):
+    filename = f"{namespace}_{name}.txt" if namespace else f"{name}.txt"
+    return os.path.join("describes", describe_type, filename)
+
+
+def object_version(uid, resource_version):
+    """
+    Version of an object's describe file: its resourceVersion, plus a digest of the
+    resourceVersions of its events, since the rendered Events section changes with them.
+    The digest is only worth its cluster-wide event listing when a previous snapshot is
+    compared against, or in bulk mode, which lists the events for the describes anyway.
+    """
+    if _previous_snapshot["root"] is None and not BULK_MODE:
+        return resource_version
+    events = get_events_by_object().get(uid)
+    if not events:
+        return resource_version
+    event_versions = ",".join(sorted(e.get("metadata", {}).get("resourceVersion", "") for e in events))
+    return f"{resource_version}+{hashlib.sha1(event_versions.encode()).hexdigest()[:12]}"
+
+
+def record_object(rel_path, kind, namespace, name, uid, version):
+    entry = {"kind": kind, "namespace": namespace, "name": name, "uid": uid, "version": version}
+    with _manifest_lock:
+        _manifest[rel_path] = entry
+    unit = current_unit()
+    if unit is not None:
+        unit[1][rel_path] = entry  # restored from the checkpoint when a resumed run skips the unit
+
+
+def forget_object(rel_path):
+    with _manifest_lock:
+        _manifest.pop(rel_path, None)
+
+
+def reuse_from_previous(rel_path, base_dir):
+    """Hardlink rel_path from the previous snapshot if its uid and version are unchanged."""
+    previous = _previous_snapshot["objects"].get(rel_path)
+    current = _manifest.get(rel_path)
+    if not previous or not current or previous["uid"] != current["uid"] or previous["version"] != current["version"]:
+        return False
+    line = None
+    if OBJECT_FORMAT != "describe":
+        line = previous_object_json(current["kind"], current["namespace"], current["name"])
+        if line is None:
+            return False
+    if OBJECT_FORMAT != "json":
+        # The previous run may have used another --compress setting; reuse its file as it is.
+        for suffix in ("",) + tuple(COMPRESSION_SUFFIXES.values()):
+            src = os.path.join(_previous_snapshot["root"], rel_path) + suffix
+            if os.path.isfile(src):
+                break
+        else:
+            return False
+        dest = os.path.join(base_dir, rel_path) + suffix
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copy2(src, dest)  # different filesystem or no hardlink support
+    if line:
+        write_object_json(base_dir, current["kind"], line=line)
+    return True
+
+
+def find_previous_snapshot(base_dir):
+    """Most recent sibling k8s_backup_<node>_* folder that has a manifest.json, or None."""
+    parent = os.path.dirname(os.path.abspath(base_dir))
+    prefix = os.path.basename(base_dir).split("_20")[0] + "_"
+    candidates = []
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if entry.startswith(prefix) and path != os.path.abspath(base_dir) \
+                and os.path.isfile(os.path.join(path, "manifest.json")):
+            candidates.append((os.path.getmtime(os.path.join(path, "manifest.json")), path))
+    return max(candidates)[1] if candidates else None
+
+
+def load_previous_snapshot(previous_root):
+    with open(os.path.join(previous_root, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    _previous_snapshot["root"] = previous_root
+    _previous_snapshot["objects"] = manifest.get("objects", {})
+    print(f"Incremental run against {previous_root} ({len(_previous_snapshot['objects'])} objects)")
+
+
+@traced
+def write_manifest(base_dir):
+    """Write manifest.json, and delta.json when this run was incremental."""
+    with open_plain_output(os.path.join(base_dir, "manifest.json")) as f:
+        json.dump({
+            "generated": datetime.now().isoformat(timespec="seconds"),
+            "previous": _previous_snapshot["root"],
+            "objects": _manifest,
+        }, f, indent=1, sort_keys=True)
+    if not _previous_snapshot["root"]:
+        return
+    previous = _previous_snapshot["objects"]
+    kinds = {entry["kind"] for entry in _manifest.values()}
+    delta = {"previous": _previous_snapshot["root"], "added": [], "modified": [], "deleted": [], "unchanged": 0}
+    for rel_path, entry in _manifest.items():
+        old = previous.get(rel_path)
+        if old is None:
+            delta["added"].append(rel_path)
+        elif old["uid"] != entry["uid"] or old["version"] != entry["version"]:
+            delta["modified"].append(rel_path)
         else:
-            names = get_resource_names(res)
-            for name in names:
-                save_describe(res, name, None, base_dir)
+            delta["unchanged"] += 1
+    # Only types collected this run count as deleted, so a narrower run doesn't report everything gone
+    delta["deleted"] = sorted(p for p, e in previous.items() if p not in _manifest and e["kind"] in kinds)
+    delta["added"].sort()
+    delta["modified"].sort()
+    with open_plain_output(os.path.join(base_dir, "delta.json")) as f:
+        json.dump(delta, f, indent=1)
+    print(f"Delta vs previous snapshot: {len(delta['added'])} added, {len(delta['modified'])} modified, "
+          f"{len(delta['deleted'])} deleted, {delta['unchanged']} unchanged")
+
+
+# Snapshot index: index.sqlite in the snapshot root has one row per object in the manifest, with
+# the digest and size of its (uncompressed) describe file and where the YAML section starts in it,
+# plus a row per file in the snapshot. cluster_validation_v3.py looks objects up by key there
+# and skips comparing files whose digests match, instead of walking and reading both trees.
+SNAPSHOT_INDEX_FILE = "index.sqlite"
+YAML_SECTION_MARKER = "--- YAML OUTPUT ---\n"
+
+
+def describe_file_digest(data):
+    """(sha256, size, yaml_offset, yaml_length) of a describe file's uncompressed bytes."""
+    marker = YAML_SECTION_MARKER.encode()
+    start = data.find(marker)
+    if start < 0:
+        return hashlib.sha256(data).hexdigest(), len(data), None, None
+    offset = start + len(marker)
+    length = max(len(data) - offset - 1, 0)  # the section ends with one newline
+    if data[offset:] == b"<No output>\n":
+        length = 0
+    return hashlib.sha256(data).hexdigest(), len(data), offset, length
+
+
+def _read_snapshot_file(path):
+    """Uncompressed bytes of a snapshot file, or None when its codec isn't available."""
+    if PACK and PACK.member_name(path):
+        data = PACK.read(path)
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    if path.endswith(".gz"):
+        return gzip.decompress(data)
+    if path.endswith(".zst"):
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data) if zstandard else None
+    return data
+
+
+def _previous_index_rows():
+    """Digest rows of the previous snapshot's index by path, for files reused from it."""
+    if not _previous_snapshot["root"]:
+        return {}
+    path = os.path.join(_previous_snapshot["root"], SNAPSHOT_INDEX_FILE)
+    if not os.path.isfile(path):
+        return {}
+    db = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        return {row[0]: row[1:] for row in db.execute(
+            "SELECT path, uid, version, sha256, size, yaml_offset, yaml_length FROM objects")}
+    except sqlite3.Error as e:
+        print(f"Ignoring unreadable index {path}: {e}")
+        return {}
+    finally:
+        db.close()
+
+
+@traced
+def write_snapshot_index(base_dir):
+    """Write index.sqlite for the objects in the manifest and every file of the snapshot."""
+    previous = _previous_index_rows()
+    rows = []
+    for rel_path, entry in sorted(_manifest.items()):
+        physical = None
+        for suffix in ("",) + tuple(COMPRESSION_SUFFIXES.values()):
+            if (PACK.exists if PACK else os.path.isfile)(os.path.join(base_dir, rel_path) + suffix):
+                physical = rel_path + suffix
+                break
+        if physical is None:
+            continue
+        digest = _file_digests.get(os.path.normpath(os.path.join(base_dir, rel_path)))
+        old = previous.get(rel_path)
+        if digest is None and old and old[:2] == (entry["uid"], entry["version"]):
+            digest = old[2:]
+        if digest is None:
+            data = _read_snapshot_file(os.path.join(base_dir, physical))
+            digest = describe_file_digest(data) if data is not None else (None, None, None, None)
+        rows.append((rel_path, physical, entry["kind"], entry["namespace"] or "", entry["name"],
+                     entry["uid"], entry["version"]) + tuple(digest))
+    if PACK:
+        stored = [(name, size) for name, size in PACK.sizes() if not name.endswith((".tmp", ".part"))]
+    else:
+        stored = []
+        for dirpath, _, filenames in os.walk(base_dir):
+            for filename in filenames:
+                if filename.endswith((".tmp", ".part")) or filename.startswith(SNAPSHOT_INDEX_FILE):
+                    continue
+                path = os.path.join(dirpath, filename)
+                stored.append((os.path.relpath(path, base_dir), os.path.getsize(path)))
+    files = [(re.sub(r"\.(gz|zst)$", "", physical), physical, size) for physical, size in stored]
+
+    if PACK:
+        # The pack is an SQLite database already: the index tables go next to its members
+        with PACK.lock:
+            _write_index_tables(PACK.db, rows, files)
+        print(f"Snapshot index: {len(rows)} objects, {len(files)} files in {PACK.path}")
+        return
+    tmp_path = os.path.join(base_dir, SNAPSHOT_INDEX_FILE + ".tmp")
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        _write_index_tables(db, rows, files)
+    finally:
+        db.close()
+    os.replace(tmp_path, os.path.join(base_dir, SNAPSHOT_INDEX_FILE))
+    print(f"Snapshot index: {len(rows)} objects, {len(files)} files in {SNAPSHOT_INDEX_FILE}")
+
+
+def _write_index_tables(db, rows, files):
+    db.executescript("""
+        DROP TABLE IF EXISTS meta;  -- a resumed pack already has the index of its first run
+        DROP TABLE IF EXISTS objects;
+        DROP TABLE IF EXISTS files;
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE objects (
+            path TEXT PRIMARY KEY,  -- logical path, without the compression suffix
+            file TEXT NOT NULL,     -- stored file: on disk, or the pack member
+            kind TEXT NOT NULL, namespace TEXT NOT NULL, name TEXT NOT NULL,
+            uid TEXT, version TEXT,
+            sha256 TEXT, size INTEGER,               -- of the uncompressed describe file
+            yaml_offset INTEGER, yaml_length INTEGER -- YAML section, in uncompressed bytes
+        );
+        CREATE INDEX objects_by_key ON objects (kind, namespace, name);
+        CREATE INDEX objects_by_uid ON objects (uid);
+        CREATE TABLE files (path TEXT PRIMARY KEY, file TEXT NOT NULL, stored_size INTEGER);
+    """)
+    db.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("generated", datetime.now().isoformat(timespec="seconds")),
+        ("compression", COMPRESSION or ""),
+        ("previous", _previous_snapshot["root"] or ""),
+    ])
+    db.executemany("INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", files)
+    db.commit()
+
+
+# Live mirror (--watch DIR): list each type once, then follow watch streams and keep DIR in the
+# describes/ layout up to date. Files are replaced atomically, so a snapshot is just a tree of
+# hardlinks. Events go to events/events.ndjson and stay there after the API server expires them.
+WATCH_TIMEOUT = 240           # seconds per watch request; it is re-opened from the last resourceVersion
+WATCH_RETRY_DELAY = 5         # seconds before retrying a failed list/watch
+WATCH_FLUSH_INTERVAL = 10     # seconds between re-renders of objects that got new events
+EVENTS_KEPT_PER_OBJECT = 50   # newest events rendered into an object's Events section
+
+
+class WatchExpired(Exception):
+    """The watch resourceVersion is too old (HTTP 410 Gone); the type must be listed again."""
+
+
+def _watch_lines(path, params):
+    """Yield the raw JSON lines of one watch request until the server ends it."""
+    params = dict(params, watch="true", allowWatchBookmarks="true", timeoutSeconds=WATCH_TIMEOUT)
+    if TRANSPORT == "api":
+        status, resp, conn = _api_client.open(path, params)
+        if status >= 400:
+            error = resp.read().decode(errors="replace").strip()[:500]
+            _api_client.release(resp, conn)
+            if status == 410:
+                raise WatchExpired(error)
+            raise ConnectionError(f"HTTP {status}: {error}")
+        if conn.sock:
+            conn.sock.settimeout(WATCH_TIMEOUT + 30)
+        try:
+            for line in iter(resp.readline, b""):
+                yield line
+        finally:
+            conn.close()  # never return a watch connection to the pool
+        return
+    wait_for_api_slot()
+    proc = subprocess.Popen(["kubectl", "get", "--raw", f"{path}?{urlencode(params)}"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        for line in proc.stdout:
+            yield line
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+class ClusterMirror:
+    """On-disk mirror of the watched types; see --watch."""
+
+    def __init__(self, root, types):
+        self.root = root
+        self.types = types  # [(resource_type, describe_type)]
+        self.lock = threading.Lock()
+        self.objects = {}         # uid -> (resource_type, describe_type, namespace, name)
+        self.events_by_uid = {}   # involvedObject uid -> newest events
+        self.event_counts = {}    # event uid -> last count written to events.ndjson
+        self.dirty = set()        # uids whose Events section changed since the last flush
+        os.makedirs(os.path.join(root, "events"), exist_ok=True)
+        self.events_file = open(os.path.join(root, "events", "events.ndjson"), "a")
+
+    def write_object(self, resource_type, describe_type, obj):
+        meta = obj.get("metadata", {})
+        uid, namespace, name = meta.get("uid"), meta.get("namespace"), meta.get("name")
+        rel_path = describe_rel_path(describe_type, name, namespace)
+        with self.lock:
+            self.objects[uid] = (resource_type, describe_type, namespace, name)
+            events = list(self.events_by_uid.get(uid, []))
+        os.makedirs(os.path.join(self.root, os.path.dirname(rel_path)), exist_ok=True)
+        write_describe_file(os.path.join(self.root, rel_path), render_describe(obj, events), dump_yaml(obj))
+        return rel_path
+
+    def delete_object(self, describe_type, obj):
+        meta = obj.get("metadata", {})
+        with self.lock:
+            self.objects.pop(meta.get("uid"), None)
+            self.events_by_uid.pop(meta.get("uid"), None)
+        path = output_path(os.path.join(self.root, describe_rel_path(describe_type, meta.get("name"), meta.get("namespace"))))
+        if os.path.exists(path):
+            os.remove(path)
+
+    def record_event(self, event):
+        """Append a new or updated event to events.ndjson (once per count) and index it by object."""
+        meta = event.get("metadata", {})
+        count = event.get("count") or (event.get("series") or {}).get("count") or 1
+        with self.lock:
+            if self.event_counts.get(meta.get("uid")) == count:
+                return
+            self.event_counts[meta.get("uid")] = count
+            self.events_file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self.events_file.flush()
+            involved = event.get("involvedObject", {}).get("uid")
+            if involved:
+                history = [e for e in self.events_by_uid.get(involved, []) if e.get("metadata", {}).get("uid") != meta.get("uid")]
+                self.events_by_uid[involved] = (history + [event])[-EVENTS_KEPT_PER_OBJECT:]
+                if involved in self.objects:
+                    self.dirty.add(involved)
+
+    def follow(self, resource_type, describe_type=None):
+        """List resource_type, then apply its watch stream forever (one thread per type)."""
+        is_events = describe_type is None
+        while True:
+            try:
+                list_meta, written = {}, set()
+                for page in iter_resource_pages(resource_type, list_meta=list_meta):
+                    for obj in page:
+                        if is_events:
+                            self.record_event(obj)
+                        else:
+                            written.add(self.write_object(resource_type, describe_type, obj))
+                if not list_meta.get("resourceVersion"):
+                    raise ConnectionError("list failed")
+                if not is_events:
+                    self.prune(describe_type, written)
+                resource_version = list_meta["resourceVersion"]
+                print(f"Mirror: {resource_type} listed at resourceVersion {resource_version}, watching...")
+                path = resource_path(resource_type)
+                while True:
+                    for line in _watch_lines(path, {"resourceVersion": resource_version}):
+                        event = json.loads(line)
+                        obj = event.get("object") or {}
+                        if event.get("type") == "ERROR":
+                            if obj.get("code") == 410:
+                                raise WatchExpired(obj.get("message", ""))
+                            raise ConnectionError(obj.get("message", "watch error"))
+                        resource_version = obj.get("metadata", {}).get("resourceVersion") or resource_version
+                        if event.get("type") == "BOOKMARK":
+                            continue
+                        if is_events:
+                            if event.get("type") != "DELETED":  # expired events stay in the mirror
+                                self.record_event(obj)
+                        elif event.get("type") == "DELETED":
+                            self.delete_object(describe_type, obj)
+                        else:
+                            self.write_object(resource_type, describe_type, obj)
+            except WatchExpired:
+                print(f"Mirror: {resource_type} watch expired, listing again")
+            except (OSError, ValueError, ConnectionError, http.client.HTTPException) as e:
+                print(f"Mirror: {resource_type} list/watch failed ({e}); retrying in {WATCH_RETRY_DELAY}s")
+                time.sleep(WATCH_RETRY_DELAY)
+
+    def prune(self, describe_type, written):
+        """Drop files of objects that disappeared while nobody was watching (after a (re)list)."""
+        desc_dir = os.path.join(self.root, "describes", describe_type)
+        keep = {output_path(os.path.join(self.root, rel_path)) for rel_path in written}
+        for filename in os.listdir(desc_dir) if os.path.isdir(desc_dir) else []:
+            path = os.path.join(desc_dir, filename)
+            if path not in keep and not filename.endswith(".tmp"):
+                os.remove(path)
+
+    def flush_dirty(self):
+        """Re-render objects whose Events section changed, with one GET each."""
+        with self.lock:
+            dirty = [(uid, self.objects[uid]) for uid in self.dirty if uid in self.objects]
+            self.dirty.clear()
+        paths = [resource_path(res, namespace, name) for _, (res, _, namespace, name) in dirty]
+        for (uid, (res, describe_type, _, _)), obj in zip(dirty, run_tasks([(api_get_json, (p,)) for p in paths])):
+            if obj and obj.get("metadata", {}).get("uid") == uid:
+                self.write_object(res, describe_type, obj)
+
+    def snapshot(self, dest):
+        """Copy the mirror to dest as hardlinks (events.ndjson, which grows in place, is copied)."""
+        for dirpath, _, files in os.walk(self.root):
+            target_dir = os.path.join(dest, os.path.relpath(dirpath, self.root))
+            os.makedirs(target_dir, exist_ok=True)
+            for filename in files:
+                if filename.endswith(".tmp"):
+                    continue
+                src, target = os.path.join(dirpath, filename), os.path.join(target_dir, filename)
+                if filename == "events.ndjson":
+                    with self.lock:
+                        shutil.copy2(src, target)
+                else:
+                    _link_or_copy(src, target)
+        print(f"Mirror snapshot written to {dest}")
+
+
+def run_watch_mirror(root, types, snapshot_interval=None):
+    """
+    Run the live mirror in the foreground until interrupted. A snapshot (k8s_backup_<node>_<date>
+    next to the working directory) is taken every snapshot_interval seconds and on SIGUSR1.
+    """
+    mirror = ClusterMirror(root, types)
+    snapshot_requested = threading.Event()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: snapshot_requested.set())
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # stop cleanly under a service manager too
+    threads = [threading.Thread(target=mirror.follow, args=("events",), daemon=True)]
+    threads += [threading.Thread(target=mirror.follow, args=(res, describe_type), daemon=True)
+                for res, describe_type in types]
+    for thread in threads:
+        thread.start()
+    print(f"Mirroring {len(types)} resource types and events into {root} (Ctrl-C to stop, "
+          f"kill -USR1 {os.getpid()} for a snapshot)")
+    next_snapshot = time.monotonic() + snapshot_interval if snapshot_interval else None
+    try:
+        while True:
+            snapshot_requested.wait(WATCH_FLUSH_INTERVAL)
+            mirror.flush_dirty()
+            if snapshot_requested.is_set() or (next_snapshot and time.monotonic() >= next_snapshot):
+                snapshot_requested.clear()
+                date_str = datetime.now().strftime("%Y-%m-%d")
+                mirror.snapshot(create_incremental_path(f"k8s_backup_{get_node_name()}_{date_str}"))
+                if snapshot_interval:
+                    next_snapshot = time.monotonic() + snapshot_interval
+    except KeyboardInterrupt:
+        print("Mirror stopped.")
+    finally:
+        mirror.events_file.close()
+
+
+# Content-addressed snapshot store (--blob-store). Files are hashed and stored once under
+# <store>/objects/<sha256[:2]>/<sha256>; the snapshot keeps hardlinks to the blobs, so identical
+# content across days and replicas costs one copy. With --blob-chunk-logs, big .log files are split
+# into line-aligned, content-defined chunks under <store>/chunks/ and replaced by a <file>.chunks
+# recipe, which only --materialize turns back into a log the validator (or a person) can read.
+# Where a hardlink is not possible (the store on another filesystem), the file is copied instead and
+# <store>/copied.txt records it, since such a blob keeps a link count of 1 while still in use.
+BLOB_CHUNK_THRESHOLD = 1024 * 1024
+BLOB_COPIES_FILE = "copied.txt"
+CHUNK_MIN_SIZE = 16 * 1024
+CHUNK_MAX_SIZE = 256 * 1024
+CHUNK_BOUNDARY_MASK = 0x3F  # a qualifying line ends a chunk ~1 in 64 times
+
+
+def _store_path(store_dir, kind, digest):
+    return os.path.join(store_dir, kind, digest[:2], digest)
+
+
+def _link_or_copy(src, dest):
+    """Hardlink src to dest, or copy it; returns True if it was linked."""
+    try:
+        os.link(src, dest)
+        return True
+    except OSError:
+        shutil.copy2(src, dest)
+        return False
+
+
+def _file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _put_chunk(store_dir, data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = _store_path(store_dir, "chunks", digest)
+    if os.path.exists(path):
+        return digest, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return digest, True
+
+
+def store_file_as_blob(filepath, store_dir):
+    """
+    Replace filepath with a hardlink to its blob. Returns (bytes newly stored, bytes
+    deduplicated, the blob's digest if filepath is a copy of it rather than a link, else None).
+    """
+    size = os.path.getsize(filepath)
+    digest = _file_sha256(filepath)
+    blob = _store_path(store_dir, "objects", digest)
+    if os.path.exists(blob):
+        tmp_path = filepath + ".blob"
+        linked = _link_or_copy(blob, tmp_path)
+        os.replace(tmp_path, filepath)
+        return 0, size, None if linked else digest
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    copied = None
+    try:
+        os.link(filepath, blob)
+    except FileExistsError:
+        # Stored meanwhile by another collector sharing the store (--contexts/--kubeconfig-dir)
+        return store_file_as_blob(filepath, store_dir)
+    except OSError:
+        shutil.copy2(filepath, blob)
+        copied = digest
+    os.chmod(blob, 0o444)  # blobs are shared by every snapshot that links them
+    return size, 0, copied
+
+
+def store_file_as_chunks(filepath, store_dir):
+    """
+    Split a large log into line-aligned chunks whose boundaries depend only on content
+    (so appended or replica logs share chunks), store them, and replace the file with a
+    <file>.chunks JSON recipe. Returns (bytes newly stored, bytes deduplicated, None).
+    """
+    recipe = {"size": 0, "sha256": None, "store": os.path.abspath(store_dir), "chunks": []}
+    whole = hashlib.sha256()
+    stored = deduped = 0
+    buf, buf_size = [], 0
 
+    def flush():
+        nonlocal stored, deduped, buf, buf_size
+        if not buf:
+            return
+        data = b"".join(buf)
+        digest, new = _put_chunk(store_dir, data)
+        recipe["chunks"].append(digest)
+        if new:
+            stored += len(data)
+        else:
+            deduped += len(data)
+        buf, buf_size = [], 0
 
-def save_ingress_classes(base_dir):
-    ingress_classes = get_resource_names("ingressclasses")
-    for ic in ingress_classes:
-        save_describe("ingressclass", ic, None, base_dir)
+    with open(filepath, "rb") as f:
+        while True:
+            line = f.readline(CHUNK_MAX_SIZE)
+            if not line:
+                break
+            whole.update(line)
+            recipe["size"] += len(line)
+            buf.append(line)
+            buf_size += len(line)
+            if buf_size >= CHUNK_MAX_SIZE or \
+                    (buf_size >= CHUNK_MIN_SIZE and zlib.crc32(line) & CHUNK_BOUNDARY_MASK == 0):
+                flush()
+        flush()
+    recipe["sha256"] = whole.hexdigest()
+    with open(filepath + ".chunks", "w") as f:
+        json.dump(recipe, f)
+    os.remove(filepath)
+    return stored, deduped, None
 
 
-def save_logs(namespace, pod, date_str, base_dir):
-    logs_dir = os.path.join(base_dir, "logs")
-    os.makedirs(logs_dir, exist_ok=True)
-    filename = f"{namespace}_{pod}_{date_str}.log"
-    filepath = os.path.join(logs_dir, filename)
-    print(f"Getting logs for pod {pod} in namespace {namespace}...")
-    logs = run_cmd(f"kubectl logs -n {namespace} {pod}")
-    if logs is not None:
-        with open(filepath, "w") as f:
-            f.write(logs)
+@traced
+def store_snapshot_in_blobs(base_dir, store_dir, chunk_logs=False):
+    """
+    Move a finished snapshot into the content-addressed store; with chunk_logs, .log files
+    of BLOB_CHUNK_THRESHOLD or more are stored as chunks (see above).
+    """
+    print(f"Deduplicating {base_dir} into blob store {store_dir}...")
+    os.makedirs(store_dir, exist_ok=True)
+    tasks = []
+    for dirpath, _, files in os.walk(base_dir):
+        for filename in files:
+            filepath = os.path.join(dirpath, filename)
+            if filename.endswith((".part", ".chunks")) or os.path.islink(filepath):
+                continue
+            if chunk_logs and filename.endswith(".log") and os.path.getsize(filepath) >= BLOB_CHUNK_THRESHOLD:
+                tasks.append((store_file_as_chunks, (filepath, store_dir)))
+            else:
+                tasks.append((store_file_as_blob, (filepath, store_dir)))
+    results = [r for r in run_tasks(tasks) if r]
+    stored = sum(r[0] for r in results)
+    deduped = sum(r[1] for r in results)
+    copied = sorted({r[2] for r in results if r[2]})
+    if copied:
+        print(f"Blob store: {len(copied)} files copied, not hardlinked (store on another filesystem?)")
+        with open(os.path.join(store_dir, BLOB_COPIES_FILE), "a") as f:
+            f.writelines(f"{os.path.abspath(base_dir)}\t{digest}\n" for digest in copied)
+    with open(os.path.join(store_dir, "snapshots.txt"), "a") as f:
+        f.write(os.path.abspath(base_dir) + "\n")
+    print(f"Blob store: {len(results)} files, {stored / 1e6:.1f} MB new, {deduped / 1e6:.1f} MB deduplicated")
 
 
-def save_describe(resource_type, name, namespace, base_dir):
-    desc_dir = os.path.join(base_dir, "describes", resource_type)
-    os.makedirs(desc_dir, exist_ok=True)
-    if namespace:
-        filename = f"{namespace}_{name}.txt"
-        describe_cmd = f"kubectl describe {resource_type} {name} -n {namespace}"
-        yaml_cmd = f"kubectl get {resource_type} {name} -n {namespace} -o yaml"
-    else:
-        filename = f"{name}.txt"
-        describe_cmd = f"kubectl describe {resource_type} {name}"
-        yaml_cmd = f"kubectl get {resource_type} {name} -o yaml"
-    filepath = os.path.join(desc_dir, filename)
-    print(f"Describing {resource_type} {name} in namespace {namespace or 'cluster-wide'}...")
-    describe_output = run_cmd(describe_cmd)
-    yaml_output = run_cmd(yaml_cmd)
-    if describe_output is None and yaml_output is None:
-        print(f"Failed to get describe and yaml for {resource_type} {name}")
-        return
-    with open(filepath, "w") as f:
-        if describe_output:
-            f.write("--- DESCRIBE OUTPUT ---\n")
-            f.write(describe_output)
-            f.write("\n\n")
-        else:
-            f.write("--- DESCRIBE OUTPUT ---\n<No output>\n\n")
-        if yaml_output:
-            f.write("--- YAML OUTPUT ---\n")
-            f.write(yaml_output)
-            f.write("\n")
-        else:
-            f.write("--- YAML OUTPUT ---\n<No output>\n")
+def materialize_chunked_files(snapshot_dir):
+    """Reassemble every <file>.chunks recipe in a snapshot back into the original file."""
+    restored = 0
+    for dirpath, _, files in os.walk(snapshot_dir):
+        for filename in files:
+            if not filename.endswith(".chunks"):
+                continue
+            recipe_path = os.path.join(dirpath, filename)
+            with open(recipe_path, "r") as f:
+                recipe = json.load(f)
+            target = recipe_path[:-len(".chunks")]
+            digest = hashlib.sha256()
+            with open(target + ".part", "wb") as out:
+                for chunk in recipe["chunks"]:
+                    with open(_store_path(recipe["store"], "chunks", chunk), "rb") as src:
+                        data = src.read()
+                    digest.update(data)
+                    out.write(data)
+            if digest.hexdigest() != recipe["sha256"]:
+                os.remove(target + ".part")
+                print(f"Checksum mismatch restoring {target}; recipe kept")
+                continue
+            os.replace(target + ".part", target)
+            os.remove(recipe_path)
+            restored += 1
+    print(f"Materialized {restored} chunked files in {snapshot_dir}")
 
 
-def save_describe_2(resource_type, name, namespace, base_dir):
-    desc_dir = os.path.join(base_dir, "describes", resource_type)
-    os.makedirs(desc_dir, exist_ok=True)
-    if namespace:
-        filename = f"{namespace}_{name}.txt"
-        cmd = f"kubectl describe {resource_type} {name} -n {namespace}"
-    else:
-        filename = f"{name}.txt"
-        cmd = f"kubectl describe {resource_type} {name}"
-    filepath = os.path.join(desc_dir, filename)
-    print(f"Describing {resource_type} {name} in namespace {namespace or 'cluster-wide'}...")
-    desc = run_cmd(cmd)
-    if desc is not None:
-        with open(filepath, "w") as f:
-            f.write(desc)
+def gc_blob_store(store_dir):
+    """
+    Drop blobs no snapshot links any more (link count 1, unless a surviving snapshot holds
+    a copy of it) and chunks no surviving snapshot recipe references. Run after deleting old
+    snapshot folders.
+    """
+    with open(os.path.join(store_dir, "snapshots.txt"), "r") as f:
+        roots = [line.strip() for line in f if line.strip()]
+    live_roots = [root for root in dict.fromkeys(roots) if os.path.isdir(root)]
+    copies_path = os.path.join(store_dir, BLOB_COPIES_FILE)
+    copies = []
+    if os.path.isfile(copies_path):
+        with open(copies_path, "r") as f:
+            copies = [tuple(line.rstrip("\n").split("\t")) for line in f if "\t" in line]
+        copies = [(root, digest) for root, digest in copies if root in live_roots]
+    copied_blobs = {digest for _, digest in copies}
+    live_chunks = set()
+    for root in live_roots:
+        for dirpath, _, files in os.walk(root):
+            for filename in files:
+                if filename.endswith(".chunks"):
+                    with open(os.path.join(dirpath, filename), "r") as f:
+                        live_chunks.update(json.load(f)["chunks"])
+    removed = freed = 0
+    for kind in ("objects", "chunks"):
+        for dirpath, _, files in os.walk(os.path.join(store_dir, kind)):
+            for filename in files:
+                path = os.path.join(dirpath, filename)
+                st = os.stat(path)
+                if (kind == "objects" and st.st_nlink == 1 and filename not in copied_blobs) or \
+                        (kind == "chunks" and filename not in live_chunks):
+                    os.remove(path)
+                    removed += 1
+                    freed += st.st_size
+    with open(os.path.join(store_dir, "snapshots.txt"), "w") as f:
+        f.writelines(root + "\n" for root in live_roots)
+    if os.path.isfile(copies_path):
+        with open(copies_path, "w") as f:
+            f.writelines(f"{root}\t{digest}\n" for root, digest in copies)
+    print(f"Blob store GC: removed {removed} unreferenced blobs/chunks ({freed / 1e6:.1f} MB)")
 
 
-def get_resource_names(resource_type, namespace=None):
-    if namespace:
-        cmd = f"kubectl get {resource_type} -n {namespace} -o jsonpath='{{.items[*].metadata.name}}'"
-    else:
-        cmd = f"kubectl get {resource_type} -o jsonpath='{{.items[*].metadata.name}}'"
-    output = run_cmd(cmd)
-    if output:
-        return output.split()
-    return []
+# Node-level OS snapshots: (file in os_info/, command). network_drops.txt is parsed from /proc/net/dev.
+OS_INFO_COMMANDS = [
+    ("cpu_usage.txt", "top -bn1 | head -20"),  # CPU usage (top 1 snapshot)
+    ("memory_usage.txt", "free -h"),
+    ("disk_usage.txt", "df -h"),
+    ("kernel_dmesg.txt", "dmesg -T"),  # Human-readable timestamps
+]
 
 
+@checkpointed
+@traced
 def save_os_info(base_dir):
     """Save OS info locally (single-node execution)."""
     os_dir = os.path.join(base_dir, "os_info")
@@ -279,46 +3198,20 @@ def save_os_info(base_dir):
     node = get_node_name()
     print(f"Gathering OS info for node {node}...")
 
-    # CPU usage (top 1 snapshot)
-    cpu_file = os.path.join(os_dir, "cpu_usage.txt")
-    cpu_info = run_cmd("top -bn1 | head -20")
-    if cpu_info:
-        with open(cpu_file, "w") as f:
-            f.write(f"--- Node: {node} ---\n")
-            f.write(cpu_info)
-
-    # Memory usage
-    mem_file = os.path.join(os_dir, "memory_usage.txt")
-    mem_info = run_cmd("free -h")
-    if mem_info:
-        with open(mem_file, "w") as f:
-            f.write(f"--- Node: {node} ---\n")
-            f.write(mem_info)
-
-    # Disk space usage
-    disk_file = os.path.join(os_dir, "disk_usage.txt")
-    disk_info = run_cmd("df -h")
-    if disk_info:
-        with open(disk_file, "w") as f:
-            f.write(f"--- Node: {node} ---\n")
-            f.write(disk_info)
+    for filename, cmd in OS_INFO_COMMANDS:
+        output = run_cmd(cmd)
+        if output:
+            with open_output(os.path.join(os_dir, filename)) as f:
+                f.write(f"--- Node: {node} ---\n")
+                f.write(output)
 
     # Network dropped packets (custom parse)
-    net_file = os.path.join(os_dir, "network_drops.txt")
     net_info = get_network_drops_local()
     if net_info:
-        with open(net_file, "w") as f:
+        with open_output(os.path.join(os_dir, "network_drops.txt")) as f:
             f.write(f"--- Node: {node} ---\n")
             f.write(net_info)
 
-    # Kernel logs (dmesg)
-    dmesg_file = os.path.join(os_dir, "kernel_dmesg.txt")
-    dmesg_info = run_cmd("dmesg -T")  # Human-readable timestamps
-    if dmesg_info:
-        with open(dmesg_file, "w") as f:
-            f.write(f"--- Node: {node} ---\n")
-            f.write(dmesg_info)
-
 
 def get_network_drops_local():
     # Local version of network drops parsing
@@ -327,7 +3220,11 @@ def get_network_drops_local():
             lines = f.readlines()
     except Exception as e:
         return f"Error reading /proc/net/dev: {e}"
+    return format_network_drops(lines)
 
+
+def format_network_drops(lines):
+    """Per-interface RX/TX dropped counters from /proc/net/dev lines."""
     result_lines = ["Interface  RX_dropped  TX_dropped"]
     for line in lines[2:]:
         parts = line.strip().split()
@@ -350,10 +3247,259 @@ def save_nodes_describe(base_dir):
         filepath = os.path.join(nodes_dir, f"{node}.txt")
         desc = run_cmd(f"kubectl describe node {node}")
         if desc:
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(desc)
 
 
+# Systemd units whose journal is saved (last 1000 lines each), and log files copied as they are.
+K8S_SYSTEMD_UNITS = [
+    "k3s",
+    "rke2-server",
+    "rke2-agent",
+    "kubelet",
+    "kube-apiserver",
+    "kube-controller-manager",
+    "kube-scheduler",
+]
+UNIT_PROBE_CMD = ["systemctl", "list-unit-files", "--no-legend", "--no-pager"] + \
+    [f"{unit}.service" for unit in K8S_SYSTEMD_UNITS]
+K8S_LOG_FILES = [
+    "/var/log/k3s.log",
+    "/var/log/rke2.log",
+    "/var/log/kubelet.log",
+    "/var/log/kube-apiserver.log",
+    "/var/log/kube-controller-manager.log",
+    "/var/log/kube-scheduler.log",
+    "/var/log/messages",
+]
+
+# Journals are read incrementally: each snapshot stores the cursor of the last entry read per
+# unit in k8s_system_logs/<node>/journal_cursors.json, and an --incremental run continues after
+# it. Without a cursor only the last JOURNAL_INITIAL_LINES entries are read.
+JOURNAL_INITIAL_LINES = 1000
+JOURNAL_CURSORS_FILE = "journal_cursors.json"
+JOURNAL_CURSOR_PREFIX = b"-- cursor: "
+
+# Log files are streamed, never read whole: at most NODE_LOG_MAX_BYTES per file and its rotated
+# siblings (the newest data is kept), with the inode and end offset of each file stored in
+# k8s_system_logs/<node>/log_offsets.json so an --incremental run copies only what was appended.
+NODE_LOG_MAX_BYTES = 256 * 1024 * 1024
+NODE_LOG_OFFSETS_FILE = "log_offsets.json"
+
+
+def configure_node_logs(max_bytes=None):
+    """Set the byte cap per node log file family (0 = no cap)."""
+    global NODE_LOG_MAX_BYTES
+    if max_bytes is not None:
+        NODE_LOG_MAX_BYTES = max(0, max_bytes)
+
+
+def rotated_siblings(filepath):
+    """Rotated copies of filepath (name.1, name.2.gz, name-20240101.gz, ...), newest first."""
+    directory, name = os.path.split(filepath)
+    pattern = re.compile(re.escape(name) + r"[.-]\d+(\.gz)?$")
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return []
+    siblings = [os.path.join(directory, entry) for entry in entries if pattern.match(entry)]
+    return sorted(siblings, key=os.path.getmtime, reverse=True)
+
+
+def _copy_bytes(source, out, count=None):
+    """Copy count bytes (or to EOF) from source to out in LOG_CHUNK_SIZE pieces."""
+    copied = 0
+    while count is None or copied < count:
+        chunk = source.read(LOG_CHUNK_SIZE if count is None else min(LOG_CHUNK_SIZE, count - copied))
+        if not chunk:
+            break
+        out.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def copy_node_log(src, dest, node, start=0, max_bytes=None):
+    """
+    Stream src from byte start into output_path(dest) behind a node header, keeping only the
+    last max_bytes (cut at a line start). .gz sources are decompressed on the fly; plain ones
+    are copied by the kernel (os.sendfile) when the output is not compressed.
+    Returns (end offset in src, bytes copied, whether max_bytes cut the copy short).
+    """
+    compressed = src.endswith(".gz")
+    if compressed:
+        with open(src, "rb") as f:
+            f.seek(-4, os.SEEK_END)
+            size = int.from_bytes(f.read(4), "little")  # gzip ISIZE: uncompressed size (mod 2**32)
+    else:
+        size = os.path.getsize(src)  # later appends are left for the next run
+    if start > size:
+        start = 0  # truncated in place (copytruncate) since the bookmark
+    cut = bool(max_bytes) and size - start > max_bytes
+    if cut:
+        start = size - max_bytes
+    final_path = output_path(dest)
+    tmp_path = final_path + ".part"
+    with (gzip.open(src, "rb") if compressed else open(src, "rb")) as source:
+        source.seek(start)  # forward seeks in a gzip stream decompress and discard
+        if cut:
+            while not source.readline(LOG_CHUNK_SIZE).endswith(b"\n"):
+                pass
+        note = f" (from byte {source.tell()} of {os.path.basename(src)})" if source.tell() else ""
+        with open_compressed(tmp_path, "wb") as out:
+            out.write(f"--- Node: {node}{note} ---\n".encode())
+            offset = source.tell()
+            if not compressed and not COMPRESSION and not PACK and hasattr(os, "sendfile"):
+                out.flush()
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), source.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                copied = offset - source.tell()
+            else:
+                copied = _copy_bytes(source, out, None if compressed else size - offset)
+    finish_output(tmp_path, final_path)
+    return size, copied, cut
+
+
+def save_node_log_file(filepath, dest_dir, node, bookmark=None):
+    """
+    Copy filepath and its rotated siblings (decompressed, under their own names) into dest_dir,
+    newest first, within NODE_LOG_MAX_BYTES together. With a bookmark ({"inode", "offset"}) from
+    the previous snapshot, only data written since is copied: the rest of the file the bookmark
+    points into (the live file, or a rotated .1 of it) and anything newer. When that file was
+    compressed away, the newest rotated sibling is copied whole. Returns the next bookmark.
+    """
+    inode = os.stat(filepath).st_ino
+    sources = [filepath] + rotated_siblings(filepath)
+    plan = [(src, 0) for src in sources]
+    if bookmark:
+        for i, src in enumerate(sources):
+            if not src.endswith(".gz") and os.stat(src).st_ino == bookmark["inode"]:
+                plan = plan[:i] + [(src, bookmark["offset"])]
+                break
+        else:
+            plan = plan[:2]
+    budget = NODE_LOG_MAX_BYTES or None
+    end = 0
+    for src, start in plan:
+        name = os.path.basename(src)[:-3] if src.endswith(".gz") else os.path.basename(src)
+        src_end, copied, cut = copy_node_log(src, os.path.join(dest_dir, name), node, start, budget)
+        if src == filepath:
+            end = src_end
+        print(f"Copied local log file: {src} ({copied} bytes)")
+        if budget is not None:
+            budget -= copied
+            if cut or budget <= 0:
+                break
+    return {"inode": inode, "offset": end}
+
+
+def _journal_units_cache(node):
+    return os.path.join(STATE_DIR, "journal_units", f"{node}.json") if STATE_DIR else None
+
+
+def cached_journal_units(node):
+    """The installed K8S_SYSTEMD_UNITS of node as last probed, or None when not probed within DISCOVERY_CACHE_TTL."""
+    cache_path = _journal_units_cache(node)
+    if cache_path and os.path.isfile(cache_path) and time.time() - os.path.getmtime(cache_path) < DISCOVERY_CACHE_TTL:
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    return None
+
+
+def store_journal_units(node, installed):
+    """Cache the probed units of node (any iterable of unit names), kept in K8S_SYSTEMD_UNITS order."""
+    units = [unit for unit in K8S_SYSTEMD_UNITS if unit in set(installed)]
+    cache_path = _journal_units_cache(node)
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(units, f)
+    return units
+
+
+def journal_units(node):
+    """
+    The K8S_SYSTEMD_UNITS installed on this machine, found with one systemctl call and cached
+    in STATE_DIR for DISCOVERY_CACHE_TTL (k3s and rke2 nodes have different units).
+    """
+    units = cached_journal_units(node)
+    if units is not None:
+        return units
+    start = time.monotonic()
+    # Exits non-zero when none of the units exist, which is an answer too
+    result = subprocess.run(UNIT_PROBE_CMD, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if TRACER:
+        TRACER.record_command("host", "systemctl list-unit-files", time.monotonic() - start, True, len(result.stdout))
+    return store_journal_units(node, (line.split()[0].rsplit(".", 1)[0]
+                                      for line in result.stdout.splitlines() if line.strip()))
+
+
+def previous_node_bookmarks(node, filename):
+    """
+    Bookmarks (JOURNAL_CURSORS_FILE, NODE_LOG_OFFSETS_FILE) stored for node by the previous
+    (--incremental) snapshot, or {}.
+    """
+    if not _previous_snapshot["root"]:
+        return {}
+    path = os.path.join(_previous_snapshot["root"], "k8s_system_logs", node, filename)
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_journal(unit, log_file, node, cursor=None):
+    """
+    Stream `journalctl -u unit` into log_file: every entry after cursor, or the last
+    JOURNAL_INITIAL_LINES without one. Returns the cursor of the last entry read (cursor
+    itself when there was nothing new).
+    """
+    cmd = ["journalctl", "-u", unit, "--no-pager", "--show-cursor"]
+    cmd += [f"--after-cursor={cursor}"] if cursor else ["-n", str(JOURNAL_INITIAL_LINES)]
+    final_path = output_path(log_file)
+    tmp_path = final_path + ".part"
+    start = time.monotonic()
+    new_cursor, written = cursor, 0
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    watchdog = threading.Timer(HOST_COMMAND_OPTIONS["timeout"] or 3600, proc.kill)
+    watchdog.start()
+    try:
+        with open_compressed(tmp_path, "wb") as f:
+            # --show-cursor ends the output with a cursor line, so hold each line back by one
+            pending = None
+            for line in proc.stdout:
+                if pending is not None:
+                    written += f.write(pending)
+                elif line.startswith(b"-- No entries --"):
+                    continue
+                else:
+                    header = f"--- Node: {node} ---\n" if not cursor else \
+                        f"--- Node: {node} (entries since the previous snapshot) ---\n"
+                    f.write(header.encode())
+                pending = line
+            if pending is not None and pending.startswith(JOURNAL_CURSOR_PREFIX):
+                new_cursor = pending[len(JOURNAL_CURSOR_PREFIX):].decode().strip()
+            elif pending is not None:
+                written += f.write(pending)
+    finally:
+        watchdog.cancel()
+        proc.stdout.close()
+        proc.wait()
+    if TRACER:
+        TRACER.record_command("host", " ".join(cmd), time.monotonic() - start, proc.returncode == 0, written)
+    if written:
+        finish_output(tmp_path, final_path)
+        print(f"Saving logs for systemd unit: {unit} on {node}")
+    else:
+        discard_output(tmp_path)
+    return new_cursor if proc.returncode == 0 else cursor
+
+
+@checkpointed
+@traced
 def save_k8s_system_logs(base_dir):
     """Save K8s system logs locally (single-node execution)."""
     syslog_dir = os.path.join(base_dir, "k8s_system_logs")
@@ -365,51 +3511,29 @@ def save_k8s_system_logs(base_dir):
 
     print(f"Gathering K8s system logs for node {node}...")
 
-    # List of systemd units to try
-    systemd_units = [
-        "k3s",
-        "rke2-server",
-        "rke2-agent",
-        "kubelet",
-        "kube-apiserver",
-        "kube-controller-manager",
-        "kube-scheduler",
-    ]
-
-    # Systemd units logs
-    for unit in systemd_units:
+    # Systemd units logs, continuing from the previous snapshot's cursors
+    previous_cursors = previous_node_bookmarks(node, JOURNAL_CURSORS_FILE)
+    cursors = {}
+    for unit in journal_units(node):
         log_file = os.path.join(node_syslog_dir, f"{unit}.log")
-        logs_cmd = f"journalctl -u {unit} --no-pager -n 1000"  # last 1000 lines
-        logs = run_cmd(logs_cmd)
-        if logs:
-            print(f"Saving logs for systemd unit: {unit} on {node}")
-            with open(log_file, "w") as f:
-                f.write(f"--- Node: {node} ---\n")
-                f.write(logs)
-
-    # Common log files
-    common_log_files = [
-        "/var/log/k3s.log",
-        "/var/log/rke2.log",
-        "/var/log/kubelet.log",
-        "/var/log/kube-apiserver.log",
-        "/var/log/kube-controller-manager.log",
-        "/var/log/kube-scheduler.log",
-        "/var/log/messages",
-    ]
+        cursor = save_journal(unit, log_file, node, previous_cursors.get(unit))
+        if cursor:
+            cursors[unit] = cursor
+    with open_plain_output(os.path.join(node_syslog_dir, JOURNAL_CURSORS_FILE)) as f:
+        json.dump(cursors, f, indent=1)
 
-    for filepath in common_log_files:
-        dest_file = os.path.join(node_syslog_dir, os.path.basename(filepath))
+    # Common log files (and their rotated siblings), continuing from the previous snapshot's offsets
+    previous_offsets = previous_node_bookmarks(node, NODE_LOG_OFFSETS_FILE)
+    offsets = {}
+    for filepath in K8S_LOG_FILES:
         if os.path.isfile(filepath):
             try:
-                with open(filepath, "r") as src:
-                    content = src.read()
-                with open(dest_file, "w") as dst:
-                    dst.write(f"--- Node: {node} ---\n")
-                    dst.write(content)
-                print(f"Copied local log file: {filepath}")
+                offsets[filepath] = save_node_log_file(filepath, node_syslog_dir, node,
+                                                       previous_offsets.get(filepath))
             except Exception as e:
                 print(f"Failed to read {filepath}: {e}")
+    with open_plain_output(os.path.join(node_syslog_dir, NODE_LOG_OFFSETS_FILE)) as f:
+        json.dump(offsets, f, indent=1)
 
 def save_node_port_scans(base_dir, node_ips):
     """
@@ -446,7 +3570,7 @@ def save_node_port_scans(base_dir, node_ips):
         )
         nmap_output = run_cmd(nmap_cmd)
         if nmap_output:
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(f"--- Node: {node} (IP: {ip}) ---\n")
                 f.write(f"Scan command: nmap -p 1-65535 {ip} --open -sT -T4\n")
                 f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
@@ -455,24 +3579,314 @@ def save_node_port_scans(base_dir, node_ips):
         else:
             print(f"Failed to scan ports for {node} (IP: {ip}) - check kubectl permissions or network.")
             # Save error note
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(f"--- Node: {node} (IP: {ip}) ---\n")
                 f.write("Scan failed - no output captured.\n")
 
 
+# Helm 3 keeps each release revision in a sh.helm.release.v1 secret (labels owner=helm, name,
+# version, status) whose data.release is base64(gzip(JSON)). The releases `helm list` shows (the
+# latest deployed or failed revision) are read from one paged secret listing and decoded here,
+# instead of forking helm per release. The `helm list` row of each release revision is cached in
+# STATE_DIR/helm_releases, so an unchanged release is neither fetched nor decoded for the list.
+# Values can hold credentials and are never cached: save_helm_values decodes them again.
+HELM_RELEASE_SELECTORS = {"labelSelector": "owner=helm,status in (deployed,failed)",
+                          "fieldSelector": "type=helm.sh/release.v1"}
+HELM_CACHE_FIELDS = ("name", "namespace", "revision", "updated", "status", "chart", "app_version", "secret", "uid")
+_helm_releases_lock = threading.Lock()
+_helm_releases = None
+
+
+def decode_helm_release(secret):
+    """The release JSON inside a sh.helm.release.v1 secret."""
+    payload = base64.b64decode(base64.b64decode(secret["data"]["release"]))
+    if payload[:2] == b"\x1f\x8b":
+        payload = gzip.decompress(payload)
+    return json.loads(payload)
+
+
+def _helm_release_entry(secret, release):
+    """What the snapshot needs from a release: its `helm list` row and user-supplied values."""
+    info, chart = release.get("info") or {}, (release.get("chart") or {}).get("metadata") or {}
+    return {
+        "name": release.get("name"),
+        "namespace": release.get("namespace") or secret["metadata"].get("namespace"),
+        "revision": release.get("version"),
+        "updated": info.get("last_deployed", ""),
+        "status": info.get("status", ""),
+        "chart": f"{chart.get('name', '')}-{chart.get('version', '')}",
+        "app_version": chart.get("appVersion", ""),
+        "values": release.get("config") or {},
+        "secret": secret["metadata"]["name"],
+    }
+
+
+def _helm_cache_path(namespace, name):
+    if not STATE_DIR:
+        return None
+    return os.path.join(STATE_DIR, "helm_releases", f"{namespace}_{name}.json")
+
+
+def _load_helm_release(namespace, secret_meta):
+    """Decode one release secret (fetched when the listing only had metadata) and cache the entry."""
+    secret = secret_meta
+    if "data" not in secret:
+        secret = api_get_json(resource_path("secrets", namespace, secret_meta["metadata"]["name"]))
+        if secret is None:
+            return None
+    try:
+        entry = _helm_release_entry(secret, decode_helm_release(secret))
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Failed to decode Helm release secret {namespace}/{secret['metadata']['name']}: {e}")
+        return None
+    entry["uid"] = secret["metadata"].get("uid")
+    cache_path = _helm_cache_path(entry["namespace"], entry["name"])
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path + ".tmp", "w") as f:
+            json.dump({field: entry[field] for field in HELM_CACHE_FIELDS}, f)
+        os.replace(cache_path + ".tmp", cache_path)
+    return entry
+
+
+def load_helm_values(release):
+    """
+    User-supplied values of a get_helm_releases() entry, decoded from its secret when the
+    entry came from the cache: the one the listing returned, or (after a metadata-only listing)
+    fetched now. None (after printing the error) when that fails.
+    """
+    if release["values"] is None:
+        secret = release.pop("listed_secret", None) or \
+            api_get_json(resource_path("secrets", release["namespace"], release["secret"]))
+        if secret is None:
+            return None
+        try:
+            release["values"] = decode_helm_release(secret).get("config") or {}
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Failed to decode Helm release secret {release['namespace']}/{release['secret']}: {e}")
+            return None
+    return release["values"]
+
+
+def get_helm_releases():
+    """
+    The releases `helm list -A` would show, as _helm_release_entry dicts sorted by namespace
+    and name; None when the release secrets can't be listed (or none exist, e.g. with the
+    configmap storage driver), so callers fall back to the helm CLI.
+    """
+    global _helm_releases
+    with _helm_releases_lock:
+        if _helm_releases is not None:
+            return _helm_releases or None
+        latest = {}
+        # The api transport lists metadata only; kubectl --raw returns whole secrets
+        for page in iter_resource_pages("secrets", selectors=HELM_RELEASE_SELECTORS, accept=METADATA_LIST_ACCEPT):
+            for secret in page:
+                meta = secret.get("metadata", {})
+                labels = meta.get("labels") or {}
+                key = (meta.get("namespace"), labels.get("name"))
+                revision = int(labels.get("version", 0))
+                if key not in latest or revision > latest[key][0]:
+                    latest[key] = (revision, secret)
+        entries, tasks = [], []
+        for (namespace, name), (revision, secret) in latest.items():
+            cached = None
+            cache_path = _helm_cache_path(namespace, name)
+            if cache_path and os.path.isfile(cache_path):
+                with open(cache_path, "r") as f:
+                    cached = json.load(f)
+            # ("values" in a cache file written by an older version: decode again, which rewrites it without them)
+            if cached and "values" not in cached and cached.get("revision") == revision \
+                    and cached.get("uid") == secret["metadata"].get("uid"):
+                entry = dict(cached, values=None)  # see load_helm_values
+                if "data" in secret:
+                    entry["listed_secret"] = secret
+                entries.append(entry)
+            else:
+                tasks.append((_load_helm_release, (namespace, secret)))
+        decoded = [entry for entry in run_tasks(tasks) if entry]
+        print(f"Helm releases from release secrets: {len(entries) + len(decoded)} "
+              f"({len(entries)} unchanged, {len(decoded)} decoded)")
+        _helm_releases = sorted(entries + decoded, key=lambda e: (e["namespace"], e["name"]))
+        return _helm_releases or None
+
+
+def format_helm_list(releases):
+    """A `helm list -A` style table."""
+    header = ("NAME", "NAMESPACE", "REVISION", "UPDATED", "STATUS", "CHART", "APP VERSION")
+    rows = [header] + [(r["name"], r["namespace"], str(r["revision"]), r["updated"], r["status"], r["chart"],
+                        r["app_version"]) for r in releases]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header) - 1)]
+    return "\n".join("\t".join(cell.ljust(width) for cell, width in zip(row, widths)) + "\t" + row[-1]
+                     for row in rows)
+
+
+@checkpointed
+@traced
 def save_helm_list(base_dir):
     helm_dir = os.path.join(base_dir, "helm_releases")
     os.makedirs(helm_dir, exist_ok=True)
     helm_file = os.path.join(helm_dir, "helm_list_all_namespaces.txt")
     print("Gathering Helm releases list (all namespaces)...")
-    helm_output = run_cmd("helm list -A")
+    releases = get_helm_releases()
+    helm_output = format_helm_list(releases) if releases else run_cmd("helm list -A")
     if helm_output:
-        with open(helm_file, "w") as f:
+        with open_output(helm_file) as f:
             f.write(helm_output)
     else:
         print("No Helm releases found or helm command failed.")
 
 
+async def _read_capped(stream, buf, cap, drain=False):
+    """
+    Append stream to buf up to cap bytes. Returns True if output went past the cap;
+    with drain, the rest is read and dropped instead so the writer never blocks.
+    """
+    over_cap = False
+    while True:
+        chunk = await stream.read(LOG_CHUNK_SIZE)
+        if not chunk:
+            return over_cap
+        buf += chunk[:cap - len(buf)]
+        if len(buf) >= cap:
+            over_cap = True
+            if not drain:
+                return True
+
+
+def _kill_process_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _run_host_command(cmd, semaphore, deadline):
+    """Run one shell command under the per-command timeout, the batch deadline and the output cap."""
+    loop = asyncio.get_running_loop()
+    stdout, stderr = bytearray(), bytearray()
+    result = {"cmd": cmd, "status": "skipped", "exit_code": None, "duration": 0.0,
+              "stdout": stdout, "stderr": stderr}
+    async with semaphore:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return result
+        start = loop.time()
+        proc = await asyncio.create_subprocess_shell(
+            cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, start_new_session=True)  # own group, so a kill takes its children too
+        timeout = min(HOST_COMMAND_OPTIONS["timeout"] or remaining, remaining)
+        stopped = None
+
+        async def read_stdout():
+            nonlocal stopped
+            if await _read_capped(proc.stdout, stdout, HOST_COMMAND_OPTIONS["max_output"]):
+                stopped = "truncated"
+                _kill_process_group(proc)
+
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                read_stdout(), _read_capped(proc.stderr, stderr, LOG_CHUNK_SIZE, drain=True), proc.wait()), timeout)
+        except asyncio.TimeoutError:
+            stopped = "timeout"
+            _kill_process_group(proc)
+        if stopped:
+            try:
+                await asyncio.wait_for(proc.communicate(), 5)  # reap it and drain the pipes it left open
+            except asyncio.TimeoutError:
+                pass  # stuck in uninterruptible sleep; leave it behind
+        result["duration"] = loop.time() - start
+        result["exit_code"] = proc.returncode
+        result["status"] = stopped or ("ok" if proc.returncode == 0 else "failed")
+    return result
+
+
+async def _run_host_commands(commands, deadline=None):
+    semaphore = asyncio.Semaphore(HOST_COMMAND_OPTIONS["concurrency"])
+    batch_deadline = asyncio.get_running_loop().time() + (HOST_COMMAND_OPTIONS["budget"] or float("inf"))
+    if deadline is not None:
+        # the event loop clock is time.monotonic(), which the --budget deadline is measured on
+        batch_deadline = min(batch_deadline, deadline)
+    deadline = batch_deadline
+    results = await asyncio.gather(*(_run_host_command(cmd, semaphore, deadline) for cmd in commands.values()))
+    return dict(zip(commands, results))
+
+
+def run_host_commands(commands, deadline=None):
+    """
+    Run {name: shell command} concurrently on this host with HOST_COMMAND_OPTIONS limits,
+    stopping at `deadline` (time.monotonic()) if that comes before the batch budget.
+    Returns {name: result} with status (ok/failed/timeout/truncated/skipped), exit_code,
+    duration and the captured stdout/stderr bytes.
+    """
+    return asyncio.run(_run_host_commands(commands, deadline))
+
+
+# General System Commands (detailed_system_info/<name>.txt)
+DETAILED_SYSTEM_COMMANDS = {
+    "etchosts": "cat /etc/hosts",
+    "etcresolvconf": "cat /etc/resolv.conf",
+    "hostname": "hostname",
+    "hostnamefqdn": "hostname -f",
+    "date": "date",
+    "freem": "free -m",
+    "uptime": "uptime",
+    "dmesg": "dmesg",
+    "dfh": "df -h",
+    "dfi": "df -i",
+    "lsmod": "lsmod",
+    "mount": "mount",
+    "ps": "ps aux",
+    "vmstat": "vmstat 1 5",  # 5 samples, 1s interval
+    "top": "top -bn1",
+    "cpuinfo": "cat /proc/cpuinfo",
+    "ulimit-hard": "ulimit -a",  # All limits (hard/soft)
+    "file-nr": "cat /proc/sys/fs/file-nr",
+    "file-max": "cat /proc/sys/fs/file-max",
+    "uname": "uname -a",
+    "osrelease": "cat /etc/os-release",
+    "lsblk": "lsblk",
+    "lsof": "lsof",
+    "sysctla": "sysctl -a",
+    "systemd-units": "systemctl list-units --type=service",
+    "systemd-unit-files": "systemctl list-unit-files --type=service",
+    "service-statusall": "service --status-all",
+}
+
+# Network Commands
+DETAILED_NETWORK_COMMANDS = {
+    "iptablessave": "iptables-save",
+    "ip6tablessave": "ip6tables-save",
+    "iptablesmangle": "iptables -t mangle -L -n -v",
+    "iptablesnat": "iptables -t nat -L -n -v",
+    "iptables": "iptables -L -n -v",
+    "ip6tablesmangle": "ip6tables -t mangle -L -n -v",
+    "ip6tablesnat": "ip6tables -t nat -L -n -v",
+    "nft_ruleset": "nft list ruleset",
+    "ipaddrshow": "ip addr show",
+    "iproute": "ip route show",
+    "ipneighbour": "ip neigh show",
+    "iprule": "ip rule show",
+    "ipv6neighbour": "ip -6 neigh show",
+    "iplinkshow": "ip link show",
+    "ipv6rule": "ip -6 rule show",
+    "ipv6route": "ip -6 route show",
+    "ipv6addrshow": "ip -6 addr show",
+    "ssanp": "ss -anp",
+    "ssitan": "ss -itan",
+    "ssuapn": "ss -uapn",
+    "sswapn": "ss -wapn",
+    "ssxapn": "ss -xapn",
+    "ss4apn": "ss -4apn",
+    "ss6apn": "ss -6apn",
+    "sstunlp6": "ss -tunlp6",
+    "sstunlp4": "ss -tunlp4",
+    "cni": "ls -l /opt/cni/bin/",  # CNI binaries dir (adjust path if needed)
+}
+
+
+@checkpointed
+@traced
 def save_detailed_system_info(base_dir):
     """Save detailed system information locally (single-node execution).
     Runs various commands and saves outputs to files in detailed_system_info/.
@@ -485,101 +3899,251 @@ def save_detailed_system_info(base_dir):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"Gathering detailed system info for node {node}...")
 
-    # General System Commands
-    system_commands = {
-        "etchosts": "cat /etc/hosts",
-        "etcresolvconf": "cat /etc/resolv.conf",
-        "hostname": "hostname",
-        "hostnamefqdn": "hostname -f",
-        "date": "date",
-        "freem": "free -m",
-        "uptime": "uptime",
-        "dmesg": "dmesg",
-        "dfh": "df -h",
-        "dfi": "df -i",
-        "lsmod": "lsmod",
-        "mount": "mount",
-        "ps": "ps aux",
-        "vmstat": "vmstat 1 5",  # 5 samples, 1s interval
-        "top": "top -bn1",
-        "cpuinfo": "cat /proc/cpuinfo",
-        "ulimit-hard": "ulimit -a",  # All limits (hard/soft)
-        "file-nr": "cat /proc/sys/fs/file-nr",
-        "file-max": "cat /proc/sys/fs/file-max",
-        "uname": "uname -a",
-        "osrelease": "cat /etc/os-release",
-        "lsblk": "lsblk",
-        "lsof": "lsof",
-        "sysctla": "sysctl -a",
-        "systemd-units": "systemctl list-units --type=service",
-        "systemd-unit-files": "systemctl list-unit-files --type=service",
-        "service-statusall": "service --status-all",
-    }
-
-    # Network Commands
-    network_commands = {
-        "iptablessave": "iptables-save",
-        "ip6tablessave": "ip6tables-save",
-        "iptablesmangle": "iptables -t mangle -L -n -v",
-        "iptablesnat": "iptables -t nat -L -n -v",
-        "iptables": "iptables -L -n -v",
-        "ip6tablesmangle": "ip6tables -t mangle -L -n -v",
-        "ip6tablesnat": "ip6tables -t nat -L -n -v",
-        "nft_ruleset": "nft list ruleset",
-        "ipaddrshow": "ip addr show",
-        "iproute": "ip route show",
-        "ipneighbour": "ip neigh show",
-        "iprule": "ip rule show",
-        "ipv6neighbour": "ip -6 neigh show",
-        "iplinkshow": "ip link show",
-        "ipv6rule": "ip -6 rule show",
-        "ipv6route": "ip -6 route show",
-        "ipv6addrshow": "ip -6 addr show",
-        "ssanp": "ss -anp",
-        "ssitan": "ss -itan",
-        "ssuapn": "ss -uapn",
-        "sswapn": "ss -wapn",
-        "ssxapn": "ss -xapn",
-        "ss4apn": "ss -4apn",
-        "ss6apn": "ss -6apn",
-        "sstunlp6": "ss -tunlp6",
-        "sstunlp4": "ss -tunlp4",
-        "cni": "ls -l /opt/cni/bin/",  # CNI binaries dir (adjust path if needed)
-    }
-
-    all_commands = {**system_commands, **network_commands}
+    all_commands = {**DETAILED_SYSTEM_COMMANDS, **DETAILED_NETWORK_COMMANDS}
+    results = run_host_commands(all_commands, _deadline)
+    if past_deadline() and any(r["status"] in ("timeout", "skipped") for r in results.values()):
+        cut_at_deadline("host commands")
+    if TRACER:
+        for result in results.values():
+            TRACER.record_command("host", result["cmd"], result["duration"], result["status"] == "ok",
+                                  len(result["stdout"]))
 
-    for filename, cmd in all_commands.items():
+    for filename, result in results.items():
+        cmd = result["cmd"]
         filepath = os.path.join(info_dir, f"{filename}.txt")
-        output = run_cmd(cmd)
-        if output:
-            with open(filepath, "w") as f:
-                f.write(f"--- Node: {node} (Timestamp: {timestamp}) ---\n")
-                f.write(f"Command: {cmd}\n\n")
-                f.write(output)
+        output = result["stdout"].decode(errors="replace")
+        with open_output(filepath) as f:
+            f.write(f"--- Node: {node} (Timestamp: {timestamp}) ---\n")
+            f.write(f"Command: {cmd}\n")
+            f.write(f"Status: {result['status']} (exit code: {result['exit_code']}, "
+                    f"duration: {result['duration']:.2f}s)\n\n")
+            if result["stderr"] and result["status"] != "ok":
+                f.write("--- stderr ---\n")
+                f.write(result["stderr"].decode(errors="replace"))
+                f.write("\n--- stdout ---\n")
+            f.write(output if output else "No output captured.\n")
+            if result["status"] == "truncated":
+                f.write(f"\n--- output truncated at {HOST_COMMAND_OPTIONS['max_output']} bytes ---\n")
+        if result["status"] == "ok":
             print(f"Saved {filename} to {filepath}")
         else:
-            print(f"Failed to run {cmd} for {filename}")
-            with open(filepath, "w") as f:
-                f.write(f"--- Node: {node} (Timestamp: {timestamp}) ---\n")
-                f.write(f"Command failed: {cmd}\n")
-                f.write("No output captured.\n")
+            print(f"{cmd} for {filename}: {result['status']} after {result['duration']:.1f}s")
 
     print(f"Detailed system info saved to {info_dir}")
 
 
+# Fan-out mode (--all-nodes): one privileged pod per node (host PID/network namespaces, host / at
+# /host) runs the node-level collectors above through chroot and streams a tar.gz of
+# os_info/, detailed_system_info/ and k8s_system_logs/ back over kubectl attach.
+NODE_POD_IMAGE = "busybox:1.36"
+NODE_CONCURRENCY = 5
+
+
+def configure_node_pods(image):
+    """Set the image of the per-node collector pods (needs sh, timeout, chroot, head and tar)."""
+    global NODE_POD_IMAGE
+    NODE_POD_IMAGE = image
+
+
+# Written by the node pod script when it probed the node's systemd units, for the journal_units cache
+NODE_UNITS_MEMBER = "journal_units.txt"
+
+
+def _node_collector_script(node, cursors=None, units=None):
+    """
+    Shell script run in a node pod; everything it prints except the final tar goes to stderr.
+    cursors are the journal cursors per unit to continue from (see save_journal). units are the
+    node's installed K8S_SYSTEMD_UNITS from the cache; without them the script probes for them
+    (one systemctl call, reported in k8s_system_logs/NODE_UNITS_MEMBER) and skips the others.
+    """
+    opts = HOST_COMMAND_OPTIONS
+    per_cmd_timeout = int(opts["timeout"] or opts["budget"] or 600)
+    if budget_remaining() is not None:
+        per_cmd_timeout = max(1, min(per_cmd_timeout, int(budget_remaining())))
+    lines = [
+        "exec 3>&1 1>&2",
+        "OUT=$(mktemp -d) && cd \"$OUT\" || exit 1",
+        "mkdir os_info detailed_system_info k8s_system_logs",
+        f"NODE={shlex.quote(node)}",
+        "TS=$(date '+%Y-%m-%d %H:%M:%S')",
+        "now() { cut -d' ' -f1 /proc/uptime; }",
+        # hostcmd <file> <command>: run on the host with the timeout and output cap, keep rc/stderr/duration
+        "hostcmd() {",
+        "  s=$(now)",
+        f"  ( timeout -s KILL {per_cmd_timeout} chroot /host sh -c \"$2\" 2>\"$1.err\"; echo $? >\"$1.rc\" )"
+        f" | head -c {int(opts['max_output'])} >\"$1.out\"",
+        "  echo \"$s $(now)\" >\"$1.dur\"",
+        "}",
+        # detailed <name> <command>: same file layout as save_detailed_system_info
+        "detailed() {",
+        "  f=detailed_system_info/$1; hostcmd \"$f\" \"$2\"; rc=$(cat \"$f.rc\")",
+        "  dur=$(awk '{printf \"%.2f\", $2 - $1}' \"$f.dur\")",
+        "  if [ \"$rc\" = 0 ]; then st=ok; elif [ \"$rc\" = 137 ]; then st=timeout; else st=failed; fi",
+        f"  [ \"$(wc -c <\"$f.out\")\" -ge {int(opts['max_output'])} ] && st=truncated",
+        "  { echo \"--- Node: $NODE (Timestamp: $TS) ---\"; echo \"Command: $2\"",
+        "    echo \"Status: $st (exit code: $rc, duration: ${dur}s)\"; echo",
+        "    if [ $st != ok ] && [ -s \"$f.err\" ]; then echo '--- stderr ---'; cat \"$f.err\"; echo; echo '--- stdout ---'; fi",
+        "    if [ -s \"$f.out\" ]; then cat \"$f.out\"; else echo 'No output captured.'; fi",
+        "  } >\"$f.txt\"; rm -f \"$f.out\" \"$f.err\" \"$f.rc\" \"$f.dur\"",
+        "}",
+    ]
+    for filename, cmd in OS_INFO_COMMANDS:
+        path = f"os_info/{filename}"
+        lines.append(f"hostcmd {path} {shlex.quote(cmd)}; [ -s {path}.out ] && "
+                     f"{{ echo \"--- Node: $NODE ---\"; cat {path}.out; }} >{path}; rm -f {path}.*")
+    lines.append("cat /proc/net/dev >os_info/proc_net_dev")  # hostNetwork: the node's interfaces
+    if units is None:
+        probe = "k8s_system_logs/units"
+        # rc 1 only means none of the units exist; anything else (no systemctl) is not cached
+        lines += [f"hostcmd {probe} {shlex.quote(shlex.join(UNIT_PROBE_CMD))}",
+                  f"UNITS=$(sed -n 's/[.]service[[:space:]].*//p' {probe}.out)",
+                  f"case \"$(cat {probe}.rc)\" in 0|1) echo \"$UNITS\" >k8s_system_logs/{NODE_UNITS_MEMBER};; esac",
+                  f"rm -f {probe}.*",
+                  "has_unit() { echo \"$UNITS\" | grep -qxF \"$1\"; }"]
+    for unit in K8S_SYSTEMD_UNITS if units is None else units:
+        path = f"k8s_system_logs/{unit}.log"
+        cursor = (cursors or {}).get(unit)
+        journal_cmd = f"journalctl -u {unit} --no-pager --show-cursor " + \
+            (f"--after-cursor={shlex.quote(cursor)}" if cursor else f"-n {JOURNAL_INITIAL_LINES}")
+        header = "--- Node: $NODE (entries since the previous snapshot) ---" if cursor else "--- Node: $NODE ---"
+        # The trailing cursor line goes to k8s_system_logs/<unit>.cursor
+        line = (f"hostcmd {path} {shlex.quote(journal_cmd)}; [ \"$(cat {path}.rc)\" = 0 ] && "
+                f"{{ tail -n 1 {path}.out | sed -n 's/^-- cursor: //p' >k8s_system_logs/{unit}.cursor; "
+                f"grep -v -e '^-- cursor: ' -e '^-- No entries --' {path}.out >{path}.body; "
+                f"[ -s {path}.body ] && {{ echo \"{header}\"; cat {path}.body; }} >{path}; }}; rm -f {path}.*")
+        lines.append(line if units is not None else f"has_unit {unit} && {{ {line}; }}")
+    for filepath in K8S_LOG_FILES:
+        dest = f"k8s_system_logs/{os.path.basename(filepath)}"
+        copy = f"tail -c {NODE_LOG_MAX_BYTES} /host{filepath}" if NODE_LOG_MAX_BYTES else f"cat /host{filepath}"
+        lines.append(f"[ -f /host{filepath} ] && {{ echo \"--- Node: $NODE ---\"; {copy}; }} >{dest}")
+    # Detailed commands in batches of --host-cmd-concurrency, like the local asyncio executor
+    commands = list({**DETAILED_SYSTEM_COMMANDS, **DETAILED_NETWORK_COMMANDS}.items())
+    batch = max(1, opts["concurrency"])
+    for i in range(0, len(commands), batch):
+        lines += [f"detailed {name} {shlex.quote(cmd)} &" for name, cmd in commands[i:i + batch]]
+        lines.append("wait")
+    lines.append("tar czf - . >&3")
+    return "\n".join(lines)
+
+
+def collect_node_via_pod(node, base_dir):
+    """
+    Run _node_collector_script on node in a temporary privileged pod and unpack its tar stream
+    into os_info/<node>/, detailed_system_info/<node>/ and k8s_system_logs/<node>/.
+    """
+    pod = re.sub(r"[^a-z0-9-]", "-", f"node-collector-{node.lower()}")[:57].strip("-") + f"-{os.getpid() % 10000:04d}"
+    cursors = previous_node_bookmarks(node, JOURNAL_CURSORS_FILE)
+    overrides = {
+        "apiVersion": "v1",
+        "spec": {
+            "nodeName": node,
+            "hostPID": True,
+            "hostNetwork": True,
+            "tolerations": [{"operator": "Exists"}],
+            "containers": [{
+                "name": pod,
+                "image": NODE_POD_IMAGE,
+                "command": ["sh", "-c", _node_collector_script(node, cursors, cached_journal_units(node))],
+                "stdin": True,
+                "stdinOnce": True,
+                "securityContext": {"privileged": True},
+                "volumeMounts": [{"name": "host", "mountPath": "/host"}],
+            }],
+            "volumes": [{"name": "host", "hostPath": {"path": "/"}}],
+        },
+    }
+    cmd = ["kubectl", "run", pod, f"--image={NODE_POD_IMAGE}", "--restart=Never", "--rm", "-i", "--quiet",
+           f"--overrides={json.dumps(overrides)}"]
+    print(f"Collecting node-level info from {node} through pod {pod}...")
+    wait_for_api_slot()
+    start = time.monotonic()
+    written = 0
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+        # The node script bounds each command itself; this only catches a pod that never finishes,
+        # or one still running 30s (time to send its tar) past the --budget deadline.
+        limit = (HOST_COMMAND_OPTIONS["budget"] or 3600) + 300
+        if budget_remaining() is not None:
+            limit = min(limit, budget_remaining() + 30)
+        watchdog = threading.Timer(limit, proc.kill)
+        watchdog.start()
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|gz") as tar:
+                for member in tar:
+                    section, _, filename = os.path.normpath(member.name).partition(os.sep)
+                    if not member.isfile() or section not in ("os_info", "detailed_system_info", "k8s_system_logs") \
+                            or not filename or os.sep in filename or filename.startswith("."):
+                        continue
+                    data = tar.extractfile(member)
+                    dest_dir = os.path.join(base_dir, section, node)
+                    os.makedirs(dest_dir, exist_ok=True)
+                    if section == "k8s_system_logs" and filename == NODE_UNITS_MEMBER:
+                        store_journal_units(node, data.read().decode(errors="replace").split())
+                        continue
+                    if section == "k8s_system_logs" and filename.endswith(".cursor"):
+                        cursor = data.read().decode(errors="replace").strip()
+                        if cursor:
+                            cursors[filename[:-len(".cursor")]] = cursor
+                        continue
+                    if filename == "proc_net_dev":
+                        with open_output(os.path.join(dest_dir, "network_drops.txt")) as f:
+                            f.write(f"--- Node: {node} ---\n")
+                            f.write(format_network_drops(data.read().decode(errors="replace").splitlines()))
+                    else:
+                        with open_output(os.path.join(dest_dir, filename), "wb") as f:
+                            shutil.copyfileobj(data, f, LOG_CHUNK_SIZE)
+                    written += 1
+        except (tarfile.TarError, OSError, EOFError) as e:
+            print(f"Node collection from {node} ended early: {e}")
+        finally:
+            watchdog.cancel()
+            proc.stdout.close()
+            proc.wait()
+            stderr.seek(0)
+            errors = stderr.read().decode(errors="replace").strip()
+    syslog_dir = os.path.join(base_dir, "k8s_system_logs", node)
+    os.makedirs(syslog_dir, exist_ok=True)
+    with open_plain_output(os.path.join(syslog_dir, JOURNAL_CURSORS_FILE)) as f:
+        json.dump(cursors, f, indent=1)
+    if TRACER:
+        TRACER.record_command("node-pod", f"{node} ({pod})", time.monotonic() - start, proc.returncode == 0)
+    if proc.returncode != 0:
+        print(f"kubectl run on {node} exited with {proc.returncode}: {errors[-500:]}")
+        if past_deadline():
+            cut_at_deadline(f"node pod on {node}")
+    print(f"Saved {written} node-level files from {node}")
+    return written
+
+
+@checkpointed
+@traced
+def save_node_info_all_nodes(base_dir, nodes=None, concurrency=None):
+    """
+    Run collect_node_via_pod on every node (nodes=None: all nodes of the cluster), at most
+    `concurrency` (NODE_CONCURRENCY) at once.
+    """
+    if nodes is None:
+        nodes = get_all_nodes()
+    run_tasks([(run_unit, (f"node:{node}", collect_node_via_pod, (node, base_dir))) for node in nodes],
+              concurrency or NODE_CONCURRENCY)
+
+
 def get_current_node():
     """Get the current node name (for single-node execution)."""
     return [get_node_name()]
 
 def get_all_nodes():
     """Get list of all node names in the cluster."""
+    if TRANSPORT == "api":
+        return get_resource_names("nodes")
     output = run_cmd("kubectl get nodes -o jsonpath='{.items[*].metadata.name}'")
     if output:
         return output.split()
     return []
 
 
+@checkpointed
+@traced
 def save_nodes_describe(base_dir):
     nodes_dir = os.path.join(base_dir, "describes", "nodes")
     os.makedirs(nodes_dir, exist_ok=True)
@@ -592,13 +4156,15 @@ def save_nodes_describe(base_dir):
         filepath = os.path.join(nodes_dir, f"{node}.txt")
         desc = run_cmd(f"kubectl describe node {node}")
         if desc:
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(desc)
         else:
             print(f"Failed to describe node {node}.")
             # Save empty file with note
-            with open(filepath, "w") as f:
+            with open_output(filepath) as f:
                 f.write(f"--- Failed to describe node {node} ---\nNo output captured.\n")
+@checkpointed
+@traced
 def save_machines(base_dir):
     """Save details for all machines (cluster-wide)."""
     machines_dir = os.path.join(base_dir, "machines")
@@ -608,10 +4174,14 @@ def save_machines(base_dir):
     if not names:
         print("No machines found or error fetching machines.")
         return
-    for name in names:
-        save_describe("machine", name, None, base_dir)  # Assuming cluster-wide; adjust if namespaced
+    if BULK_MODE:
+        save_describes_bulk("machines", None, base_dir, "machine")  # Assuming cluster-wide; adjust if namespaced
+        return
+    run_tasks([(save_describe, ("machine", name, None, base_dir)) for name in names])
 
 
+@checkpointed
+@traced
 def save_machinesets(base_dir):
     """Save details for all machinesets (in openshift-machine-api namespace)."""
     machinesets_dir = os.path.join(base_dir, "machinesets")
@@ -622,10 +4192,14 @@ def save_machinesets(base_dir):
     if not names:
         print(f"No machinesets found in namespace {namespace}.")
         return
-    for name in names:
-        save_describe("machineset", name, namespace, base_dir)
+    if BULK_MODE:
+        save_describes_bulk("machinesets", [namespace], base_dir, "machineset")
+        return
+    run_tasks([(save_describe, ("machineset", name, namespace, base_dir)) for name in names])
 
 
+@checkpointed
+@traced
 def save_machinedeployments(base_dir):
     """Save details for all machinedeployments (in openshift-machine-api namespace)."""
     machinedeployments_dir = os.path.join(base_dir, "machinedeployments")
@@ -636,17 +4210,38 @@ def save_machinedeployments(base_dir):
     if not names:
         print(f"No machinedeployments found in namespace {namespace}.")
         return
-    for name in names:
-        save_describe("machinedeployment", name, namespace, base_dir)
+    if BULK_MODE:
+        save_describes_bulk("machinedeployments", [namespace], base_dir, "machinedeployment")
+        return
+    run_tasks([(save_describe, ("machinedeployment", name, namespace, base_dir)) for name in names])
 
+@checkpointed
+@traced
 def save_helm_values(base_dir):
     """Save Helm values for each release from 'helm list -A'."""
     values_dir = os.path.join(base_dir, "helm_values")
     os.makedirs(values_dir, exist_ok=True)
     
     print("Gathering Helm values for each release...")
-    
-    # Get the helm list output (reuse the same command as save_helm_list)
+
+    releases = get_helm_releases()
+    if releases:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        run_tasks([(load_helm_values, (release,)) for release in releases])
+        for release in releases:
+            if release["values"] is None:
+                continue  # the error was printed by load_helm_values
+            filepath = os.path.join(values_dir, f"{release['namespace']}_{release['name']}_values.yaml")
+            with open_output(filepath) as f:
+                f.write(f"# Helm values for release {release['name']} in namespace {release['namespace']}\n")
+                f.write(f"# Source: secret {release['secret']} (revision {release['revision']})\n")
+                f.write(f"# Timestamp: {timestamp}\n\n")
+                f.write("USER-SUPPLIED VALUES:\n")
+                f.write((dump_yaml(release["values"]) if release["values"] else "null") + "\n")
+        print(f"Saved values for {len(releases)} releases to {values_dir}")
+        return
+
+    # No release secrets (e.g. configmap storage driver): ask helm for each release
     helm_list_output = run_cmd("helm list -A")
     if not helm_list_output:
         print("No Helm releases found or helm command failed.")
@@ -674,7 +4269,7 @@ def save_helm_values(base_dir):
             if values_output:
                 filename = f"{namespace}_{release_name}_values.yaml"
                 filepath = os.path.join(values_dir, filename)
-                with open(filepath, "w") as f:
+                with open_output(filepath) as f:
                     f.write(f"# Helm values for release {release_name} in namespace {namespace}\n")
                     f.write(f"# Command: {values_cmd}\n")
                     f.write(f"# Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
@@ -685,7 +4280,7 @@ def save_helm_values(base_dir):
                 # Save empty file with note
                 filename = f"{namespace}_{release_name}_values.yaml"
                 filepath = os.path.join(values_dir, filename)
-                with open(filepath, "w") as f:
+                with open_output(filepath) as f:
                     f.write(f"# Failed to get values for release {release_name} in namespace {namespace}\n")
                     f.write(f"# Command: {values_cmd}\n")
                     f.write(f"# Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
@@ -694,15 +4289,404 @@ def save_helm_values(base_dir):
     print(f"Helm values saved to {values_dir}")
 
 
+# Fleet mode (--contexts/--kubeconfig-dir): one collector process per cluster, each writing
+# below <fleet root>/<cluster>/ with its own log, sharing the --workers budget.
+FLEET_CONCURRENCY = 4
+
+
+def fleet_clusters(contexts=None, kubeconfig_dir=None, kubeconfig=None):
+    """
+    [(name, kubeconfig, context)] for the --contexts list ("all" = every context of the
+    kubeconfig) and every kubeconfig file in kubeconfig_dir (used with its current-context).
+    """
+    clusters = []
+    if contexts == ["all"]:
+        kubeconfig_arg = f" --kubeconfig {shlex.quote(kubeconfig)}" if kubeconfig else ""
+        contexts = (run_cmd(f"kubectl config get-contexts -o name{kubeconfig_arg}") or "").split()
+    for context in contexts or []:
+        clusters.append((context, kubeconfig, context))
+    if kubeconfig_dir:
+        for entry in sorted(os.listdir(kubeconfig_dir)):
+            path = os.path.join(kubeconfig_dir, entry)
+            if not entry.startswith(".") and os.path.isfile(path):
+                clusters.append((os.path.splitext(entry)[0], os.path.abspath(path), None))
+    named, seen = [], set()
+    for name, config, context in clusters:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+        unique, i = name, 1
+        while unique in seen:
+            i += 1
+            unique = f"{name}-{i}"
+        seen.add(unique)
+        named.append((unique, config, context))
+    return named
+
+
+def collect_cluster(args, name, kubeconfig, context, root):
+    """
+    Process pool entry point: take one snapshot of a cluster inside root/<name>/, with stdout and
+    stderr (including child commands) going to root/<name>/collector.log. Returns (name, ok, seconds).
+    """
+    start = time.monotonic()
+    cluster_root = os.path.join(root, name)
+    os.makedirs(cluster_root, exist_ok=True)
+    log_fd = os.open(os.path.join(cluster_root, "collector.log"), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+    os.close(log_fd)
+    minified = None
+    try:
+        if args.transport == "api":
+            args.kubeconfig, args.context = kubeconfig, context
+        else:
+            # kubectl and helm have no context variable, so give them a single-context kubeconfig
+            if context:
+                kubeconfig_arg = f" --kubeconfig {shlex.quote(kubeconfig)}" if kubeconfig else ""
+                config = run_cmd(f"kubectl config view --minify --flatten --context {shlex.quote(context)}"
+                                 f"{kubeconfig_arg}")
+                if not config:
+                    print(f"Could not read context {context} from the kubeconfig.")
+                    return name, False, time.monotonic() - start
+                fd, minified = tempfile.mkstemp(prefix=".kubeconfig-", dir=root)
+                with os.fdopen(fd, "w") as f:
+                    f.write(config + "\n")
+                kubeconfig = minified
+            if kubeconfig:
+                os.environ["KUBECONFIG"] = kubeconfig
+        os.chdir(cluster_root)
+        print(f"Collecting cluster {name} (context: {context or 'current'}, kubeconfig: "
+              f"{kubeconfig or 'default'}, workers: {args.workers})")
+        collect(args)
+        return name, True, time.monotonic() - start
+    except (Exception, SystemExit) as e:
+        print(f"Collection of cluster {name} failed: {e!r}")
+        return name, False, time.monotonic() - start
+    finally:
+        sys.stdout.flush()
+        if minified:
+            os.remove(minified)
+
+
+def run_fleet(args, clusters, root, concurrency):
+    """
+    Collect every cluster concurrently in a process pool of `concurrency` processes. The
+    --workers budget is split between the clusters running at once; --api-qps stays per cluster.
+    """
+    concurrency = max(1, min(concurrency, len(clusters)))
+    args.workers = max(1, args.workers // concurrency)
+    args.no_local_node = True  # the collecting machine is not a node of these clusters
+    for option in ("trace", "blob_store", "state_dir"):
+        # children run inside their cluster root
+        if getattr(args, option) and (option != "state_dir" or os.path.isabs(args.state_dir)):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    if args.trace:
+        args.trace = os.path.basename(args.trace)  # one trace per cluster root
+    os.makedirs(root, exist_ok=True)
+    print(f"Collecting {len(clusters)} clusters into {root}, {concurrency} at a time "
+          f"({args.workers} workers each)...")
+    start = time.monotonic()
+    results = []
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(collect_cluster, args, name, kubeconfig, context, root): name
+                   for name, kubeconfig, context in clusters}
+        for future in as_completed(futures):
+            try:
+                name, ok, seconds = future.result()
+            except Exception as e:
+                name, ok, seconds = futures[future], False, 0.0
+                print(f"Collector process for {name} died: {e}")
+            results.append((name, ok, seconds))
+            print(f"  {name}: {'done' if ok else 'FAILED'} in {seconds:.1f}s "
+                  f"(log: {os.path.join(root, name, 'collector.log')})")
+    failed = [name for name, ok, _ in results if not ok]
+    print(f"Fleet collection finished in {time.monotonic() - start:.1f}s: "
+          f"{len(results) - len(failed)} ok, {len(failed)} failed{': ' + ', '.join(sorted(failed)) if failed else ''}")
+    return not failed
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Collect Kubernetes cluster and node diagnostics into a backup folder.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"Max parallel describe/get/log workers (default: {MAX_WORKERS}, 1 = sequential); also the "
+                             f"ceiling of the API requests in flight, which is halved while the API server "
+                             f"throttles and grows back one at a time.")
+    parser.add_argument("--api-qps", type=float, default=API_QPS,
+                        help=f"Max kubectl/helm requests per second against the API server (default: {API_QPS:g}, 0 = unlimited).")
+    parser.add_argument("--bulk", action="store_true",
+                        help="List each resource type once cluster-wide and split it locally instead of "
+                             "running describe + get per object.")
+    parser.add_argument("--page-size", type=int, default=LIST_PAGE_SIZE,
+                        help=f"Objects per paged list request in bulk mode (default: {LIST_PAGE_SIZE}).")
+    parser.add_argument("--transport", choices=["kubectl", "api"], default="kubectl",
+                        help="How API reads are made: fork kubectl per call (default) or talk to the API server "
+                             "in-process over pooled connections (implies --bulk; needs PyYAML for the kubeconfig).")
+    parser.add_argument("--kubeconfig", help="Kubeconfig for --transport api (default: $KUBECONFIG or ~/.kube/config).")
+    parser.add_argument("--context", help="Kubeconfig context for --transport api (default: current-context).")
+    parser.add_argument("--contexts", type=lambda value: [c for c in value.split(",") if c],
+                        help="Collect these kubeconfig contexts (comma separated, or 'all') concurrently, each "
+                             "into its own folder below --fleet-dir.")
+    parser.add_argument("--kubeconfig-dir", metavar="DIR",
+                        help="Collect every kubeconfig file in DIR (with its current-context) concurrently, "
+                             "each into a folder named after the file below --fleet-dir.")
+    parser.add_argument("--fleet-dir", default=f"k8s_fleet_{datetime.now().strftime('%Y-%m-%d')}",
+                        help="Output root for --contexts/--kubeconfig-dir (default: %(default)s).")
+    parser.add_argument("--fleet-concurrency", type=int, default=FLEET_CONCURRENCY,
+                        help="Clusters collected at once; --workers is divided between them "
+                             "(default: %(default)s).")
+    parser.add_argument("--log-since", help="Only logs newer than this duration, e.g. 2h (kubectl logs --since).")
+    parser.add_argument("--log-limit-bytes", type=int, help="Max bytes of log per container.")
+    parser.add_argument("--log-tail", type=int, help="Only the last N lines per container.")
+    parser.add_argument("--log-head", type=int, help="Only the first N lines per container.")
+    parser.add_argument("--log-previous", action="store_true",
+                        help="Also save logs of the previous instance of restarted containers.")
+    parser.add_argument("--log-timeout", type=int, default=LOG_OPTIONS["timeout"],
+                        help=f"Max seconds streaming one container's log (default: {LOG_OPTIONS['timeout']}, 0 = no limit).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse unchanged objects (same uid/resourceVersion) from the latest previous backup folder.")
+    parser.add_argument("--incremental-from", metavar="DIR",
+                        help="Like --incremental, against a specific previous backup folder.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the latest interrupted backup folder of this node from its checkpoint "
+                             "journal: finished work is kept, partial and missing files are collected again.")
+    parser.add_argument("--resume-from", metavar="DIR",
+                        help="Like --resume, for a specific interrupted backup folder (or .pack).")
+    parser.add_argument("--budget", metavar="DURATION",
+                        help="Triage mode: collect the most telling data first (events, nodes, logs of pods that "
+                             "are not Ready or restarting, Helm releases; RBAC and CRDs last) and start nothing "
+                             "after this long, e.g. 5m. collection.json lists what was left out; --resume "
+                             "collects it.")
+    parser.add_argument("--blob-store", metavar="DIR",
+                        help="Deduplicate the finished backup into this content-addressed store (hardlinked blobs).")
+    parser.add_argument("--blob-chunk-logs", action="store_true",
+                        help="With --blob-store, also split logs of 1 MiB or more into shared chunks. The backup then "
+                             "holds *.chunks recipes instead of those logs until --materialize reassembles them.")
+    parser.add_argument("--blob-gc", action="store_true",
+                        help="Garbage-collect --blob-store after old backups were deleted, then exit.")
+    parser.add_argument("--materialize", metavar="DIR",
+                        help="Reassemble the chunked logs (*.chunks) of a backup folder, then exit.")
+    parser.add_argument("--object-format", choices=["describe", "json", "both"], default=OBJECT_FORMAT,
+                        help="Save described objects as describe text, as canonical JSON lines in "
+                             "objects/<type>.ndjson, or both; cluster_validation_v3.py reads fields from the JSON.")
+    parser.add_argument("--storage", choices=["dir", "pack"], default=STORAGE,
+                        help="'pack' writes the snapshot into a single SQLite file <folder>.pack instead of a "
+                             "folder tree; cluster_validation_v3.py reads either.")
+    parser.add_argument("--compress", choices=sorted(COMPRESSION_SUFFIXES),
+                        help="Compress every output file while writing it (.gz/.zst); cluster_validation_v3.py "
+                             "reads them as they are.")
+    parser.add_argument("--host-cmd-timeout", type=float, default=HOST_COMMAND_OPTIONS["timeout"],
+                        help="Seconds each node-level system command may run (default: %(default)s, 0 = no limit).")
+    parser.add_argument("--host-cmd-budget", type=float, default=HOST_COMMAND_OPTIONS["budget"],
+                        help="Seconds for all node-level system commands together (default: %(default)s, 0 = no limit).")
+    parser.add_argument("--host-cmd-max-output", type=int, default=HOST_COMMAND_OPTIONS["max_output"],
+                        help="Bytes of output kept per node-level system command (default: %(default)s).")
+    parser.add_argument("--host-cmd-concurrency", type=int, default=HOST_COMMAND_OPTIONS["concurrency"],
+                        help="Node-level system commands run at once (default: %(default)s).")
+    parser.add_argument("--node-log-max-bytes", type=int, default=NODE_LOG_MAX_BYTES,
+                        help="Bytes kept per node log file together with its rotated siblings, newest first "
+                             "(default: %(default)s, 0 = no limit).")
+    parser.add_argument("--no-local-node", action="store_true",
+                        help="Skip OS info, detailed system info and system logs of the machine running the "
+                             "collector (implied by --contexts/--kubeconfig-dir).")
+    parser.add_argument("--all-nodes", action="store_true",
+                        help="Collect OS info, detailed system info and system logs from every node through a "
+                             "temporary privileged pod per node, instead of from the local node only.")
+    parser.add_argument("--node-concurrency", type=int, default=NODE_CONCURRENCY,
+                        help="With --all-nodes, nodes collected at once (default: %(default)s).")
+    parser.add_argument("--node-image", default=NODE_POD_IMAGE,
+                        help="With --all-nodes, image of the collector pods (default: %(default)s).")
+    parser.add_argument("--events-since", metavar="DURATION",
+                        help="Only keep events last seen within this duration, e.g. 6h (default: all).")
+    parser.add_argument("--event-types", type=lambda value: [t for t in value.split(",") if t],
+                        help="Only keep events of these types, comma separated (e.g. Warning).")
+    parser.add_argument("--select", metavar="FILE",
+                        help="Selection config (YAML/JSON): namespace include/exclude patterns and label "
+                             "selectors, and per-namespace, per-type rules with object selectors, not-ready-only "
+                             "logs and limits. Replaces the default, which skips logs of c-m-/p-/user-/u- namespaces.")
+    parser.add_argument("--all-resources", action="store_true",
+                        help="Describe every listable resource type found by API discovery (custom resources "
+                             "included) instead of the built-in list; empty types are skipped.")
+    parser.add_argument("--state-dir", default=STATE_DIR,
+                        help=f"Directory for state kept between runs, such as the discovery cache "
+                             f"(default: {STATE_DIR}, '' disables it).")
+    parser.add_argument("--watch", metavar="DIR",
+                        help="Run as a live mirror: list once, then follow watch streams and keep DIR up to date "
+                             "in the describes/ layout (events are kept past their TTL). Runs until interrupted.")
+    parser.add_argument("--snapshot-interval", type=float, metavar="SECONDS",
+                        help="With --watch, snapshot the mirror (hardlink copy) this often; SIGUSR1 also snapshots.")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record step timings, command latencies, bytes written and peak memory to a JSON "
+                             "trace file and print a summary table.")
+    args = parser.parse_args()
+    if args.materialize:
+        materialize_chunked_files(args.materialize)
+        return
+    if args.blob_gc:
+        if not args.blob_store:
+            parser.error("--blob-gc needs --blob-store")
+        gc_blob_store(args.blob_store)
+        return
+    for duration in (args.log_since, args.events_since, args.budget):
+        if duration:
+            parse_duration(duration)  # fail fast on a bad duration
+    if args.watch and args.object_format != "describe":
+        parser.error("--watch keeps the describes/ layout only; --object-format applies to snapshots")
+    if args.watch and args.budget:
+        parser.error("--budget applies to snapshots; --watch runs until interrupted")
+    if args.storage == "pack" and (args.watch or args.incremental or args.incremental_from or args.blob_store):
+        parser.error("--storage pack can't be combined with --watch, --incremental or --blob-store, "
+                     "which hardlink files between snapshot folders")
+    if args.contexts or args.kubeconfig_dir:
+        if args.watch or args.incremental_from or args.resume_from:
+            parser.error("--watch, --incremental-from and --resume-from take a single cluster")
+        clusters = fleet_clusters(args.contexts, args.kubeconfig_dir, args.kubeconfig)
+        if not clusters:
+            parser.error("no clusters found for --contexts/--kubeconfig-dir")
+        if not run_fleet(args, clusters, args.fleet_dir, args.fleet_concurrency):
+            sys.exit(1)
+        return
+    collect(args)
+
+
+# --budget priority of the describe types, by describes/ directory; other types come at 4
+TRIAGE_DESCRIBE_PRIORITY = {
+    "nodes": 0,
+    "pods": 2, "deployments": 2, "statefulsets": 2, "daemonsets": 2, "replicasets": 2, "jobs": 2,
+    "services": 2, "endpoints": 3, INGRESS_TYPE: 3, "ingresses": 3,
+    "persistentvolumeclaims": 3, "persistentvolumes": 3, "configmaps": 3,
+    "roles": 6, "rolebindings": 6, "clusterroles": 6, "clusterrolebindings": 6,
+    "customresourcedefinitions": 6, "apiservices": 6,
+}
+
+
+def collection_plan(args, base_dir, namespaces, date_str):
+    """
+    The steps of one snapshot as [(triage priority, name, func, args)] for run_plan(), in the
+    order a full run takes them. With --budget they run by priority: events and nodes, then the
+    logs of troubled pods and the Helm release list (failing releases show up in its STATUS
+    column), workloads next, and bulk RBAC and CRDs last.
+    """
+    plan = [(2, "step:save_pods_wide", save_pods_wide, (base_dir, namespaces))]
+    if BUDGET:
+        # not Ready or restarting pods, with their previous logs; the others follow at 4
+        plan.append((1, "logs:troubled pods", save_pod_logs, (base_dir, namespaces, date_str, True)))
+    plan.append((4, "logs:pods", save_pod_logs, (base_dir, namespaces, date_str)))
+
+    if args.all_resources:
+        # Every listable type the API server serves (custom resources included), one listing
+        # per type; types without objects produce no files.
+        types = [(res, directory, namespaces if namespaced else None)
+                 for res, directory, namespaced in listable_resource_types()]
+    else:
+        types = ([(res, res, None) for res in CLUSTER_DESCRIBE_RESOURCES] +
+                 [(res, res, namespaces) for res in NAMESPACED_DESCRIBE_RESOURCES])
+    # One pool for all types, or one per priority under --budget
+    tiers = {}
+    for entry in types:
+        tiers.setdefault(TRIAGE_DESCRIBE_PRIORITY.get(entry[1], 4) if BUDGET else 2, []).append(entry)
+    for priority, tier_types in tiers.items():
+        name = "describes:" + ",".join(directory for _, directory, _ in tier_types)
+        plan.append((priority, name, save_describes, (base_dir, tier_types)))
+
+    if args.all_nodes:
+        # OS info, detailed system info and system logs from every node, in parallel
+        plan.append((4, "step:save_node_info_all_nodes", save_node_info_all_nodes,
+                     (base_dir, None, args.node_concurrency)))
+    elif not args.no_local_node:
+        plan += [(4, "step:save_os_info", save_os_info, (base_dir,)),
+                 (4, "step:save_detailed_system_info", save_detailed_system_info, (base_dir,))]
+
+    # With --all-resources these types are already part of the discovered set
+    if not args.all_resources:
+        plan += [(5, "step:save_machines", save_machines, (base_dir,)),
+                 (5, "step:save_machinesets", save_machinesets, (base_dir,)),
+                 (5, "step:save_machinedeployments", save_machinedeployments, (base_dir,)),
+                 (0, "step:save_nodes_describe", save_nodes_describe, (base_dir,))]
+
+    # System logs of the local node; --all-nodes already collected them per node
+    if not args.all_nodes and not args.no_local_node:
+        plan.append((4, "step:save_k8s_system_logs", save_k8s_system_logs, (base_dir,)))
+
+    plan += [(1, "step:save_helm_list", save_helm_list, (base_dir,)),
+             (3, "step:save_helm_values", save_helm_values, (base_dir,)),
+             (2, "step:save_kubectl_top", save_kubectl_top, (base_dir,)),
+             (2, "step:save_k8s_versions", save_k8s_versions, (base_dir,)),
+             (0, "step:save_cluster_events", save_cluster_events, (base_dir,))]
+
+    if not args.all_resources:
+        plan += [(5, "step:save_network_policies", save_network_policies, (base_dir, namespaces)),
+                 (5, "step:save_storage_info", save_storage_info, (base_dir, namespaces)),
+                 (6, "step:save_rbac_info", save_rbac_info, (base_dir, namespaces)),
+                 (5, "step:save_ingress_classes", save_ingress_classes, (base_dir,))]
+    return plan
+
+
+def collect(args):
+    """Apply the parsed command line and take one snapshot (or run the --watch mirror)."""
+    LOG_OPTIONS.update({
+        "since": args.log_since,
+        "limit_bytes": args.log_limit_bytes,
+        "tail_lines": args.log_tail,
+        "head_lines": args.log_head,
+        "previous": args.log_previous,
+        "timeout": args.log_timeout,
+    })
+    EVENT_FILTERS.update({"since": args.events_since, "types": args.event_types})
+    configure_engine(args.workers, args.api_qps, args.bulk, args.page_size)
+    configure_transport(args.transport, args.kubeconfig, args.context)
+    configure_output(args.compress)
+    configure_storage(args.storage)
+    configure_object_format(args.object_format)
+    configure_node_pods(args.node_image)
+    configure_node_logs(args.node_log_max_bytes)
+    configure_selection(args.select)
+    configure_state(args.state_dir)
+    if args.trace:
+        enable_tracing()
+    HOST_COMMAND_OPTIONS.update({
+        "concurrency": max(1, args.host_cmd_concurrency),
+        "timeout": args.host_cmd_timeout,
+        "budget": args.host_cmd_budget,
+        "max_output": max(1, args.host_cmd_max_output),
+    })
+    configure_budget(parse_duration(args.budget) if args.budget else None)  # clamps the options above
+
+    if args.watch:
+        if args.all_resources:
+            types = [(res, directory) for res, directory, _ in listable_resource_types()
+                     if "watch" in discover_resources()[res]["verbs"]]
+        else:
+            types = [(res, res) for res in CLUSTER_DESCRIBE_RESOURCES + NAMESPACED_DESCRIBE_RESOURCES]
+        run_watch_mirror(args.watch, types, args.snapshot_interval)
+        return
+
     date_str = datetime.now().strftime("%Y-%m-%d")
     node_name = get_node_name()
 
     base_dir_name = f"k8s_backup_{node_name}_{date_str}"
-    base_dir = create_incremental_path(base_dir_name)
+    resume_dir = args.resume_from or (find_unfinished_snapshot(node_name) if args.resume else None)
+    if resume_dir:
+        base_dir = os.path.normpath(resume_dir)
+        if base_dir.endswith(PACK_SUFFIX):
+            base_dir = base_dir[:-len(PACK_SUFFIX)]
+        print(f"Resuming the interrupted snapshot {base_dir}")
+    elif args.resume:
+        print("No interrupted snapshot to resume; starting a new one.")
+    if not resume_dir:
+        base_dir = create_incremental_path(base_dir_name, ("", PACK_SUFFIX))
     os.makedirs(base_dir, exist_ok=True)
+    if STORAGE == "pack":
+        print(f"Writing the snapshot into {open_pack(base_dir)}")
+    start_checkpoint(base_dir, resume=bool(resume_dir))
 
-    namespaces = get_all_namespaces()
+    previous_root = args.incremental_from or (find_previous_snapshot(base_dir) if args.incremental else None)
+    if previous_root:
+        load_previous_snapshot(previous_root)
+    elif args.incremental:
+        print("No previous backup with a manifest found; collecting everything.")
+
+    namespaces = SELECTION.filter_namespaces(get_all_namespaces())
     if not namespaces:
         print("No namespaces found or error fetching namespaces.")
         return
@@ -718,96 +4702,28 @@ def main():
     # Save node port scans (scans all nodes from current node)
     #save_node_port_scans(base_dir, node_ips)
 
-    # Save pods -o wide for all namespaces (cluster-wide, local kubectl)
-    save_pods_wide(base_dir, namespaces)
-
-    invalid_prefixes = ("c-m", "p-", "user-", "u-")
-    # Get logs for all pods in all namespaces (cluster-wide, local kubectl)
-    for ns in namespaces:
-        if not ns.startswith(invalid_prefixes):
-            pods = get_pods(ns)
-            for pod in pods:
-                save_logs(ns, pod, date_str, base_dir)
-
-    # Resources to describe cluster-wide (no namespace, local kubectl)
-    cluster_resources = ["apiservices"]
-    for res in cluster_resources:
-        names = get_resource_names(res)
-        for name in names:
-            save_describe(res, name, None, base_dir)
-
-    # Resources to describe per namespace (local kubectl)
-    namespaced_resources = [
-        "pods",
-        "deployments",
-        "statefulsets",
-        "replicasets",
-        "services",
-        "endpoints",
-        "ingress",
-        "daemonsets",
-    ]
-
-    for ns in namespaces:
-        for res in namespaced_resources:
-            names = get_resource_names(res, ns)
-            for name in names:
-                save_describe(res, name, ns, base_dir)
-
-    # Handle CRDs cluster-wide (they are cluster scoped, local kubectl)
-    crds = get_resource_names("customresourcedefinitions")
-    for crd in crds:
-        save_describe("customresourcedefinitions", crd, None, base_dir)
-
-    # Save OS info locally (single-node)
-    save_os_info(base_dir)
+    run_plan(collection_plan(args, base_dir, namespaces, date_str))
 
-    # Save detailed system info locally (single-node, new function)
-    save_detailed_system_info(base_dir)
-
-    # Save machines info (cluster-wide, local kubectl)
-    save_machines(base_dir)
-    
-    # Save machinesets info (in openshift-machine-api namespace, local kubectl)
-    save_machinesets(base_dir)
-    
-    # Save machinedeployments info (in openshift-machine-api namespace, local kubectl)
-    save_machinedeployments(base_dir)
-
-    # Save nodes describe (cluster-wide, local kubectl)
-    save_nodes_describe(base_dir)
-
-    # Save Kubernetes system logs locally (single-node)
-    save_k8s_system_logs(base_dir)
-
-    # Save Helm releases list (cluster-wide, local helm)
-    save_helm_list(base_dir)
-
-    # Save Helm values for each release (new function)
-    save_helm_values(base_dir)
-
-    # Save kubectl top info (cluster-wide, local kubectl)
-    save_kubectl_top(base_dir)
-
-    # Save Kubernetes versions (local kubectl)
-    save_k8s_versions(base_dir)
-    
-    # Save cluster events (cluster-wide, local kubectl)
-    save_cluster_events(base_dir)
-    
-    # Save network policies (per namespace, local kubectl)
-    save_network_policies(base_dir, namespaces)
-    
-    # Save storage info (cluster-wide and per namespace, local kubectl)
-    save_storage_info(base_dir, namespaces)
-    
-    # Save RBAC info (cluster-wide and per namespace, local kubectl)
-    save_rbac_info(base_dir, namespaces)
-    
-    # Save ingress classes (cluster-wide, local kubectl)
-    save_ingress_classes(base_dir)
-    
-    print(f"Backup completed in folder: {base_dir}")
+    close_object_json(base_dir)
+    # Object manifest for later --incremental runs (and the delta against the previous one)
+    write_manifest(base_dir)
+    write_snapshot_index(base_dir)
+    if API_THROTTLE.signals:
+        print(API_THROTTLE.summary())
+    complete = True
+    if BUDGET or stored_size(os.path.join(base_dir, COLLECTION_REPORT_FILE)):
+        complete = write_collection_report(base_dir)  # resuming a --budget snapshot updates its report
+    checkpoint_path = finish_checkpoint(complete)
+    if PACK:
+        if complete:
+            os.remove(checkpoint_path)  # the pack is complete; only its folder held the journal
+        print(f"Backup completed in pack: {close_pack(base_dir)}")
+    else:
+        if args.blob_store:
+            store_snapshot_in_blobs(base_dir, args.blob_store, args.blob_chunk_logs)
+        print(f"Backup completed in folder: {base_dir}")
+    if TRACER:
+        TRACER.write(args.trace)
 
 if __name__ == "__main__":
     main()
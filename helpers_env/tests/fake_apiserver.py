@@ -0,0 +1,93 @@
+"""
+Stand-in Kubernetes API server for the KubeApiClient tests: plain HTTP/1.1 with keep-alive,
+bearer token checks, a paged pod list and pod logs. It records every request with the
+client port of its connection, so tests can tell whether a connection was reused.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        auth = self.headers.get("Authorization")
+        server.requests.append({"path": url.path, "query": query, "auth": auth, "port": self.client_address[1]})
+        if server.tokens is not None and auth not in {f"Bearer {token}" for token in server.tokens}:
+            self.send_json(401, {"kind": "Status", "code": 401, "reason": "Unauthorized"})
+            return
+        if url.path == "/api/v1/pods":
+            self.list_pods(query)
+        elif url.path.startswith("/api/v1/namespaces/") and url.path.endswith("/log"):
+            self.send_log()
+        else:
+            self.send_json(404, {"kind": "Status", "code": 404, "reason": "NotFound"})
+
+    def list_pods(self, query):
+        start = int(query.get("continue") or 0)
+        limit = int(query.get("limit") or len(self.server.pods))
+        end = min(start + limit, len(self.server.pods))
+        metadata = {"resourceVersion": "100"}
+        if end < len(self.server.pods):
+            metadata["continue"] = str(end)
+        self.send_json(200, {"kind": "PodList", "apiVersion": "v1", "metadata": metadata,
+                             "items": self.server.pods[start:end]})
+
+    def send_log(self):
+        if not self.server.log_stall:
+            self.send_body(200, self.server.log_body, "text/plain")
+            return
+        # a container that stops writing: the headers and first line (if any), then nothing
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.server.log_body:
+            first_line = self.server.log_body.split(b"\n", 1)[0] + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(first_line), first_line))
+        self.wfile.flush()
+        time.sleep(self.server.log_stall)
+        self.close_connection = True
+
+    def send_json(self, status, obj):
+        self.send_body(status, json.dumps(obj).encode(), "application/json")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pods=(), tokens=None, log_body=b"", log_stall=0):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.pods = list(pods)
+        self.tokens = tokens  # accepted bearer tokens; None accepts any request
+        self.log_body = log_body
+        self.log_stall = log_stall  # seconds the log endpoint stalls after its first line
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,103 @@
+import subprocess
+import time
+
+import pytest
+
+import get_cluster_info_v3 as collector
+from get_cluster_info_v3 import ApiThrottle
+
+
+@pytest.fixture
+def throttle(monkeypatch):
+    throttle = ApiThrottle(8)
+    monkeypatch.setattr(collector, "API_THROTTLE", throttle)
+    monkeypatch.setattr(collector, "API_QPS", 0)
+    return throttle
+
+
+def test_halves_once_per_round():
+    throttle = ApiThrottle(8)
+    first, second = throttle.acquire(), throttle.acquire()
+    throttle.release(first, "HTTP 429")
+    assert int(throttle.limit) == 4
+    throttle.release(second, "HTTP 429")  # sent in the same round: already answered
+    assert int(throttle.limit) == 4
+    throttle.release(throttle.acquire(), "HTTP 429")
+    assert int(throttle.limit) == 2
+    assert throttle.signals == 3
+    assert throttle.lowest == 2
+
+
+def test_additive_recovery():
+    throttle = ApiThrottle(8)
+    throttle.release(throttle.acquire(), "HTTP 429")
+    assert int(throttle.limit) == 4
+    responses = 0
+    while int(throttle.limit) < 8:
+        throttle.release(throttle.acquire(), kind="get pods")
+        responses += 1
+    # one slot back per round of `limit` responses: 4 + 5 + 6 + 7, give or take the fractions
+    assert 22 <= responses <= 26
+    for _ in range(50):
+        throttle.release(throttle.acquire(), kind="get pods")
+    assert throttle.limit == 8
+
+
+def test_slow_response_is_compared_within_its_kind():
+    throttle = ApiThrottle(8)
+    throttle.latency["get pods"] = 0.01
+    now = time.monotonic()
+    throttle.in_flight = 2
+    throttle.release(now - 5, kind="list pods")  # first cluster-wide list: nothing to compare it to
+    assert throttle.limit == 8
+    throttle.release(now - 5, kind="get pods")
+    assert int(throttle.limit) == 4
+
+
+def test_retry_after_holds_back_every_request():
+    throttle = ApiThrottle(8)
+    throttle.release(throttle.acquire(), "HTTP 429", retry_after=0.3)
+    start = time.monotonic()
+    throttle.release(throttle.acquire())
+    assert time.monotonic() - start >= 0.3
+
+
+def test_request_kind():
+    assert collector.request_kind("kubectl get pods -n ns0 -o json") == "kubectl get pods (list)"
+    assert collector.request_kind("kubectl get pod web-0 -n ns0 -o json") == "kubectl get pod (one)"
+    assert collector.request_kind("kubectl describe node n1") == "kubectl describe node (one)"
+    assert collector.request_kind("kubectl get --raw '/api/v1/pods?limit=500'") == "list pods"
+    assert collector.api_request_kind("/api/v1/namespaces/ns0/pods/web-0/log", {}) == "get pods/log"
+    assert collector.api_request_kind("/apis/apps/v1/deployments", {"watch": "1"}) == "watch deployments"
+
+
+def test_run_cmd_retries_throttled_command(throttle, monkeypatch):
+    replies = [
+        subprocess.CompletedProcess("", 1, "", "Error from server (TooManyRequests): please try again later"),
+        subprocess.CompletedProcess("", 0, "node-1\n", ""),
+    ]
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return replies.pop(0)
+
+    monkeypatch.setattr(collector.subprocess, "run", fake_run)
+    monkeypatch.setattr(collector, "throttle_backoff", lambda attempt: None)
+    assert collector.run_cmd("kubectl get nodes -o name") == "node-1"
+    assert len(calls) == 2
+    assert throttle.signals == 1
+    assert throttle.in_flight == 0
+
+
+def test_run_cmd_does_not_retry_other_failures(throttle, monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 1, "", "Error from server (NotFound): pods \"x\" not found")
+
+    monkeypatch.setattr(collector.subprocess, "run", fake_run)
+    assert collector.run_cmd("kubectl get pod x") is None
+    assert len(calls) == 1
+    assert throttle.signals == 0
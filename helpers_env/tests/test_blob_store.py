@@ -0,0 +1,57 @@
+import os
+import shutil
+
+import get_cluster_info_v3 as collector
+
+
+def make_snapshot(root, log_size):
+    os.makedirs(os.path.join(root, "logs"))
+    with open(os.path.join(root, "logs", "big.log"), "w") as f:
+        f.write("".join(f"line {i}\n" for i in range(log_size // 10)))
+    with open(os.path.join(root, "nodes.txt"), "w") as f:
+        f.write("node1 Ready\n")
+
+
+def blobs(store):
+    return sorted(name for _, _, files in os.walk(os.path.join(store, "objects")) for name in files)
+
+
+def test_logs_stay_readable_by_default(tmp_path):
+    snapshot, store = str(tmp_path / "snap"), str(tmp_path / "store")
+    make_snapshot(snapshot, 2 * collector.BLOB_CHUNK_THRESHOLD)
+    collector.store_snapshot_in_blobs(snapshot, store)
+    assert os.path.isfile(os.path.join(snapshot, "logs", "big.log"))
+    assert os.stat(os.path.join(snapshot, "logs", "big.log")).st_nlink == 2
+    assert not os.path.exists(os.path.join(store, "chunks"))
+
+
+def test_chunk_logs_writes_recipes(tmp_path):
+    snapshot, store = str(tmp_path / "snap"), str(tmp_path / "store")
+    make_snapshot(snapshot, 2 * collector.BLOB_CHUNK_THRESHOLD)
+    with open(os.path.join(snapshot, "logs", "big.log"), "rb") as f:
+        original = f.read()
+    collector.store_snapshot_in_blobs(snapshot, store, chunk_logs=True)
+    assert os.listdir(os.path.join(snapshot, "logs")) == ["big.log.chunks"]
+    collector.materialize_chunked_files(snapshot)
+    with open(os.path.join(snapshot, "logs", "big.log"), "rb") as f:
+        assert f.read() == original
+
+
+def test_gc_keeps_blobs_copied_into_live_snapshots(tmp_path, monkeypatch):
+    snapshot, store = str(tmp_path / "snap"), str(tmp_path / "store")
+    make_snapshot(snapshot, 1000)
+
+    def no_link(src, dest):
+        raise OSError("Invalid cross-device link")
+
+    monkeypatch.setattr(collector.os, "link", no_link)
+    collector.store_snapshot_in_blobs(snapshot, store)
+    monkeypatch.undo()
+    assert len(blobs(store)) == 2
+    collector.gc_blob_store(store)
+    assert len(blobs(store)) == 2
+    shutil.rmtree(snapshot)
+    collector.gc_blob_store(store)
+    assert blobs(store) == []
+    with open(os.path.join(store, collector.BLOB_COPIES_FILE)) as f:
+        assert f.read() == ""
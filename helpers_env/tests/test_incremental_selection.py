@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+import get_cluster_info_v3 as collector
+
+
+def pod(name, version):
+    return {"apiVersion": "v1", "kind": "Pod",
+            "metadata": {"name": name, "namespace": "ns0", "uid": f"uid-{name}", "resourceVersion": version}}
+
+
+@pytest.fixture
+def previous(tmp_path, monkeypatch):
+    """A previous snapshot holding pod-0..pod-4 at resourceVersion 1."""
+    root = tmp_path / "previous"
+    objects = {}
+    for i in range(5):
+        rel_path = collector.describe_rel_path("pods", f"pod-{i}", "ns0")
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_text(f"Name: pod-{i}\n")
+        objects[rel_path] = {"kind": "pods", "namespace": "ns0", "name": f"pod-{i}", "uid": f"uid-pod-{i}",
+                             "version": "1"}
+    (root / "manifest.json").write_text(json.dumps({"objects": objects}))
+    monkeypatch.setattr(collector, "_previous_snapshot", {"root": None, "objects": {}})
+    monkeypatch.setattr(collector, "_manifest", {})
+    collector.load_previous_snapshot(str(root))
+    return root
+
+
+def test_limit_rule_is_applied_once_per_object(tmp_path, previous, monkeypatch):
+    # pod-0..pod-2 changed since the previous snapshot, pod-5 is new and over the limit
+    current = [pod("pod-0", "2"), pod("pod-1", "2"), pod("pod-2", "2"), pod("pod-3", "1"), pod("pod-4", "1"),
+               pod("pod-5", "1")]
+    monkeypatch.setattr(collector, "SELECTION", collector.Selection({"rules": [{"resources": ["pods"], "limit": 5}]}))
+    monkeypatch.setattr(collector, "get_resource_metadata", lambda resource_type, **kwargs: [
+        (p["metadata"]["namespace"], p["metadata"]["name"], p["metadata"]["uid"], p["metadata"]["resourceVersion"])
+        for p in current])
+    monkeypatch.setattr(collector, "iter_resource_pages", lambda resource_type, **kwargs: iter([current]))
+    monkeypatch.setattr(collector, "get_events_by_object", lambda: {})
+    base_dir = tmp_path / "snapshot"
+
+    collector.save_describes_bulk("pods", None, str(base_dir))
+
+    expected = [collector.describe_rel_path("pods", f"pod-{i}", "ns0") for i in range(5)]
+    assert sorted(collector._manifest) == expected
+    for rel_path in expected:
+        assert os.path.isfile(base_dir / rel_path), rel_path
+    assert collector._manifest[expected[0]]["version"] == "2"
@@ -0,0 +1,115 @@
+import json
+import sys
+
+import pytest
+import yaml
+
+import get_cluster_info_v3 as collector
+from fake_apiserver import FakeApiServer
+
+# Exec credential plugin: hands out token-1, token-2, ... counting its runs in a file
+EXEC_PLUGIN = """
+import json, sys
+path = sys.argv[1]
+try:
+    runs = int(open(path).read())
+except OSError:
+    runs = 0
+open(path, "w").write(str(runs + 1))
+print(json.dumps({"apiVersion": "client.authentication.k8s.io/v1", "kind": "ExecCredential",
+                  "status": {"token": f"token-{runs + 1}"}}))
+"""
+
+
+@pytest.fixture
+def server():
+    server = FakeApiServer(pods=[{"metadata": {"name": f"pod-{i}", "namespace": "ns0"}} for i in range(7)],
+                           log_body=b"".join(b"line %d\n" % i for i in range(20000))).start()
+    yield server
+    server.stop()
+
+
+def write_kubeconfig(tmp_path, server, user):
+    config = {
+        "apiVersion": "v1", "kind": "Config", "current-context": "test",
+        "clusters": [{"name": "test", "cluster": {"server": server.url}}],
+        "users": [{"name": "test", "user": user}],
+        "contexts": [{"name": "test", "context": {"cluster": "test", "user": "test"}}],
+    }
+    path = tmp_path / "kubeconfig"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+def exec_user(tmp_path):
+    plugin = tmp_path / "plugin.py"
+    plugin.write_text(EXEC_PLUGIN)
+    return {"exec": {"apiVersion": "client.authentication.k8s.io/v1", "command": sys.executable,
+                     "args": [str(plugin), str(tmp_path / "runs")]}}
+
+
+def plugin_runs(tmp_path):
+    return int((tmp_path / "runs").read_text())
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Route the collector's API calls through a KubeApiClient built by the test."""
+    def use(client):
+        monkeypatch.setattr(collector, "TRANSPORT", "api")
+        monkeypatch.setattr(collector, "_api_client", client)
+        monkeypatch.setattr(collector, "API_THROTTLE", collector.ApiThrottle(4))
+        return client
+    return use
+
+
+def test_keep_alive_connection_is_reused(server, tmp_path):
+    client = collector.KubeApiClient(write_kubeconfig(tmp_path, server, {"token": "abc"}))
+    for _ in range(3):
+        assert json.loads(client.get("/api/v1/pods"))["kind"] == "PodList"
+    assert [r["auth"] for r in server.requests] == ["Bearer abc"] * 3
+    assert len({r["port"] for r in server.requests}) == 1
+    client.close()
+
+
+def test_list_follows_continue_tokens(server, tmp_path, api, monkeypatch):
+    api(collector.KubeApiClient(write_kubeconfig(tmp_path, server, {"token": "abc"})))
+    monkeypatch.setattr(collector, "resource_path", lambda resource_type: "/api/v1/pods")
+    pages = list(collector.iter_resource_pages("pods", page_size=3))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [item["metadata"]["name"] for page in pages for item in page] == [f"pod-{i}" for i in range(7)]
+    assert all(item["kind"] == "Pod" and item["apiVersion"] == "v1" for page in pages for item in page)
+    assert [r["query"] for r in server.requests] == [
+        {"limit": "3"}, {"limit": "3", "continue": "3"}, {"limit": "3", "continue": "6"}]
+
+
+def test_exec_plugin_token_is_cached(server, tmp_path):
+    server.tokens = {"token-1"}
+    client = collector.KubeApiClient(write_kubeconfig(tmp_path, server, exec_user(tmp_path)))
+    for _ in range(3):
+        assert client.get("/api/v1/pods") is not None
+    assert plugin_runs(tmp_path) == 1
+    assert {r["auth"] for r in server.requests} == {"Bearer token-1"}
+    client.close()
+
+
+def test_unauthorized_refreshes_exec_token(server, tmp_path):
+    server.tokens = {"token-2"}  # the first token has been revoked
+    client = collector.KubeApiClient(write_kubeconfig(tmp_path, server, exec_user(tmp_path)))
+    assert json.loads(client.get("/api/v1/pods"))["kind"] == "PodList"
+    assert plugin_runs(tmp_path) == 2
+    assert [r["auth"] for r in server.requests] == ["Bearer token-1", "Bearer token-2"]
+    client.close()
+
+
+def test_connection_is_reused_after_streamed_log(server, tmp_path, api):
+    # Regression: a log body read to the end with read1() left the response open, and the
+    # pooled connection refused the next request.
+    client = api(collector.KubeApiClient(write_kubeconfig(tmp_path, server, {"token": "abc"}), pool_size=1))
+    chunks, finish, _ = collector._log_stream_api("ns0", "pod-0", "main", False)
+    assert b"".join(chunks) == server.log_body
+    assert finish(aborted=False) is None
+    assert client.get("/api/v1/pods") is not None
+    assert [r["path"] for r in server.requests] == ["/api/v1/namespaces/ns0/pods/pod-0/log", "/api/v1/pods"]
+    assert len({r["port"] for r in server.requests}) == 1
+    client.close()
@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+import yaml
+
+import get_cluster_info_v3 as collector
+from fake_apiserver import FakeApiServer
+
+# kubectl stand-in for `kubectl logs`: one line, then a container that stops writing
+STALLED_KUBECTL = "#!/bin/sh\necho first line\nexec sleep 60\n"
+
+
+@pytest.fixture
+def options(monkeypatch):
+    monkeypatch.setitem(collector.LOG_OPTIONS, "timeout", 1)
+    monkeypatch.setattr(collector, "API_THROTTLE", collector.ApiThrottle(4))
+    monkeypatch.setattr(collector, "API_QPS", 0)
+    monkeypatch.setattr(collector, "TRACER", None)
+
+
+@pytest.fixture
+def stalled_kubectl(tmp_path, monkeypatch, options):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "kubectl").write_text(STALLED_KUBECTL)
+    (bin_dir / "kubectl").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(collector, "TRANSPORT", "kubectl")
+
+
+@pytest.fixture
+def stalled_api(tmp_path, monkeypatch, options):
+    server = FakeApiServer(log_body=b"first line\nsecond line\n", log_stall=30).start()
+    config = {
+        "apiVersion": "v1", "kind": "Config", "current-context": "test",
+        "clusters": [{"name": "test", "cluster": {"server": server.url}}],
+        "users": [{"name": "test", "user": {"token": "abc"}}],
+        "contexts": [{"name": "test", "context": {"cluster": "test", "user": "test"}}],
+    }
+    (tmp_path / "kubeconfig").write_text(yaml.safe_dump(config))
+    client = collector.KubeApiClient(str(tmp_path / "kubeconfig"))
+    monkeypatch.setattr(collector, "TRANSPORT", "api")
+    monkeypatch.setattr(collector, "_api_client", client)
+    yield server
+    client.close()
+    server.stop()
+
+
+def capture(tmp_path, deadline=None):
+    path = str(tmp_path / "pod.log")
+    start = time.monotonic()
+    assert collector.stream_log_to_file("ns0", "pod-0", None, False, path, deadline)
+    with open(path) as f:
+        return f.read(), time.monotonic() - start
+
+
+def test_quiet_kubectl_stream_stops_at_timeout(tmp_path, stalled_kubectl):
+    content, elapsed = capture(tmp_path)
+    assert elapsed < 10
+    assert content.startswith("first line\n")
+    assert "--- log capture stopped after 1s timeout ---" in content
+
+
+def test_stalled_api_stream_stops_at_timeout(tmp_path, stalled_api):
+    content, elapsed = capture(tmp_path)
+    assert elapsed < 10
+    assert content.startswith("first line\n")
+    assert "--- log capture stopped after 1s timeout ---" in content
+
+
+def test_silent_stream_stops_at_budget_deadline(tmp_path, stalled_api, monkeypatch):
+    stalled_api.log_body = b""  # headers, then no log data at all
+    monkeypatch.setitem(collector.LOG_OPTIONS, "timeout", 300)
+    content, elapsed = capture(tmp_path, deadline=time.monotonic() + 1)
+    assert elapsed < 10
+    assert content == "\n--- log capture stopped after --budget deadline ---\n"
+
+
+def test_silent_kubectl_stream_stops_at_budget_deadline(tmp_path, stalled_kubectl, monkeypatch):
+    (tmp_path / "bin" / "kubectl").write_text("#!/bin/sh\nexec sleep 60\n")
+    monkeypatch.setitem(collector.LOG_OPTIONS, "timeout", 300)
+    content, elapsed = capture(tmp_path, deadline=time.monotonic() + 1)
+    assert elapsed < 10
+    assert content == "\n--- log capture stopped after --budget deadline ---\n"
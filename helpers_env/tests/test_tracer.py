@@ -0,0 +1,30 @@
+import threading
+import tracemalloc
+
+import get_cluster_info_v3 as collector
+
+
+def test_concurrent_spans_keep_their_own_depth():
+    tracer = collector.Tracer()
+    barrier = threading.Barrier(4)
+
+    def step(name):
+        with tracer.span(name):
+            barrier.wait()  # all four outer spans are open at once
+            with tracer.span(f"{name}/inner"):
+                barrier.wait()
+
+    try:
+        threads = [threading.Thread(target=step, args=(f"step{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        tracemalloc.stop()
+
+    depths = {span["name"]: span["depth"] for span in tracer.spans}
+    assert depths == {**{f"step{i}": 0 for i in range(4)}, **{f"step{i}/inner": 1 for i in range(4)}}
+    # the peak is reset by the first span to open only, so one span owns it
+    assert sum(span["mem_peak"] is not None for span in tracer.spans) == 1
+    assert tracer.open_spans == 0